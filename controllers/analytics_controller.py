@@ -60,3 +60,56 @@ def get_broken_habits():
         Returns: List of habit objects which are currently not on a streak
     """
     return analytics_service.get_broken_habits()
+
+def get_habit_status(habit_id: int):
+    """ 
+        Desc: Controller to read all metrics (streaks, open today, broken, last completion) of one habit at once
+        Args: ID of habit
+        Returns: HabitStatus object, None if the habit does not exist
+    """
+    return analytics_service.get_habit_status(habit_id)
+
+def get_habit_statuses():
+    """ 
+        Desc: Controller to read all metrics (streaks, open today, broken, last completion) of every habit at once
+        Args: /
+        Returns: List of HabitStatus objects
+    """
+    return analytics_service.get_habit_statuses()
+
+def get_streak_as_of(habit_id: int, day):
+    """ 
+        Desc: Controller to read the streak a habit had on a specific day
+        Args: ID of habit, day (date)
+        Returns: streak (int)
+    """
+    return analytics_service.get_streak_as_of(habit_id, day)
+
+def get_longest_streak_between(habit_id: int, start, end):
+    """ 
+        Desc: Controller to read the longest streak of a habit within a date range
+        Args: ID of habit, first and last day of the range (date)
+        Returns: longest streak (int)
+    """
+    return analytics_service.get_longest_streak_between(habit_id, start, end)
+
+def get_completion_rates():
+    """ 
+        Desc: Controller to read the completion rates over the last 7/30/90/365 periods of all habits
+        Args: /
+        Returns: List of objects of habit_id, title and rates (window length and share of completed periods)
+    """
+    rates = analytics_service.get_completion_rates()
+    habits = {habit.id: habit.title for habit in habit_controller.get_all_habits()}
+    return {habit_id: {"title": habits.get(habit_id, "Unknown"), "rates": rate} for habit_id, rate in rates.items()}
+
+def get_completion_rates_for_habit(habit_id: int, windows=analytics_service.RATE_WINDOWS):
+    """ 
+        Desc: Controller to read the completion rates of a specific habit for any window lengths
+        Args: ID of habit, window lengths in periods (default 7/30/90/365)
+        Returns: Object of habit title and rates, None if the habit does not exist
+    """
+    habit = habit_controller.get_habit(habit_id)
+    if habit:
+        return {"title": habit.title, "rates": analytics_service.get_completion_rates(habit_id, windows)[habit_id]}
+    return None
@@ -0,0 +1,72 @@
+import asyncio
+from typing import Iterable
+from controllers import analytics_controller
+from db.async_database import run_in_db_thread
+
+async def get_longest_streaks():
+    """ 
+        Desc: async version of analytics_controller.get_longest_streaks
+        Args: /
+        Returns: List of objects of habit_id and streak
+    """
+    return await run_in_db_thread(analytics_controller.get_longest_streaks)
+
+async def get_longest_streak_for_habit(habit_id: int):
+    """ 
+        Desc: async version of analytics_controller.get_longest_streak_for_habit
+        Args: ID of habit 
+        Returns: Object of habit title and streak
+    """
+    return await run_in_db_thread(analytics_controller.get_longest_streak_for_habit, habit_id)
+
+async def get_longest_streaks_for_habits(habit_ids: Iterable[int]):
+    """ 
+        Desc: Reads the longest streaks of many habits concurrently on the database executor
+        Args: IDs of habits
+        Returns: List (Dictionary) of habit ID and object of habit title and streak (None if not found)
+    """
+    habit_ids = list(habit_ids)
+    results = await asyncio.gather(*(get_longest_streak_for_habit(habit_id) for habit_id in habit_ids))
+    return dict(zip(habit_ids, results))
+
+async def get_current_streaks():
+    """ 
+        Desc: async version of analytics_controller.get_current_streaks
+        Args: /
+        Returns: List of habits with their streaks
+    """
+    return await run_in_db_thread(analytics_controller.get_current_streaks)
+
+async def get_current_streak_for_habit(habit_id: int):
+    """ 
+        Desc: async version of analytics_controller.get_current_streak_for_habit
+        Args: ID of habit 
+        Returns: Object of habit name and streaks
+    """
+    return await run_in_db_thread(analytics_controller.get_current_streak_for_habit, habit_id)
+
+async def get_current_streaks_for_habits(habit_ids: Iterable[int]):
+    """ 
+        Desc: Reads the current streaks of many habits concurrently on the database executor
+        Args: IDs of habits
+        Returns: List (Dictionary) of habit ID and object of habit title and streak (None if not found)
+    """
+    habit_ids = list(habit_ids)
+    results = await asyncio.gather(*(get_current_streak_for_habit(habit_id) for habit_id in habit_ids))
+    return dict(zip(habit_ids, results))
+
+async def get_open_tasks_for_today():
+    """ 
+        Desc: async version of analytics_controller.get_open_tasks_for_today
+        Args: /
+        Returns: List of habit objects which still have not been completed today
+    """
+    return await run_in_db_thread(analytics_controller.get_open_tasks_for_today)
+
+async def get_broken_habits():
+    """ 
+        Desc: async version of analytics_controller.get_broken_habits
+        Args: /
+        Returns: List of habit objects which are currently not on a streak
+    """
+    return await run_in_db_thread(analytics_controller.get_broken_habits)
@@ -0,0 +1,18 @@
+from controllers import habit_completion_controller
+from db.async_database import run_in_db_thread
+
+async def complete_habit(habit_id: int):
+    """ 
+        Desc: async version of habit_completion_controller.complete_habit
+        Args: ID of habit 
+        Returns: /
+    """
+    await run_in_db_thread(habit_completion_controller.complete_habit, habit_id)
+
+async def get_completions(habit_id: int):
+    """ 
+        Desc: async version of habit_completion_controller.get_completions
+        Args: ID of habit 
+        Returns: List of dates of completions for a specific habit
+    """
+    return await run_in_db_thread(habit_completion_controller.get_completions, habit_id)
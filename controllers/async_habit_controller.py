@@ -0,0 +1,51 @@
+from controllers import habit_controller
+from db.async_database import run_in_db_thread
+from models.habit import Habit
+
+async def add_habit(habit: Habit):
+    """ 
+        Desc: async version of habit_controller.add_habit
+        Args: habit object
+        Returns: ID of the new habit
+    """
+    return await run_in_db_thread(habit_controller.add_habit, habit)
+
+async def get_habit(id: int):
+    """ 
+        Desc: async version of habit_controller.get_habit
+        Args: ID of habit 
+        Returns: habit object
+    """
+    return await run_in_db_thread(habit_controller.get_habit, id)
+
+async def get_all_habits():
+    """ 
+        Desc: async version of habit_controller.get_all_habits
+        Args: /
+        Returns: List of habit objects
+    """
+    return await run_in_db_thread(habit_controller.get_all_habits)
+
+async def get_habits_by_frequency(freq_string: str):
+    """ 
+        Desc: async version of habit_controller.get_habits_by_frequency
+        Args: Frequency string (daily, weekly, biweekly, monthly)
+        Returns: Filtered list of habit objects
+    """
+    return await run_in_db_thread(habit_controller.get_habits_by_frequency, freq_string)
+
+async def update_habit(id: int, updated_habit: Habit):
+    """ 
+        Desc: async version of habit_controller.update_habit
+        Args: ID of habit to be updated, Updated habit object
+        Returns: boolean if the habit was updated
+    """
+    return await run_in_db_thread(habit_controller.update_habit, id, updated_habit)
+
+async def delete_habit(id: int):
+    """ 
+        Desc: async version of habit_controller.delete_habit
+        Args: ID of the habit to be deleted
+        Returns: boolean if the habit was deleted
+    """
+    return await run_in_db_thread(habit_controller.delete_habit, id)
@@ -1,18 +1,43 @@
-from db import habit_completion_repository
+from datetime import datetime
+from db import habit_completion_repository, completion_write_queue, completion_archive_repository
+from services import reminder_scheduler
 
 def complete_habit(habit_id: int):
     """ 
-        Desc: Controller to check off a habit for today
+        Desc: Controller to check off a habit for today, queued for the background writer if write-behind mode is started,
+              the reminder of the habit moves to its next period
         Args: ID of habit 
         Returns: printed string that habit has been marked as compelted
     """
-    habit_completion_repository.complete_habit(habit_id)
+    if completion_write_queue.is_enabled():
+        completion_write_queue.enqueue(habit_id)
+    else:
+        habit_completion_repository.complete_habit(habit_id)
+    reminder_scheduler.on_habit_completed(habit_id, datetime.now())
     print(f"Habit ID {habit_id} marked as completed.")
 
 def get_completions(habit_id: int):
     """ 
-        Desc: Controller to get the dates of the completions of a specific habit
+        Desc: Controller to get the dates of the completions of a specific habit (queued completions are written first)
         Args: ID of habit 
         Returns: List of dates of completions for a specific habit
     """
+    completion_write_queue.flush()
     return habit_completion_repository.get_completions(habit_id)
+
+def iter_completions(habit_id: int):
+    """ 
+        Desc: Controller to stream the dates of the completions of a specific habit in batches (queued completions are written first)
+        Args: ID of habit 
+        Returns: Generator of dates of completions for a specific habit
+    """
+    completion_write_queue.flush()
+    return habit_completion_repository.iter_completions(habit_id)
+
+def get_archived_completions(habit_id: int):
+    """ 
+        Desc: Controller to get the archived (rolled up) completions of a specific habit
+        Args: ID of habit 
+        Returns: List of (date, number of completions) tuples, oldest first
+    """
+    return completion_archive_repository.get_archived_counts(habit_id)
@@ -1,13 +1,16 @@
 from db import habit_repository
+from services import reminder_scheduler
 from models.habit import Frequency, Habit
 
 def add_habit(habit: Habit):
     """" 
-        Desc: Controller which adds a habit to the database
+        Desc: Controller which adds a habit to the database (and to the reminder schedule if it is started)
         Args: habit object
-        Returns: call to habit repository
+        Returns: ID of the new habit
     """
-    return habit_repository.insert_habit(habit)
+    habit_id = habit_repository.insert_habit(habit)
+    reminder_scheduler.on_habit_added(habit_id, habit)
+    return habit_id
 
 def get_habit(id: int):
     """ 
@@ -25,6 +28,14 @@ def get_all_habits():
     """
     return habit_repository.get_all_habits()
 
+def iter_habits():
+    """ 
+        Desc: Controller which streams all habits in batches
+        Args: /
+        Returns: Generator of habit objects
+    """
+    return habit_repository.iter_habits()
+
 def get_habits_by_frequency(freq_string: str):
     """ 
         Desc: Controller which gets all habits for a specific frequency
@@ -39,16 +50,21 @@ def get_habits_by_frequency(freq_string: str):
 
 def update_habit(id: int, updated_habit: Habit):
     """ 
-        Desc: Controller which updates the habit
+        Desc: Controller which updates the habit (and reschedules its reminder if the scheduler is started)
         Args: ID of habit to be updated, Updated habit object
-        Returns: Call to habit repository
+        Returns: boolean if the habit existed
     """
-    return habit_repository.update_habit(id, updated_habit)
+    updated = habit_repository.update_habit(id, updated_habit)
+    if updated:
+        reminder_scheduler.on_habit_updated(id, updated_habit)
+    return updated
 
 def delete_habit(id: int):
     """" 
-        Desc: Controller which deletes a specific habit
+        Desc: Controller which deletes a specific habit (and drops its reminder)
         Args: ID of the habit to be deleted
-        Returns: Call to habit repository
+        Returns: boolean if the habit existed
     """
-    return habit_repository.delete_habit(id)
+    deleted = habit_repository.delete_habit(id)
+    reminder_scheduler.on_habit_deleted(id)
+    return deleted
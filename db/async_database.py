@@ -0,0 +1,43 @@
+import asyncio
+import atexit
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+
+# Worker threads running SQLite calls for asyncio code. Every worker keeps its own connection
+# (see get_connection), so a connection is only ever used by the thread that opened it.
+ASYNC_WORKERS = 4
+
+_executor = None
+_lock = threading.Lock()
+
+
+def get_executor() -> ThreadPoolExecutor:
+    """ returns the bounded executor for database work, creating it on first use """
+    global _executor
+    with _lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=ASYNC_WORKERS, thread_name_prefix="habit-db")
+        return _executor
+
+
+async def run_in_db_thread(fn, *args, **kwargs):
+    """"
+        Desc: Runs a blocking repository/service call on the database executor without stalling the event loop
+        Args: function and its arguments
+        Returns: return value of the function
+    """
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(get_executor(), partial(fn, *args, **kwargs))
+
+
+def shutdown_executor():
+    """ waits for pending database work and stops the worker threads (registered with atexit) """
+    global _executor
+    with _lock:
+        executor, _executor = _executor, None
+    if executor is not None:
+        executor.shutdown(wait=True)
+
+
+atexit.register(shutdown_executor)
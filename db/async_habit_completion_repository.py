@@ -0,0 +1,34 @@
+from db import habit_completion_repository
+from db.async_database import run_in_db_thread
+from datetime import datetime
+from typing import Dict, Iterable, List, Tuple
+
+
+async def complete_habit(habit_id: int, timestamp: datetime = None):
+    """ async version of habit_completion_repository.complete_habit """
+    return await run_in_db_thread(habit_completion_repository.complete_habit, habit_id, timestamp)
+
+
+async def complete_habits_bulk(completions: Iterable[Tuple[int, datetime]], **kwargs) -> int:
+    """ async version of habit_completion_repository.complete_habits_bulk """
+    return await run_in_db_thread(habit_completion_repository.complete_habits_bulk, completions, **kwargs)
+
+
+async def get_completions(habit_id: int, **kwargs) -> List[datetime]:
+    """ async version of habit_completion_repository.get_completions (same keyword filters) """
+    return await run_in_db_thread(habit_completion_repository.get_completions, habit_id, **kwargs)
+
+
+async def get_completion_days(habit_id: int, **kwargs) -> List[int]:
+    """ async version of habit_completion_repository.get_completion_days (same keyword filters) """
+    return await run_in_db_thread(habit_completion_repository.get_completion_days, habit_id, **kwargs)
+
+
+async def get_completions_grouped(habit_ids: Iterable[int] = None, **kwargs) -> Dict[int, List[datetime]]:
+    """ async version of habit_completion_repository.get_completions_grouped """
+    return await run_in_db_thread(habit_completion_repository.get_completions_grouped, habit_ids, **kwargs)
+
+
+async def get_completion_days_grouped(habit_ids: Iterable[int] = None, **kwargs) -> Dict[int, List[int]]:
+    """ async version of habit_completion_repository.get_completion_days_grouped """
+    return await run_in_db_thread(habit_completion_repository.get_completion_days_grouped, habit_ids, **kwargs)
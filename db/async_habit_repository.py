@@ -0,0 +1,38 @@
+from db import habit_repository
+from db.async_database import run_in_db_thread
+from models.habit import Habit, Frequency
+
+
+async def insert_habit(habit: Habit):
+    """ async version of habit_repository.insert_habit """
+    return await run_in_db_thread(habit_repository.insert_habit, habit)
+
+
+async def get_habit_by_id(id: int):
+    """ async version of habit_repository.get_habit_by_id """
+    return await run_in_db_thread(habit_repository.get_habit_by_id, id)
+
+
+async def get_all_habits():
+    """ async version of habit_repository.get_all_habits """
+    return await run_in_db_thread(habit_repository.get_all_habits)
+
+
+async def get_habits_by_frequency(frequency: Frequency):
+    """ async version of habit_repository.get_habits_by_frequency """
+    return await run_in_db_thread(habit_repository.get_habits_by_frequency, frequency)
+
+
+async def update_habit(id: int, habit: Habit):
+    """ async version of habit_repository.update_habit """
+    return await run_in_db_thread(habit_repository.update_habit, id, habit)
+
+
+async def delete_habit(id: int):
+    """ async version of habit_repository.delete_habit """
+    return await run_in_db_thread(habit_repository.delete_habit, id)
+
+
+async def delete_all_habits():
+    """ async version of habit_repository.delete_all_habits """
+    return await run_in_db_thread(habit_repository.delete_all_habits)
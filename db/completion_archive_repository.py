@@ -0,0 +1,139 @@
+from db.database import get_connection
+from datetime import date
+from itertools import groupby
+from operator import itemgetter
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+# Number of rows pulled per fetchmany call by iter_archived_days
+FETCH_BATCH_SIZE = 500
+
+# Maximum number of habit IDs bound into one "IN (...)" list, stays below SQLite's variable limit
+MAX_IDS_PER_QUERY = 500
+
+
+def archive_completions(habit_id: int, before_day: int) -> int:
+    """" 
+        Desc: Moves the completions of a habit older than a day from habit_completions into the
+              per-day rollup table (day plus number of completions), in one transaction
+        Args: ID of habit, day ordinal of the first day that stays in habit_completions
+        Returns: number of archived completions (int)
+    """
+    with get_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute("""
+        INSERT INTO habit_completion_rollups (habit_id, completed_day, count)
+        SELECT habit_id, completed_day, COUNT(*) FROM habit_completions
+        WHERE habit_id = ? AND completed_day < ?
+        GROUP BY completed_day
+        ON CONFLICT (habit_id, completed_day) DO UPDATE SET count = count + excluded.count
+        """, (habit_id, before_day))
+        cursor.execute("""
+        DELETE FROM habit_completions
+        WHERE habit_id = ? AND completed_day < ?
+        """, (habit_id, before_day))
+        conn.commit()
+        return cursor.rowcount
+
+
+def get_archived_counts(habit_id: int) -> List[Tuple[date, int]]:
+    """" 
+        Desc: Reads the archived completions of a habit
+        Args: ID of habit
+        Returns: List of (day, number of completions) tuples, oldest first
+    """
+    with get_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute("""
+        SELECT completed_day, count FROM habit_completion_rollups
+        WHERE habit_id = ?
+        ORDER BY completed_day ASC
+        """, (habit_id,))
+        return [(date.fromordinal(day), count) for day, count in cursor.fetchall()]
+
+
+def get_archived_days(habit_id: int) -> List[int]:
+    """" 
+        Desc: Reads the day ordinals of the archived completions of a habit
+        Args: ID of habit
+        Returns: List of day ordinals (int), oldest first
+    """
+    with get_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute("""
+        SELECT completed_day FROM habit_completion_rollups
+        WHERE habit_id = ?
+        ORDER BY completed_day ASC
+        """, (habit_id,))
+        return [row[0] for row in cursor.fetchall()]
+
+
+def iter_archived_days(habit_id: Optional[int] = None, batch_size: int = FETCH_BATCH_SIZE) -> Iterator[Tuple[int, int]]:
+    """" 
+        Desc: Streams the archived day ordinals of one habit (or of all habits) in primary key order
+        Args: optional ID of habit (all habits if omitted), number of rows per fetchmany call
+        Returns: Generator of (habit ID, day ordinal) tuples, ordered by habit and oldest first
+    """
+    # no "with conn" here: abandoning the generator early must not roll back the shared connection
+    cursor = get_connection().cursor()
+    try:
+        cursor.execute(f"""
+        SELECT habit_id, completed_day FROM habit_completion_rollups
+        {"WHERE habit_id = ?" if habit_id is not None else ""}
+        ORDER BY habit_id ASC, completed_day ASC
+        """, () if habit_id is None else (habit_id,))
+        while True:
+            rows = cursor.fetchmany(batch_size)
+            if not rows:
+                break
+            yield from rows
+    finally:
+        cursor.close()
+
+
+def get_archived_days_grouped(habit_ids: Optional[Iterable[int]] = None) -> Dict[int, List[int]]:
+    """" 
+        Desc: Reads the archived day ordinals of all habits (or of the given habits) grouped by habit
+        Args: optional IDs of habits, all habits if omitted
+        Returns: Dictionary of habit ID (int) and list of day ordinals, oldest first; habits without archive are missing
+    """
+    grouped = {}
+    with get_connection() as conn:
+        cursor = conn.cursor()
+        for where, params in _id_filters(habit_ids):
+            cursor.execute(f"""
+            SELECT habit_id, completed_day FROM habit_completion_rollups
+            {where}
+            ORDER BY habit_id ASC, completed_day ASC
+            """, params)
+            for habit_id, rows in groupby(cursor, key=itemgetter(0)):
+                grouped[habit_id] = [row[1] for row in rows]
+    return grouped
+
+
+def get_archived_bounds_grouped(habit_ids: Optional[Iterable[int]] = None) -> Dict[int, Tuple[int, int]]:
+    """" 
+        Desc: Reads the first and the last archived day of all habits (or of the given habits)
+        Args: optional IDs of habits, all habits if omitted
+        Returns: Dictionary of habit ID (int) and (first day, last day) ordinals; habits without archive are missing
+    """
+    bounds = {}
+    with get_connection() as conn:
+        cursor = conn.cursor()
+        for where, params in _id_filters(habit_ids):
+            cursor.execute(f"""
+            SELECT habit_id, MIN(completed_day), MAX(completed_day) FROM habit_completion_rollups
+            {where}
+            GROUP BY habit_id
+            """, params)
+            for habit_id, first, last in cursor:
+                bounds[habit_id] = (first, last)
+    return bounds
+
+
+def _id_filters(habit_ids: Optional[Iterable[int]]) -> List[Tuple[str, list]]:
+    """ Splits the optional habit IDs into WHERE clauses with at most MAX_IDS_PER_QUERY variables """
+    if habit_ids is None:
+        return [("", [])]
+    ids = sorted(set(habit_ids))
+    chunks = [ids[i:i + MAX_IDS_PER_QUERY] for i in range(0, len(ids), MAX_IDS_PER_QUERY)]
+    return [(f"WHERE habit_id IN ({', '.join('?' * len(chunk))})", chunk) for chunk in chunks]
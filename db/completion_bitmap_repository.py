@@ -0,0 +1,84 @@
+from db.database import get_connection
+from models.completion_bitmap import days_to_bitmaps
+from itertools import groupby
+from operator import itemgetter
+from typing import Dict, Iterable, List, Optional, Tuple
+
+# Maximum number of habit IDs bound into one "IN (...)" list, stays below SQLite's variable limit
+MAX_IDS_PER_QUERY = 500
+
+
+def add_days(cursor, days_by_habit: Dict[int, List[int]]):
+    """"
+        Desc: Sets the bits of newly completed days in the yearly bitmaps of habits, inside the caller's transaction
+        Args: cursor of the open transaction, Dictionary of habit ID and the day ordinals of its new completions
+        Returns: /
+    """
+    for habit_id, days in days_by_habit.items():
+        for year, bits in days_to_bitmaps(days).items():
+            row = cursor.execute("""
+                SELECT bits FROM habit_completion_bitmaps WHERE habit_id = ? AND year = ?
+            """, (habit_id, year)).fetchone()
+            if row is not None:
+                bits = bytes(old | new for old, new in zip(row[0], bits))
+            cursor.execute("""
+                INSERT INTO habit_completion_bitmaps (habit_id, year, bits) VALUES (?, ?, ?)
+                ON CONFLICT (habit_id, year) DO UPDATE SET bits = excluded.bits
+            """, (habit_id, year, bytes(bits)))
+
+
+def rebuild(cursor, habit_ids: Optional[Iterable[int]] = None):
+    """"
+        Desc: Recalculates the yearly bitmaps of habits from their hot and archived completions, inside the caller's transaction
+        Args: cursor of the open transaction, optional IDs of habits (all habits if omitted)
+        Returns: /
+    """
+    for where, params in _id_filters(habit_ids):
+        cursor.execute(f"DELETE FROM habit_completion_bitmaps {where}", params)
+        # joined with habits so orphaned completions (left behind without foreign keys) get no bitmap
+        rows = cursor.execute(f"""
+            SELECT d.habit_id, d.completed_day FROM (
+                SELECT habit_id, completed_day FROM habit_completions {where}
+                UNION
+                SELECT habit_id, completed_day FROM habit_completion_rollups {where}
+            ) d
+            JOIN habits h ON h.id = d.habit_id
+            ORDER BY 1
+        """, params + params).fetchall()
+        for habit_id, group in groupby(rows, key=itemgetter(0)):
+            cursor.executemany("""
+                INSERT INTO habit_completion_bitmaps (habit_id, year, bits) VALUES (?, ?, ?)
+            """, [(habit_id, year, bytes(bits)) for year, bits in days_to_bitmaps(row[1] for row in group).items()])
+
+
+def get_bitmaps(habit_ids: Optional[Iterable[int]] = None, year: Optional[int] = None) -> Dict[int, List[Tuple[int, bytes]]]:
+    """"
+        Desc: Reads the completion bitmaps of all habits (or of the given habits), a few dozen bytes per habit and year
+        Args: optional IDs of habits (all habits if omitted), optional year to read only its bitmaps
+        Returns: Dictionary of habit ID (int) and list of (year, bitmap) pairs, oldest year first;
+                 habits without completions are missing
+    """
+    grouped = {}
+    with get_connection() as conn:
+        cursor = conn.cursor()
+        for where, params in _id_filters(habit_ids):
+            if year is not None:
+                where = f"{where} AND year = ?" if where else "WHERE year = ?"
+                params = params + [year]
+            cursor.execute(f"""
+            SELECT habit_id, year, bits FROM habit_completion_bitmaps
+            {where}
+            ORDER BY habit_id ASC, year ASC
+            """, params)
+            for habit_id, rows in groupby(cursor, key=itemgetter(0)):
+                grouped[habit_id] = [(row[1], row[2]) for row in rows]
+    return grouped
+
+
+def _id_filters(habit_ids: Optional[Iterable[int]]) -> List[Tuple[str, list]]:
+    """ Splits the optional habit IDs into WHERE clauses with at most MAX_IDS_PER_QUERY variables """
+    if habit_ids is None:
+        return [("", [])]
+    ids = sorted(set(habit_ids))
+    chunks = [ids[i:i + MAX_IDS_PER_QUERY] for i in range(0, len(ids), MAX_IDS_PER_QUERY)]
+    return [(f"WHERE habit_id IN ({', '.join('?' * len(chunk))})", chunk) for chunk in chunks]
@@ -0,0 +1,143 @@
+import atexit
+import queue
+import threading
+import time
+from datetime import datetime
+from db.database import get_connection
+from db.habit_completion_repository import complete_habits_bulk
+
+# Defaults of the optional write-behind mode for habit completions
+FLUSH_INTERVAL_MS = 50      # a batch is written at the latest this long after its first completion arrived
+FLUSH_MAX_ROWS = 500        # ... or as soon as it holds this many completions
+MAX_QUEUE_SIZE = 10000      # completions waiting to be written before enqueue() blocks (backpressure)
+
+_STOP = object()
+
+_lock = threading.Lock()
+_queue = None
+_writer = None
+# failed completions are reported to the thread that enqueued them, keyed by its thread identifier; guarded by
+# their own lock because the writer reports them while close() holds _lock and waits for the writer
+_errors_lock = threading.Lock()
+_errors = {}
+
+
+def start(flush_interval_ms: int = FLUSH_INTERVAL_MS, max_rows: int = FLUSH_MAX_ROWS, max_queue_size: int = MAX_QUEUE_SIZE):
+    """"
+        Desc: Enables write-behind mode: completions are queued in memory and a background thread
+              writes them in batched transactions (group commit)
+        Args: flush interval in milliseconds, maximum rows per transaction, maximum queued rows
+        Returns: /
+    """
+    global _queue, _writer
+    with _lock:
+        if _writer is not None:
+            return
+        with _errors_lock:
+            _errors.clear()
+        _queue = queue.Queue(maxsize=max_queue_size)
+        _writer = threading.Thread(
+            target=_write_batches, args=(_queue, flush_interval_ms / 1000, max_rows),
+            name="habit-completion-writer", daemon=True
+        )
+        _writer.start()
+
+
+def is_enabled() -> bool:
+    """ checks if write-behind mode is running """
+    return _writer is not None
+
+
+def enqueue(habit_id: int, timestamp: datetime = None, timeout: float = None):
+    """"
+        Desc: Queues a completion for the background writer, the timestamp is taken now and not when it is written.
+              Blocks while the queue is full. A completion that cannot be written is reported to this thread
+              by its next enqueue(), flush() or close()
+        Args: ID of habit, timestamp (today), seconds to wait for free space (None waits forever)
+        Returns: / (raises queue.Full if the timeout expired)
+    """
+    if _queue is None:
+        raise RuntimeError("write-behind mode is not started")
+    _raise_writer_error()
+    _queue.put((habit_id, timestamp or datetime.now(), threading.get_ident()), timeout=timeout)
+
+
+def flush():
+    """ blocks until every queued completion is committed """
+    if _queue is not None:
+        _queue.join()
+    _raise_writer_error()
+
+
+def close():
+    """ writes all queued completions and stops the background writer (registered with atexit) """
+    global _queue, _writer
+    with _lock:
+        if _writer is None:
+            return
+        _queue.put(_STOP)
+        _writer.join()
+        _queue = _writer = None
+    _raise_writer_error()
+
+
+def _write_items(items: list, max_rows: int):
+    """ commits a batch in one transaction, if it fails (e.g. a habit was deleted meanwhile) the rows are retried
+        one by one so only the failing rows are dropped and reported to the threads that enqueued them """
+    try:
+        complete_habits_bulk(((habit_id, timestamp) for habit_id, timestamp, _ in items), chunk_size=max_rows)
+        return
+    except Exception as error:
+        if len(items) == 1:
+            _report(items[0][2], error)
+            return
+    for habit_id, timestamp, owner in items:
+        try:
+            complete_habits_bulk([(habit_id, timestamp)])
+        except Exception as error:
+            _report(owner, error)
+
+
+def _report(owner: int, error: Exception):
+    """ keeps a failed write for the thread that enqueued the completion, without the writer's traceback whose
+        frames would keep the writer's cursors (and with them the database) alive """
+    with _errors_lock:
+        _errors[owner] = error.with_traceback(None)
+
+
+atexit.register(close)
+
+
+def _raise_writer_error():
+    """ re-raises the failed write of a completion the calling thread enqueued """
+    with _errors_lock:
+        error = _errors.pop(threading.get_ident(), None)
+    if error is not None:
+        raise error
+
+
+def _write_batches(pending: queue.Queue, flush_interval: float, max_rows: int):
+    """ writer thread: collects completions until the interval passed or the batch is full and commits them at once """
+    stop = False
+    while not stop:
+        batch = [pending.get()]
+        deadline = time.monotonic() + flush_interval
+        while len(batch) < max_rows and batch[-1] is not _STOP:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(pending.get(timeout=remaining))
+            except queue.Empty:
+                break
+
+        stop = batch[-1] is _STOP
+        items = [item for item in batch if item is not _STOP]
+        try:
+            if items:
+                # the writer owns its connection, every group commit is fsynced so flush() is durable
+                get_connection().execute("PRAGMA synchronous=FULL")
+                _write_items(items, max_rows)
+        finally:
+            for _ in batch:
+                pending.task_done()
@@ -1,30 +1,471 @@
+import atexit
+import os
 import sqlite3
+import threading
+import weakref
+from datetime import date
+from db.timestamps import iso_to_epoch, iso_to_day
+
+# Database target: a file path, or ":memory:" for an in-memory database shared by all threads of the process
+DB_PATH_ENV = "HABIT_TRACKER_DB"
+MEMORY_DB = ":memory:"
+# the memdb VFS (SQLite 3.36+) shares one in-memory database between connections with regular file locking, so
+# busy waits apply; shared-cache mode would fail with "database table is locked" as soon as threads overlap
+MEMORY_URI = "file:/habit_tracker?vfs=memdb"
+DB_PATH = os.environ.get(DB_PATH_ENV, "habits.db")
+
+# Tuning applied to every connection when it is opened
+JOURNAL_MODE = "WAL"
+SYNCHRONOUS = "NORMAL"
+MMAP_SIZE = 256 * 1024 * 1024       # bytes of the database file mapped into memory
+CACHE_SIZE = -64 * 1024             # negative means KiB, i.e. a 64 MiB page cache
+STATEMENT_CACHE_SIZE = 256          # prepared statements kept per connection
+
+_local = threading.local()
+_lock = threading.Lock()
+_connections = set()
+_generation = 0
+_closed_changes = 0     # total_changes of connections closed since the last generation change
+_monitor = None         # connection that only reads PRAGMA data_version, see get_data_version
+
+
+def _open_connection():
+    """ opens a new connection to the configured database and applies the PRAGMAs above """
+    if DB_PATH == MEMORY_DB:
+        # a plain ":memory:" would give every thread its own empty database
+        conn = sqlite3.connect(MEMORY_URI, uri=True, cached_statements=STATEMENT_CACHE_SIZE, check_same_thread=False)
+    else:
+        conn = sqlite3.connect(DB_PATH, cached_statements=STATEMENT_CACHE_SIZE, check_same_thread=False)
+    # only takes effect before the first page is written (switching to WAL writes it), older files are
+    # converted by db.maintenance
+    conn.execute("PRAGMA auto_vacuum=INCREMENTAL")
+    conn.execute(f"PRAGMA journal_mode={JOURNAL_MODE}")
+    conn.execute(f"PRAGMA synchronous={SYNCHRONOUS}")
+    conn.execute(f"PRAGMA mmap_size={MMAP_SIZE}")
+    conn.execute(f"PRAGMA cache_size={CACHE_SIZE}")
+    conn.execute("PRAGMA foreign_keys=ON")
+    return conn
+
+
+class _ThreadConnection:
+    """ holds the connection of one thread in its thread-local storage, dropping it (when the thread exits)
+        closes the connection """
+    __slots__ = ("conn", "generation", "release", "__weakref__")
+
+    def __init__(self, conn, generation: int):
+        self.conn = conn
+        self.generation = generation
+        self.release = weakref.finalize(self, _release_connection, conn)
+
+
+def _release_connection(conn):
+    """ closes a thread's connection and keeps its changes counted for get_data_version """
+    global _closed_changes
+    with _lock:
+        if conn in _connections:
+            _closed_changes += conn.total_changes
+            _connections.discard(conn)
+    conn.close()
+
 
 def get_connection():
-    """" connects to the local SQLite database or creates a new database file called habits.db """
-    return sqlite3.connect("habits.db")
-
-def init_db():
-    """ initializes the database by creating two tables if they do not exist yet """
-    with get_connection() as conn:
-        cursor = conn.cursor()
-
-        cursor.execute("""
-        CREATE TABLE IF NOT EXISTS habits (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            title TEXT NOT NULL,
-            description TEXT,
-            frequency TEXT NOT NULL,
-            created_at TEXT NOT NULL
-        )
-        """)
-
-        cursor.execute("""
-        CREATE TABLE IF NOT EXISTS habit_completions (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            habit_id INTEGER NOT NULL,
-            completed_at TEXT NOT NULL,
-            FOREIGN KEY (habit_id) REFERENCES habits(id) ON DELETE CASCADE
-        )
-        """)
-        conn.commit()
+    """"
+        Desc: Returns the connection of the calling thread to the configured SQLite database (habits.db by default).
+              The connection is opened and tuned on first use and then reused for every later call of the same thread,
+              it is closed when the thread exits.
+        Args: /
+        Returns: sqlite3 connection
+    """
+    holder = getattr(_local, "holder", None)
+    if holder is not None and holder.generation == _generation:
+        return holder.conn
+
+    conn = _open_connection()
+    with _lock:
+        _connections.add(conn)
+        holder = _ThreadConnection(conn, _generation)
+    # replacing an outdated holder closes its connection
+    _local.holder = holder
+    return conn
+
+
+def close_connection():
+    """ closes the connection of the calling thread, the next get_connection() opens a new one """
+    holder = getattr(_local, "holder", None)
+    if holder is None:
+        return
+    _local.holder = None
+    holder.release()
+
+
+def close_all_connections():
+    """ shutdown hook: closes the connections of all threads (registered with atexit) """
+    global _generation, _closed_changes, _monitor
+    with _lock:
+        # the holders of the threads are outdated now, their finalizers only close the connection again
+        connections = list(_connections)
+        _connections.clear()
+        _generation += 1
+        _closed_changes = 0
+        _monitor = None
+    for conn in connections:
+        conn.close()
+
+
+atexit.register(close_all_connections)
+
+
+def get_data_version() -> tuple:
+    """"
+        Desc: Cheap change token for caches, it changes whenever this process or another one commits to the database.
+              Writes of this process are counted with total_changes of its connections, writes of other processes
+              show up in PRAGMA data_version of a separate monitor connection
+        Args: /
+        Returns: (generation, changes made by this process, data version) tuple
+    """
+    global _monitor
+    with _lock:
+        if _monitor is None:
+            _monitor = _open_connection()
+            _connections.add(_monitor)
+        changes = _closed_changes + sum(conn.total_changes for conn in _connections)
+        version = _monitor.execute("PRAGMA data_version").fetchone()[0]
+        return _generation, changes, version
+
+
+def set_database(path: str):
+    """"
+        Desc: Switches the database target, open connections are closed (an in-memory database is discarded with them)
+        Args: file path or ":memory:"
+        Returns: /
+    """
+    global DB_PATH
+    close_all_connections()
+    DB_PATH = path
+
+
+def snapshot_to(path: str):
+    """"
+        Desc: Copies the current database into a file with the SQLite backup API. The copy is written next to the
+              target first and then renamed, so the file at path is replaced atomically
+        Args: file path of the snapshot
+        Returns: /
+    """
+    tmp_path = f"{path}.tmp"
+    target = sqlite3.connect(tmp_path)
+    try:
+        get_connection().backup(target)
+    finally:
+        target.close()
+    os.replace(tmp_path, path)
+
+
+def load_from(path: str):
+    """"
+        Desc: Replaces the content of the current database with a snapshot file using the SQLite backup API
+        Args: file path of the snapshot
+        Returns: /
+    """
+    source = sqlite3.connect(path)
+    try:
+        source.backup(get_connection())
+    finally:
+        source.close()
+
+
+def _migration_1_create_tables(cursor):
+    """ creates the habits and habit_completions tables """
+    cursor.execute("""
+    CREATE TABLE IF NOT EXISTS habits (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        title TEXT NOT NULL,
+        description TEXT,
+        frequency TEXT NOT NULL,
+        created_at TEXT NOT NULL
+    )
+    """)
+
+    cursor.execute("""
+    CREATE TABLE IF NOT EXISTS habit_completions (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        habit_id INTEGER NOT NULL,
+        completed_at TEXT NOT NULL,
+        FOREIGN KEY (habit_id) REFERENCES habits(id) ON DELETE CASCADE
+    )
+    """)
+
+
+def _migration_2_add_indexes(cursor):
+    """ adds a covering index for per-habit completion reads and an index for the frequency filter """
+    cursor.execute("""
+    CREATE INDEX IF NOT EXISTS idx_habit_completions_habit_completed
+    ON habit_completions (habit_id, completed_at)
+    """)
+
+    cursor.execute("""
+    CREATE INDEX IF NOT EXISTS idx_habits_frequency
+    ON habits (frequency)
+    """)
+
+
+def _migration_3_integer_timestamps(cursor):
+    """
+        rebuilds both tables with INTEGER epoch seconds instead of ISO TEXT timestamps
+        and stores the local day ordinal of every completion next to it
+    """
+    conn = cursor.connection
+    conn.create_function("iso_to_epoch", 1, iso_to_epoch, deterministic=True)
+    conn.create_function("iso_to_day", 1, iso_to_day, deterministic=True)
+
+    cursor.execute("""
+    CREATE TABLE habit_completions_new (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        habit_id INTEGER NOT NULL,
+        completed_at INTEGER NOT NULL,
+        completed_day INTEGER NOT NULL,
+        FOREIGN KEY (habit_id) REFERENCES habits(id) ON DELETE CASCADE
+    )
+    """)
+    cursor.execute("""
+    INSERT INTO habit_completions_new (id, habit_id, completed_at, completed_day)
+    SELECT id, habit_id, iso_to_epoch(completed_at), iso_to_day(completed_at) FROM habit_completions
+    """)
+    cursor.execute("DROP TABLE habit_completions")
+    cursor.execute("ALTER TABLE habit_completions_new RENAME TO habit_completions")
+
+    cursor.execute("""
+    CREATE TABLE habits_new (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        title TEXT NOT NULL,
+        description TEXT,
+        frequency TEXT NOT NULL,
+        created_at INTEGER NOT NULL
+    )
+    """)
+    cursor.execute("""
+    INSERT INTO habits_new (id, title, description, frequency, created_at)
+    SELECT id, title, description, frequency, iso_to_epoch(created_at) FROM habits
+    """)
+    cursor.execute("DROP TABLE habits")
+    cursor.execute("ALTER TABLE habits_new RENAME TO habits")
+
+    # the indexes were dropped together with the old tables
+    cursor.execute("""
+    CREATE INDEX idx_habit_completions_habit_completed
+    ON habit_completions (habit_id, completed_at, completed_day)
+    """)
+    cursor.execute("""
+    CREATE INDEX idx_habits_frequency
+    ON habits (frequency)
+    """)
+
+
+def _migration_4_completion_rollups(cursor):
+    """ adds the rollup table that keeps archived completions as one row per habit and day """
+    cursor.execute("""
+    CREATE TABLE IF NOT EXISTS habit_completion_rollups (
+        habit_id INTEGER NOT NULL,
+        completed_day INTEGER NOT NULL,
+        count INTEGER NOT NULL,
+        PRIMARY KEY (habit_id, completed_day),
+        FOREIGN KEY (habit_id) REFERENCES habits(id) ON DELETE CASCADE
+    ) WITHOUT ROWID
+    """)
+
+
+# Frozen copy of the gaps-and-islands query the streak migrations fill their tables with (see
+# habit_streak_repository.RUNS_QUERY). Migrations must give the same result whenever they run, so this text is
+# never edited; a changed calculation gets a new migration instead
+_MIGRATION_RUNS_CTE = """
+    WITH days AS (
+        SELECT habit_id, completed_day AS day FROM habit_completions
+        UNION ALL
+        SELECT habit_id, completed_day FROM habit_completion_rollups
+    ),
+    keyed AS (
+        SELECT d.habit_id, d.day,
+            CASE h.frequency
+                WHEN 'daily' THEN d.day
+                WHEN 'weekly' THEN (d.day - 1) / 7
+                WHEN 'biweekly' THEN (d.day - MIN(d.day) OVER (PARTITION BY d.habit_id)) / 14
+                WHEN 'monthly' THEN
+                    CAST(strftime('%Y', d.day + 1721424.5) AS INTEGER) * 12
+                    + CAST(strftime('%m', d.day + 1721424.5) AS INTEGER) - 1
+            END AS period
+        FROM days d JOIN habits h ON h.id = d.habit_id
+    ),
+    periods AS (
+        SELECT habit_id, period, MIN(day) AS first_day, MAX(day) AS last_day,
+            LAG(period) OVER (PARTITION BY habit_id ORDER BY period) AS previous
+        FROM keyed
+        GROUP BY habit_id, period
+    ),
+    runs AS (
+        SELECT habit_id, period, first_day, last_day,
+            SUM(previous IS NULL OR period != previous + 1) OVER (PARTITION BY habit_id ORDER BY period) AS run
+        FROM periods
+    ),
+    run_lengths AS (
+        SELECT habit_id, run, COUNT(*) AS length, MIN(period) AS start_period, MAX(period) AS end_period,
+            MIN(first_day) AS first_day, MAX(last_day) AS last_day
+        FROM runs
+        GROUP BY habit_id, run
+    )
+"""
+
+
+def _fill_streak_summary(cursor):
+    """ recalculates the streak summary columns of schema version 5 from the frozen runs query """
+    cursor.execute("DELETE FROM habit_streaks")
+    cursor.execute(f"""
+    INSERT INTO habit_streaks (habit_id, first_day, last_day, current_streak, longest_streak)
+    {_MIGRATION_RUNS_CTE},
+    ranked AS (
+        SELECT habit_id, length,
+            MIN(first_day) OVER (PARTITION BY habit_id) AS first_day,
+            MAX(last_day) OVER (PARTITION BY habit_id) AS last_day,
+            MAX(length) OVER (PARTITION BY habit_id) AS longest,
+            ROW_NUMBER() OVER (PARTITION BY habit_id ORDER BY run DESC) AS newest
+        FROM run_lengths
+    )
+    SELECT habit_id, first_day, last_day, length, longest FROM ranked WHERE newest = 1
+    """)
+
+
+def _migration_5_streak_summary(cursor):
+    """ adds the per-habit streak summary that complete_habit keeps up to date and fills it for existing data """
+    cursor.execute("""
+    CREATE TABLE IF NOT EXISTS habit_streaks (
+        habit_id INTEGER PRIMARY KEY,
+        first_day INTEGER NOT NULL,
+        last_day INTEGER NOT NULL,
+        current_streak INTEGER NOT NULL,
+        longest_streak INTEGER NOT NULL,
+        FOREIGN KEY (habit_id) REFERENCES habits(id) ON DELETE CASCADE
+    )
+    """)
+    _fill_streak_summary(cursor)
+
+
+def _migration_6_rebuild_week_53_streaks(cursor):
+    """ recalculates the streak summary with period ordinals, weekly streaks used to break at ISO week 53 """
+    _fill_streak_summary(cursor)
+
+
+def _migration_7_streak_runs(cursor):
+    """ adds the per-habit index of runs of consecutive periods and fills it from the existing completions """
+    cursor.execute("""
+    CREATE TABLE IF NOT EXISTS habit_streak_runs (
+        habit_id INTEGER NOT NULL,
+        start_period INTEGER NOT NULL,
+        end_period INTEGER NOT NULL,
+        start_day INTEGER NOT NULL,
+        end_day INTEGER NOT NULL,
+        PRIMARY KEY (habit_id, start_period),
+        FOREIGN KEY (habit_id) REFERENCES habits(id) ON DELETE CASCADE
+    ) WITHOUT ROWID
+    """)
+    cursor.execute("DELETE FROM habit_streak_runs")
+    cursor.execute(f"""
+    INSERT INTO habit_streak_runs (habit_id, start_period, end_period, start_day, end_day)
+    {_MIGRATION_RUNS_CTE}
+    SELECT habit_id, start_period, end_period, first_day, last_day FROM run_lengths
+    """)
+
+
+def _migration_8_completion_bitmaps(cursor):
+    """ adds one bitmap of completed days per habit and year and fills it from the existing completions """
+    cursor.execute("""
+    CREATE TABLE IF NOT EXISTS habit_completion_bitmaps (
+        habit_id INTEGER NOT NULL,
+        year INTEGER NOT NULL,
+        bits BLOB NOT NULL,
+        PRIMARY KEY (habit_id, year),
+        FOREIGN KEY (habit_id) REFERENCES habits(id) ON DELETE CASCADE
+    ) WITHOUT ROWID
+    """)
+    cursor.execute("DELETE FROM habit_completion_bitmaps")
+
+    # frozen bitmap layout of this schema version: 46 bytes per year, bit n is day n of the year (January 1st is 0)
+    bitmaps = {}
+    cursor.execute("""
+    SELECT d.habit_id, d.completed_day FROM (
+        SELECT habit_id, completed_day FROM habit_completions
+        UNION
+        SELECT habit_id, completed_day FROM habit_completion_rollups
+    ) d
+    JOIN habits h ON h.id = d.habit_id
+    """)
+    for habit_id, day in cursor.fetchall():
+        year = date.fromordinal(day).year
+        offset = day - date(year, 1, 1).toordinal()
+        bits = bitmaps.setdefault((habit_id, year), bytearray(46))
+        bits[offset // 8] |= 1 << (offset % 8)
+    cursor.executemany("""
+    INSERT INTO habit_completion_bitmaps (habit_id, year, bits) VALUES (?, ?, ?)
+    """, [(habit_id, year, bytes(bits)) for (habit_id, year), bits in bitmaps.items()])
+
+
+def _migration_9_last_completed_at(cursor):
+    """ keeps the newest completion time in the streak summary, so status checks need no completion reads """
+    cursor.execute("ALTER TABLE habit_streaks ADD COLUMN last_completed_at INTEGER")
+    cursor.execute("""
+    UPDATE habit_streaks SET last_completed_at = (
+        SELECT MAX(completed_at) FROM habit_completions c WHERE c.habit_id = habit_streaks.habit_id
+    )
+    """)
+
+
+# Ordered list of schema migrations, the position in the list (starting at 1) is the schema version
+MIGRATIONS = [
+    _migration_1_create_tables,
+    _migration_2_add_indexes,
+    _migration_3_integer_timestamps,
+    _migration_4_completion_rollups,
+    _migration_5_streak_summary,
+    _migration_6_rebuild_week_53_streaks,
+    _migration_7_streak_runs,
+    _migration_8_completion_bitmaps,
+    _migration_9_last_completed_at,
+]
+
+
+def get_schema_version(conn) -> int:
+    """ reads the schema version stored in PRAGMA user_version """
+    return conn.execute("PRAGMA user_version").fetchone()[0]
+
+
+def migrate(conn):
+    """"
+        Desc: Runs every migration newer than the stored schema version, each one in its own transaction
+        Args: sqlite3 connection
+        Returns: schema version after migrating (int)
+    """
+    version = get_schema_version(conn)
+
+    # tables are rebuilt by some migrations, dropping a parent table must not cascade into its children
+    conn.execute("PRAGMA foreign_keys=OFF")
+    try:
+        for target, migration in enumerate(MIGRATIONS, start=1):
+            if target <= version:
+                continue
+            cursor = conn.cursor()
+            cursor.execute("BEGIN")
+            try:
+                migration(cursor)
+                cursor.execute(f"PRAGMA user_version = {target}")
+                conn.commit()
+            except Exception:
+                conn.rollback()
+                raise
+            version = target
+    finally:
+        conn.execute("PRAGMA foreign_keys=ON")
+    return version
+
+
+def init_db(path: str = None):
+    """ initializes the database (optionally at another path or ":memory:") by creating the tables and migrating them to the latest schema version """
+    if path is not None:
+        set_database(path)
+    migrate(get_connection())
@@ -1,11 +1,25 @@
 from db.database import get_connection
+from db.timestamps import to_epoch, to_day, from_epoch
+from db import habit_streak_repository, completion_bitmap_repository
 from datetime import datetime
-from typing import List
+from itertools import groupby, islice
+from operator import itemgetter
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+# Number of rows handed to executemany at once by complete_habits_bulk
+BULK_CHUNK_SIZE = 1000
+
+# Number of rows pulled per fetchmany call by iter_completions
+FETCH_BATCH_SIZE = 500
+
+# Maximum number of habit IDs bound into one "IN (...)" list, stays below SQLite's variable limit
+MAX_IDS_PER_QUERY = 500
 
 
 def complete_habit(habit_id: int, timestamp: datetime = None):
     """" 
         Desc: Executes SQL command to add today as a completion for a specific habit (checks-off)
+              and updates its streak summary and completion bitmap in the same transaction
         Args: ID of habit, timestamp (today)
         Returns: /
     """
@@ -13,24 +27,208 @@ def complete_habit(habit_id: int, timestamp: datetime = None):
     with get_connection() as conn:
         cursor = conn.cursor()
         cursor.execute("""
-        INSERT INTO habit_completions (habit_id, completed_at)
-        VALUES (?, ?)
-        """, (habit_id, timestamp.isoformat()))
+        INSERT INTO habit_completions (habit_id, completed_at, completed_day)
+        VALUES (?, ?, ?)
+        """, (habit_id, to_epoch(timestamp), to_day(timestamp)))
+        habit_streak_repository.apply_completions(cursor, {habit_id: [to_day(timestamp)]})
+        habit_streak_repository.record_completed_at(cursor, {habit_id: to_epoch(timestamp)})
+        completion_bitmap_repository.add_days(cursor, {habit_id: [to_day(timestamp)]})
         conn.commit()
 
 
-def get_completions(habit_id: int) -> List[datetime]:
-    """" 
-        Desc: Executes SQL command to get all completions for a specific habit
-        Args: ID of habit
-        Returns: List of datetimes
+def complete_habits_bulk(completions: Iterable[Tuple[int, datetime]], chunk_size: int = BULK_CHUNK_SIZE) -> int:
+    """"
+        Desc: Inserts many completions in one transaction, streaming them through executemany in chunks,
+              and updates the streak summaries and bitmaps of the affected habits chunk by chunk in the same
+              transaction, so memory stays bounded by the chunk size
+        Args: iterable of (ID of habit, timestamp) tuples, number of rows per executemany call
+        Returns: number of inserted completions (int)
     """
+    rows = ((habit_id, to_epoch(timestamp), to_day(timestamp)) for habit_id, timestamp in completions)
+    # habits with backdated completions, rebuilt once from all their rows after the last chunk
+    rebuild_ids = set()
+    inserted = 0
     with get_connection() as conn:
         cursor = conn.cursor()
+        while True:
+            chunk = list(islice(rows, chunk_size))
+            if not chunk:
+                break
+            cursor.executemany("""
+            INSERT INTO habit_completions (habit_id, completed_at, completed_day)
+            VALUES (?, ?, ?)
+            """, chunk)
+            new_days = {}
+            newest = {}
+            for habit_id, completed_at, day in chunk:
+                new_days.setdefault(habit_id, []).append(day)
+                newest[habit_id] = max(newest.get(habit_id, completed_at), completed_at)
+            habit_streak_repository.apply_completions(
+                cursor, {habit_id: days for habit_id, days in new_days.items() if habit_id not in rebuild_ids}, rebuild_ids
+            )
+            habit_streak_repository.record_completed_at(cursor, newest)
+            completion_bitmap_repository.add_days(cursor, new_days)
+            inserted += len(chunk)
+        if rebuild_ids:
+            habit_streak_repository.rebuild(cursor, rebuild_ids)
+        conn.commit()
+    return inserted
+
+
+def get_completions(habit_id: int, since: datetime = None, until: datetime = None,
+                    limit: int = None, newest_first: bool = False) -> List[datetime]:
+    """" 
+        Desc: Executes SQL command to get the completions for a specific habit, optionally only a time window of them
+        Args: ID of habit, since (inclusive) and until (exclusive) datetimes, maximum number of rows,
+              newest_first to read from the newest completion backwards (combined with limit: the newest rows)
+        Returns: List of datetimes, oldest first unless newest_first is set
+    """
+    rows = _read_completions("completed_at", habit_id, since, until, limit, newest_first)
+    return [from_epoch(row[0]) for row in rows]
+
+
+def iter_completions(habit_id: int, batch_size: int = FETCH_BATCH_SIZE) -> Iterator[datetime]:
+    """" 
+        Desc: Streams the completions of a specific habit, pulling rows in batches so memory stays bounded by the batch size
+        Args: ID of habit, number of rows per fetchmany call
+        Returns: Generator of datetimes, oldest first
+    """
+    # no "with conn" here: abandoning the generator early must not roll back the shared connection
+    cursor = get_connection().cursor()
+    try:
         cursor.execute("""
         SELECT completed_at FROM habit_completions
         WHERE habit_id = ?
         ORDER BY completed_at ASC
         """, (habit_id,))
-        rows = cursor.fetchall()
-        return [datetime.fromisoformat(row[0]) for row in rows]
+        while True:
+            rows = cursor.fetchmany(batch_size)
+            if not rows:
+                break
+            for row in rows:
+                yield from_epoch(row[0])
+    finally:
+        cursor.close()
+
+
+def iter_completion_days(habit_id: Optional[int] = None, batch_size: int = FETCH_BATCH_SIZE) -> Iterator[Tuple[int, int]]:
+    """" 
+        Desc: Streams the day ordinals of the completions of one habit (or of all habits) straight from the covering index
+        Args: optional ID of habit (all habits if omitted), number of rows per fetchmany call
+        Returns: Generator of (habit ID, day ordinal) tuples, ordered by habit and oldest first
+    """
+    # no "with conn" here: abandoning the generator early must not roll back the shared connection
+    cursor = get_connection().cursor()
+    try:
+        cursor.execute(f"""
+        SELECT habit_id, completed_day FROM habit_completions
+        {"WHERE habit_id = ?" if habit_id is not None else ""}
+        ORDER BY habit_id ASC, completed_at ASC
+        """, () if habit_id is None else (habit_id,))
+        while True:
+            rows = cursor.fetchmany(batch_size)
+            if not rows:
+                break
+            yield from rows
+    finally:
+        cursor.close()
+
+
+def get_completion_days(habit_id: int, since: datetime = None, until: datetime = None,
+                        limit: int = None, newest_first: bool = False) -> List[int]:
+    """"
+        Desc: Fast path for analytics, reads the stored local day ordinals of the completions without building datetimes
+        Args: same filters as get_completions
+        Returns: List of day ordinals (int), oldest first unless newest_first is set
+    """
+    rows = _read_completions("completed_day", habit_id, since, until, limit, newest_first)
+    return [row[0] for row in rows]
+
+
+def _read_completions(column: str, habit_id: int, since: Optional[datetime], until: Optional[datetime],
+                      limit: Optional[int], newest_first: bool) -> list:
+    """ Reads one completion column of a habit within the optional time window via the composite index """
+    conditions = ["habit_id = ?"]
+    params = [habit_id]
+    if since is not None:
+        conditions.append("completed_at >= ?")
+        params.append(to_epoch(since))
+    if until is not None:
+        conditions.append("completed_at < ?")
+        params.append(to_epoch(until))
+    limit_clause = ""
+    if limit is not None:
+        limit_clause = "LIMIT ?"
+        params.append(limit)
+
+    with get_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute(f"""
+        SELECT {column} FROM habit_completions
+        WHERE {" AND ".join(conditions)}
+        ORDER BY completed_at {"DESC" if newest_first else "ASC"}
+        {limit_clause}
+        """, params)
+        return cursor.fetchall()
+
+
+def get_completions_grouped(habit_ids: Optional[Iterable[int]] = None, limit: int = None,
+                            newest_first: bool = False) -> Dict[int, List[datetime]]:
+    """"
+        Desc: Reads the completions of all habits (or of the given habits) with one ordered query
+        Args: optional IDs of habits (all habits if omitted), optional maximum number of rows per habit,
+              newest_first to take the newest rows per habit when a limit is set
+        Returns: Dictionary of habit ID (int) and list of datetimes, oldest first; habits without completions are missing
+    """
+    return {
+        habit_id: [from_epoch(completed_at) for completed_at in values]
+        for habit_id, values in _read_grouped("completed_at", habit_ids, limit, newest_first).items()
+    }
+
+
+def get_completion_days_grouped(habit_ids: Optional[Iterable[int]] = None, limit: int = None,
+                                newest_first: bool = False) -> Dict[int, List[int]]:
+    """"
+        Desc: Fast path for analytics, reads the day ordinals of all habits (or of the given habits) with one ordered query
+        Args: same filters as get_completions_grouped
+        Returns: Dictionary of habit ID (int) and list of day ordinals, oldest first; habits without completions are missing
+    """
+    return _read_grouped("completed_day", habit_ids, limit, newest_first)
+
+
+def _read_grouped(column: str, habit_ids: Optional[Iterable[int]], limit: Optional[int] = None,
+                  newest_first: bool = False) -> Dict[int, list]:
+    """ Reads one completion column ordered by habit and time and groups it by habit ID """
+    if habit_ids is None:
+        filters = [("", [])]
+    else:
+        ids = sorted(set(habit_ids))
+        chunks = [ids[i:i + MAX_IDS_PER_QUERY] for i in range(0, len(ids), MAX_IDS_PER_QUERY)]
+        filters = [(f"IN ({', '.join('?' * len(chunk))})", chunk) for chunk in chunks]
+
+    grouped = {}
+    with get_connection() as conn:
+        cursor = conn.cursor()
+        for id_filter, params in filters:
+            if limit is None:
+                cursor.execute(f"""
+                SELECT habit_id, {column} FROM habit_completions
+                {"WHERE habit_id " + id_filter if id_filter else ""}
+                ORDER BY habit_id ASC, completed_at ASC
+                """, params)
+            else:
+                # one index seek per habit that picks its first/newest rows
+                cursor.execute(f"""
+                SELECT h.id, c.{column} FROM habits h
+                JOIN habit_completions c ON c.id IN (
+                    SELECT id FROM habit_completions
+                    WHERE habit_id = h.id
+                    ORDER BY completed_at {"DESC" if newest_first else "ASC"}
+                    LIMIT ?
+                )
+                {"WHERE h.id " + id_filter if id_filter else ""}
+                ORDER BY h.id ASC, c.completed_at ASC
+                """, [limit, *params])
+            for habit_id, rows in groupby(cursor, key=itemgetter(0)):
+                grouped[habit_id] = [row[1] for row in rows]
+    return grouped
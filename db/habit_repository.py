@@ -1,6 +1,14 @@
 from db.database import get_connection
+from db.timestamps import to_epoch, from_epoch
+from db import habit_streak_repository
 from models.habit import Habit, Frequency
-from datetime import datetime
+from typing import Iterable, Iterator, List, Optional, Set
+
+# Number of rows pulled per fetchmany call by the iter_* generators
+FETCH_BATCH_SIZE = 500
+
+# Maximum number of habit IDs bound into one "IN (...)" list, stays below SQLite's variable limit
+MAX_IDS_PER_QUERY = 500
 
 
 def insert_habit(habit: Habit):
@@ -18,7 +26,7 @@ def insert_habit(habit: Habit):
             habit.title,
             habit.description,
             habit.frequency.value,
-            habit.created_at.isoformat()
+            to_epoch(habit.created_at)
         ))
         conn.commit()
         return cursor.lastrowid
@@ -50,6 +58,26 @@ def get_all_habits():
         return [_row_to_habit(row) for row in rows]
     
 
+def iter_habits(batch_size: int = FETCH_BATCH_SIZE) -> Iterator[Habit]:
+    """" 
+        Desc: Streams all habits, pulling rows in batches so memory stays bounded by the batch size
+        Args: number of rows per fetchmany call
+        Returns: Generator of Habit objects
+    """
+    # no "with conn" here: abandoning the generator early must not roll back the shared connection
+    cursor = get_connection().cursor()
+    try:
+        cursor.execute("SELECT * FROM habits")
+        while True:
+            rows = cursor.fetchmany(batch_size)
+            if not rows:
+                break
+            for row in rows:
+                yield _row_to_habit(row)
+    finally:
+        cursor.close()
+
+
 def get_habits_by_frequency(frequency: Frequency):
     """" 
         Desc: Executes SQL command to read all habits filtered by frequency
@@ -65,12 +93,14 @@ def get_habits_by_frequency(frequency: Frequency):
 
 def update_habit(id: int, habit: Habit):
     """" 
-        Desc: Executes SQL command to update existing habit
+        Desc: Executes SQL command to update existing habit, the streak summary is rebuilt if the frequency changed
         Args: ID of habit, updated habit object
         Returns: /
     """
     with get_connection() as conn:
         cursor = conn.cursor()
+        cursor.execute("SELECT frequency FROM habits WHERE id = ?", (id,))
+        previous = cursor.fetchone()
         cursor.execute("""
             UPDATE habits SET title=?, description=?, frequency=?, created_at=?
             WHERE id=?
@@ -78,11 +108,14 @@ def update_habit(id: int, habit: Habit):
             habit.title,
             habit.description,
             habit.frequency.value,
-            habit.created_at.isoformat(),
+            to_epoch(habit.created_at),
             id
         ))
+        updated = cursor.rowcount > 0
+        if previous and previous[0] != habit.frequency.value:
+            habit_streak_repository.rebuild(cursor, [id])
         conn.commit()
-        return cursor.rowcount > 0
+        return updated
 
 
 def delete_habit(id: int):
@@ -108,6 +141,46 @@ def delete_all_habits():
         cursor.execute("DELETE FROM habits")
         conn.commit()
 
+def get_existing_ids(habit_ids: Iterable[int]) -> Set[int]:
+    """" 
+        Desc: Checks which of the given habits still exist, with primary key lookups in chunks
+        Args: IDs of habits
+        Returns: Set of the IDs that exist
+    """
+    existing = set()
+    with get_connection() as conn:
+        cursor = conn.cursor()
+        ids = sorted(set(habit_ids))
+        for i in range(0, len(ids), MAX_IDS_PER_QUERY):
+            chunk = ids[i:i + MAX_IDS_PER_QUERY]
+            cursor.execute(f"SELECT id FROM habits WHERE id IN ({', '.join('?' * len(chunk))})", chunk)
+            existing.update(row[0] for row in cursor)
+    return existing
+
+
+def get_habits_with_streaks(habit_id: Optional[int] = None) -> List[tuple]:
+    """" 
+        Desc: Reads habits together with their streak summary (which keeps the first/last completion) in one
+              query over habits, no completion is read
+        Args: optional ID of habit (all habits if omitted)
+        Returns: List of (Habit, first day, last day, current streak, longest streak, last completion datetime),
+                 the summary values are None for habits without completions
+    """
+    with get_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute(f"""
+            SELECT h.id, h.title, h.description, h.frequency, h.created_at,
+                s.first_day, s.last_day, s.current_streak, s.longest_streak, s.last_completed_at
+            FROM habits h LEFT JOIN habit_streaks s ON s.habit_id = h.id
+            {"WHERE h.id = ?" if habit_id is not None else ""}
+            ORDER BY h.id
+        """, () if habit_id is None else (habit_id,))
+        return [
+            (_row_to_habit(row), *row[5:9], from_epoch(row[9]) if row[9] is not None else None)
+            for row in cursor.fetchall()
+        ]
+
+
 def _row_to_habit(row):
     """ Maps SQLite row to Habit object """
     return Habit(
@@ -115,5 +188,5 @@ def _row_to_habit(row):
         title=row[1],
         description=row[2],
         frequency=Frequency(row[3]),
-        created_at=datetime.fromisoformat(row[4])
+        created_at=from_epoch(row[4])
     )
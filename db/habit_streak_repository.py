@@ -0,0 +1,312 @@
+from db.database import get_connection
+from models.habit import Frequency
+from models.streaks import get_period
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+# Maximum number of habit IDs bound into one "IN (...)" list, stays below SQLite's variable limit
+MAX_IDS_PER_QUERY = 500
+
+
+def apply_completions(cursor, days_by_habit: Dict[int, List[int]], deferred: Optional[Set[int]] = None):
+    """" 
+        Desc: Updates the streak summary and run index of habits for newly inserted completions, inside the caller's transaction.
+              Completions at or after the last completed day are folded in incrementally, older (backdated)
+              completions trigger a rebuild of the habit from its history
+        Args: cursor of the open transaction, Dictionary of habit ID and the day ordinals of its new completions,
+              optional set that collects the habits to rebuild instead of rebuilding them here (the caller does)
+        Returns: /
+    """
+    rebuild_ids = []
+    for habit_id, days in days_by_habit.items():
+        row = cursor.execute("""
+            SELECT h.frequency, s.first_day, s.last_day, s.current_streak, s.longest_streak
+            FROM habits h LEFT JOIN habit_streaks s ON s.habit_id = h.id
+            WHERE h.id = ?
+        """, (habit_id,)).fetchone()
+        if row is None:
+            continue
+
+        days = sorted(days)
+        frequency = Frequency(row[0])
+        first_day, last_day, current, longest = row[1:]
+        if first_day is None:
+            first_day = last_day = days[0]
+            current = longest = 1
+            period = get_period(first_day, frequency, first_day)
+            runs = [[period, period, first_day, first_day]]
+        elif days[0] < last_day:
+            rebuild_ids.append(habit_id)
+            continue
+        else:
+            # the newest run is already stored, its start day is not needed to extend it
+            period = get_period(last_day, frequency, first_day)
+            runs = [[period - current + 1, period, None, last_day]]
+
+        for day in days:
+            last_period, period = get_period(last_day, frequency, first_day), get_period(day, frequency, first_day)
+            if period - last_period == 1:
+                current += 1
+                runs[-1][1] = period
+            elif period != last_period:
+                current = 1
+                runs.append([period, period, day, day])
+            longest = max(longest, current)
+            runs[-1][3] = day
+            last_day = day
+        _save(cursor, habit_id, first_day, last_day, current, longest)
+        _save_runs(cursor, habit_id, runs)
+
+    if deferred is not None:
+        deferred.update(rebuild_ids)
+    elif rebuild_ids:
+        rebuild(cursor, rebuild_ids)
+
+
+# Offset between a day ordinal and the Julian day number SQLite's date functions work with
+JULIAN_DAY_OFFSET = 1721424.5
+
+# Gaps-and-islands over the hot and archived completion days: every day is mapped to its period ordinal
+# (models.streaks.get_period), repeated periods are collapsed, LAG() flags the periods that do not follow their
+# predecessor and the running sum of those flags numbers the runs of consecutive periods
+RUNS_QUERY = f"""
+    WITH days AS (
+        SELECT habit_id, completed_day AS day FROM habit_completions {{where}}
+        UNION ALL
+        SELECT habit_id, completed_day FROM habit_completion_rollups {{where}}
+    ),
+    keyed AS (
+        SELECT d.habit_id, d.day,
+            CASE h.frequency
+                WHEN 'daily' THEN d.day
+                WHEN 'weekly' THEN (d.day - 1) / 7
+                WHEN 'biweekly' THEN (d.day - MIN(d.day) OVER (PARTITION BY d.habit_id)) / 14
+                WHEN 'monthly' THEN
+                    CAST(strftime('%Y', d.day + {JULIAN_DAY_OFFSET}) AS INTEGER) * 12
+                    + CAST(strftime('%m', d.day + {JULIAN_DAY_OFFSET}) AS INTEGER) - 1
+            END AS period
+        FROM days d JOIN habits h ON h.id = d.habit_id
+    ),
+    periods AS (
+        SELECT habit_id, period, MIN(day) AS first_day, MAX(day) AS last_day,
+            LAG(period) OVER (PARTITION BY habit_id ORDER BY period) AS previous
+        FROM keyed
+        GROUP BY habit_id, period
+    ),
+    runs AS (
+        SELECT habit_id, period, first_day, last_day,
+            SUM(previous IS NULL OR period != previous + 1) OVER (PARTITION BY habit_id ORDER BY period) AS run
+        FROM periods
+    ),
+    run_lengths AS (
+        SELECT habit_id, run, COUNT(*) AS length, MIN(period) AS start_period, MAX(period) AS end_period,
+            MIN(first_day) AS first_day, MAX(last_day) AS last_day
+        FROM runs
+        GROUP BY habit_id, run
+    )
+"""
+
+# Current streak (newest run, picked with ROW_NUMBER()) and longest streak per habit on top of RUNS_QUERY
+STREAKS_QUERY = RUNS_QUERY + """,
+    ranked AS (
+        SELECT habit_id, length,
+            MIN(first_day) OVER (PARTITION BY habit_id) AS first_day,
+            MAX(last_day) OVER (PARTITION BY habit_id) AS last_day,
+            MAX(length) OVER (PARTITION BY habit_id) AS longest,
+            ROW_NUMBER() OVER (PARTITION BY habit_id ORDER BY run DESC) AS newest
+        FROM run_lengths
+    )
+    SELECT habit_id, first_day, last_day, length, longest FROM ranked WHERE newest = 1
+"""
+
+
+def _id_filters(habit_ids: Optional[Iterable[int]]) -> List[Tuple[str, list]]:
+    """ Splits habit IDs into "IN (...)" filters of at most MAX_IDS_PER_QUERY IDs, one empty filter for all habits """
+    if habit_ids is None:
+        return [("", [])]
+    ids = sorted(set(habit_ids))
+    chunks = [ids[i:i + MAX_IDS_PER_QUERY] for i in range(0, len(ids), MAX_IDS_PER_QUERY)]
+    return [(f"IN ({', '.join('?' * len(chunk))})", chunk) for chunk in chunks]
+
+
+def rebuild(cursor, habit_ids: Optional[Iterable[int]] = None):
+    """" 
+        Desc: Recalculates the streak summary and the run index of habits from their hot and archived completions
+              with window-function queries per chunk of habits, inside the caller's transaction
+        Args: cursor of the open transaction, optional IDs of habits (all habits if omitted)
+        Returns: /
+    """
+    rebuild_summary(cursor, habit_ids)
+    for id_filter, params in _id_filters(habit_ids):
+        where = f"WHERE habit_id {id_filter}" if id_filter else ""
+        cursor.execute(f"DELETE FROM habit_streak_runs {where}", params)
+        cursor.execute(f"""
+            INSERT INTO habit_streak_runs (habit_id, start_period, end_period, start_day, end_day)
+            {RUNS_QUERY.format(where=where)}
+            SELECT habit_id, start_period, end_period, first_day, last_day FROM run_lengths
+        """, params + params)
+
+
+def rebuild_summary(cursor, habit_ids: Optional[Iterable[int]] = None):
+    """" 
+        Desc: Recalculates only the streak summary of habits (see rebuild), inside the caller's transaction
+        Args: cursor of the open transaction, optional IDs of habits (all habits if omitted)
+        Returns: /
+    """
+    for id_filter, params in _id_filters(habit_ids):
+        where = f"WHERE habit_id {id_filter}" if id_filter else ""
+        # upserted instead of replaced, columns maintained elsewhere (last_completed_at) are kept
+        cursor.execute(f"""
+            INSERT INTO habit_streaks (habit_id, first_day, last_day, current_streak, longest_streak)
+            {STREAKS_QUERY.format(where=where)}
+            ON CONFLICT (habit_id) DO UPDATE SET
+                first_day = excluded.first_day, last_day = excluded.last_day,
+                current_streak = excluded.current_streak, longest_streak = excluded.longest_streak
+        """, params + params)
+        # habits without completions keep no summary row, the correlated lookups only touch the habit_id indexes
+        cursor.execute(f"""
+            DELETE FROM habit_streaks
+            WHERE {"habit_id " + id_filter + " AND" if id_filter else ""}
+                NOT EXISTS (SELECT 1 FROM habit_completions c WHERE c.habit_id = habit_streaks.habit_id)
+                AND NOT EXISTS (SELECT 1 FROM habit_completion_rollups r WHERE r.habit_id = habit_streaks.habit_id)
+        """, params)
+
+
+def record_completed_at(cursor, completed_at_by_habit: Dict[int, int]):
+    """" 
+        Desc: Keeps the newest completion time of habits in their summary row, inside the caller's transaction
+              (after apply_completions, which creates the row)
+        Args: cursor of the open transaction, Dictionary of habit ID and the newest epoch seconds of its new completions
+        Returns: /
+    """
+    cursor.executemany("""
+        UPDATE habit_streaks SET last_completed_at = MAX(COALESCE(last_completed_at, 0), ?)
+        WHERE habit_id = ?
+    """, [(completed_at, habit_id) for habit_id, completed_at in completed_at_by_habit.items()])
+
+
+def calculate_streaks(habit_ids: Optional[Iterable[int]] = None) -> Dict[int, Tuple[int, int]]:
+    """" 
+        Desc: Calculates the current and longest streak of habits inside SQLite without reading their completions
+              into Python, independent of the stored summary
+        Args: optional IDs of habits (all habits if omitted)
+        Returns: Dictionary of habit ID (int) and (current streak, longest streak), habits without completions are missing
+    """
+    streaks = {}
+    with get_connection() as conn:
+        cursor = conn.cursor()
+        for id_filter, params in _id_filters(habit_ids):
+            where = f"WHERE habit_id {id_filter}" if id_filter else ""
+            cursor.execute(STREAKS_QUERY.format(where=where), params + params)
+            streaks.update((habit_id, (current, longest)) for habit_id, _, _, current, longest in cursor.fetchall())
+    return streaks
+
+
+def rebuild_all():
+    """" 
+        Desc: Recovery: recalculates the streak summary of every habit from its completions
+        Args: /
+        Returns: /
+    """
+    with get_connection() as conn:
+        rebuild(conn.cursor())
+        conn.commit()
+
+
+def get_streaks() -> Dict[int, Tuple[int, int]]:
+    """" 
+        Desc: Reads the current and longest streak of every habit with one query
+        Args: /
+        Returns: Dictionary of habit ID (int) and (current streak, longest streak), 0 for habits without completions
+    """
+    with get_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute("""
+        SELECT h.id, COALESCE(s.current_streak, 0), COALESCE(s.longest_streak, 0)
+        FROM habits h LEFT JOIN habit_streaks s ON s.habit_id = h.id
+        ORDER BY h.id
+        """)
+        return {habit_id: (current, longest) for habit_id, current, longest in cursor.fetchall()}
+
+
+def get_streak(habit_id: int) -> Optional[Tuple[int, int]]:
+    """" 
+        Desc: Reads the current and longest streak of one habit
+        Args: ID of habit
+        Returns: (current streak, longest streak), None if the habit does not exist
+    """
+    with get_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute("""
+        SELECT COALESCE(s.current_streak, 0), COALESCE(s.longest_streak, 0)
+        FROM habits h LEFT JOIN habit_streaks s ON s.habit_id = h.id
+        WHERE h.id = ?
+        """, (habit_id,))
+        return cursor.fetchone()
+
+
+def get_run_index(habit_id: int) -> Optional[Tuple[Frequency, Optional[int], List[Tuple[int, int, int, int]]]]:
+    """" 
+        Desc: Reads the runs of consecutive periods of a habit, everything as-of and date-range streaks need
+        Args: ID of habit
+        Returns: (frequency, first completion day or None, list of (start period, end period, start day, end day)
+                 ordered by period), None if the habit does not exist
+    """
+    with get_connection() as conn:
+        cursor = conn.cursor()
+        row = cursor.execute("""
+        SELECT h.frequency, s.first_day
+        FROM habits h LEFT JOIN habit_streaks s ON s.habit_id = h.id
+        WHERE h.id = ?
+        """, (habit_id,)).fetchone()
+        if row is None:
+            return None
+        cursor.execute("""
+        SELECT start_period, end_period, start_day, end_day FROM habit_streak_runs
+        WHERE habit_id = ?
+        ORDER BY start_period ASC
+        """, (habit_id,))
+        return Frequency(row[0]), row[1], cursor.fetchall()
+
+
+def has_completion_between(habit_id: int, first_day: int, last_day: int) -> bool:
+    """"
+        Desc: Checks if a habit has a hot or archived completion within a range of days, used to clip the boundary
+              periods of the run index (which only keeps the first and last day of every run)
+        Args: ID of habit, first and last day ordinal of the range (inclusive)
+        Returns: boolean
+    """
+    with get_connection() as conn:
+        row = conn.execute("""
+        SELECT EXISTS (
+            SELECT 1 FROM habit_completions WHERE habit_id = ? AND completed_day BETWEEN ? AND ?
+        ) OR EXISTS (
+            SELECT 1 FROM habit_completion_rollups WHERE habit_id = ? AND completed_day BETWEEN ? AND ?
+        )
+        """, (habit_id, first_day, last_day) * 2).fetchone()
+        return bool(row[0])
+
+
+def _save_runs(cursor, habit_id: int, runs: List[list]):
+    """ Extends the stored newest run (start day None) and inserts the new runs of a habit """
+    for start_period, end_period, start_day, end_day in runs:
+        if start_day is None:
+            cursor.execute("""
+                UPDATE habit_streak_runs SET end_period = ?, end_day = ?
+                WHERE habit_id = ? AND start_period = ?
+            """, (end_period, end_day, habit_id, start_period))
+        else:
+            cursor.execute("""
+                INSERT INTO habit_streak_runs (habit_id, start_period, end_period, start_day, end_day)
+                VALUES (?, ?, ?, ?, ?)
+            """, (habit_id, start_period, end_period, start_day, end_day))
+
+
+def _save(cursor, habit_id: int, first_day: int, last_day: int, current: int, longest: int):
+    """ Inserts or replaces the summary row of a habit """
+    cursor.execute("""
+        INSERT INTO habit_streaks (habit_id, first_day, last_day, current_streak, longest_streak)
+        VALUES (?, ?, ?, ?, ?)
+        ON CONFLICT (habit_id) DO UPDATE SET
+            first_day = excluded.first_day, last_day = excluded.last_day,
+            current_streak = excluded.current_streak, longest_streak = excluded.longest_streak
+    """, (habit_id, first_day, last_day, current, longest))
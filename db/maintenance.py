@@ -0,0 +1,102 @@
+from db.database import get_connection
+
+# Number of orphaned completions deleted per transaction
+ORPHAN_BATCH_SIZE = 5000
+
+AUTO_VACUUM_INCREMENTAL = 2
+
+
+def get_database_size() -> int:
+    """" 
+        Desc: Reads the size of the database in bytes (page count times page size)
+        Args: /
+        Returns: size in bytes (int)
+    """
+    conn = get_connection()
+    page_count = conn.execute("PRAGMA page_count").fetchone()[0]
+    page_size = conn.execute("PRAGMA page_size").fetchone()[0]
+    return page_count * page_size
+
+
+# Tables derived from the completions, keyed by habit_id, that can keep rows of deleted habits as well
+DERIVED_TABLES = ("habit_completion_rollups", "habit_streaks", "habit_streak_runs", "habit_completion_bitmaps")
+
+
+def delete_orphaned_completions(batch_size: int = ORPHAN_BATCH_SIZE) -> int:
+    """" 
+        Desc: Deletes completions whose habit no longer exists (left behind while foreign keys were not enforced),
+              one batch per transaction so writers are never blocked for long. The archived completions, streak
+              summaries, run indexes and bitmaps of those habits are deleted as well
+        Args: number of rows per batch (habits per batch for the derived tables)
+        Returns: number of deleted hot and archived completion rows (int)
+    """
+    deleted = 0
+    with get_connection() as conn:
+        cursor = conn.cursor()
+        while True:
+            cursor.execute("""
+            DELETE FROM habit_completions WHERE id IN (
+                SELECT c.id FROM habit_completions c
+                LEFT JOIN habits h ON h.id = c.habit_id
+                WHERE h.id IS NULL
+                LIMIT ?
+            )
+            """, (batch_size,))
+            conn.commit()
+            deleted += cursor.rowcount
+            if cursor.rowcount < batch_size:
+                break
+
+        for table in DERIVED_TABLES:
+            while True:
+                orphan_ids = [row[0] for row in cursor.execute(f"""
+                SELECT DISTINCT t.habit_id FROM {table} t
+                WHERE NOT EXISTS (SELECT 1 FROM habits h WHERE h.id = t.habit_id)
+                LIMIT ?
+                """, (batch_size,))]
+                if not orphan_ids:
+                    break
+                cursor.execute(f"""
+                DELETE FROM {table} WHERE habit_id IN ({', '.join('?' * len(orphan_ids))})
+                """, orphan_ids)
+                conn.commit()
+                if table == "habit_completion_rollups":
+                    deleted += cursor.rowcount
+    return deleted
+
+
+def reclaim_space():
+    """" 
+        Desc: Returns free pages to the file system. The first run on an older database switches it to
+              incremental auto-vacuum with one full VACUUM, later runs only need PRAGMA incremental_vacuum
+        Args: /
+        Returns: /
+    """
+    conn = get_connection()
+    if conn.execute("PRAGMA auto_vacuum").fetchone()[0] != AUTO_VACUUM_INCREMENTAL:
+        conn.execute("PRAGMA auto_vacuum=INCREMENTAL")
+        conn.execute("VACUUM")
+    else:
+        # execute() steps the pragma only once and frees a single page, executescript runs it to the end
+        conn.executescript("PRAGMA incremental_vacuum;")
+
+
+def run_maintenance(batch_size: int = ORPHAN_BATCH_SIZE) -> dict:
+    """" 
+        Desc: Removes orphaned completions, reclaims the freed space and refreshes the query planner statistics
+        Args: number of rows per orphan batch
+        Returns: Dictionary with the number of deleted orphans, the database size before and after and the
+                 reclaimed bytes (never negative, the first run can grow the file by the pointer-map pages that
+                 incremental auto-vacuum needs)
+    """
+    size_before = get_database_size()
+    orphans = delete_orphaned_completions(batch_size)
+    reclaim_space()
+    size_after = get_database_size()
+    get_connection().execute("ANALYZE")
+    return {
+        "orphans_deleted": orphans,
+        "size_before": size_before,
+        "size_after": size_after,
+        "bytes_reclaimed": max(size_before - size_after, 0),
+    }
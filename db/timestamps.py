@@ -0,0 +1,32 @@
+from datetime import datetime
+
+
+def to_epoch(timestamp: datetime) -> int:
+    """ converts a datetime (naive datetimes are local time) into whole epoch seconds, fractions of a second
+        are not stored, so values read back are truncated to the second """
+    return int(timestamp.replace(microsecond=0).timestamp())
+
+
+def to_day(timestamp: datetime) -> int:
+    """ converts a datetime into the ordinal of its local calendar day (date.toordinal), timezone-aware datetimes
+        are moved into local time first so the day matches the datetime from_epoch returns """
+    if timestamp.tzinfo is not None:
+        timestamp = timestamp.astimezone()
+    return timestamp.toordinal()
+
+
+def from_epoch(value) -> datetime:
+    """ converts a stored timestamp back into a local datetime, ISO TEXT values of older databases are parsed as well """
+    if isinstance(value, str):
+        return datetime.fromisoformat(value)
+    return datetime.fromtimestamp(value)
+
+
+def iso_to_epoch(value) -> int:
+    """ converts an ISO TEXT timestamp into epoch seconds (used to migrate old databases) """
+    return value if isinstance(value, int) else to_epoch(datetime.fromisoformat(value))
+
+
+def iso_to_day(value) -> int:
+    """ converts an ISO TEXT timestamp into its local day ordinal (used to migrate old databases) """
+    return to_day(from_epoch(value))
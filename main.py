@@ -5,12 +5,12 @@ from datetime import datetime
 import time
 from scripts.seed_fixtures import create_sample_habits, seed_sample_completions
 from scripts.clear_db import reset
+from scripts import maintenance, archive_history
 
 # Habit functions
 def get_all_habits_cli():
     """ prints all habits """
-    habits = habit_controller.get_all_habits()
-    for habit in habits:
+    for habit in habit_controller.iter_habits():
         print(habit)
 
 
@@ -108,6 +108,16 @@ def delete_habit_cli():
 def reset_db():
     """ executes script to delete all entries from the database """
     reset()
+
+
+def run_maintenance_cli():
+    """ executes script to clean up and shrink the database """
+    maintenance.run()
+
+
+def archive_history_cli():
+    """ executes script to archive old completions into daily rollups """
+    archive_history.run()
     
 
 # Analytics functions
@@ -156,12 +166,21 @@ def show_longest_streak_for_habit_cli():
         print(f"Habit ID {habit_id} not found.")
   
 
+def show_completion_rates_cli():
+    """ prints the share of completed periods over the last 7/30/90/365 periods for all habits """
+    rates = analytics_controller.get_completion_rates()
+    for habit_id, data in rates.items():
+        windows = ", ".join(f"last {window}: {rate:.0%}" for window, rate in data["rates"].items())
+        print(f"{data['title']} [ID {habit_id}]: completion rate → {windows}")
+
+
 def view_completions_cli():
     """ prints dates of completions for a specific habit """
     habit_id = int(input("Habit ID to view completions: "))
-    completions = habit_completion_controller.get_completions(habit_id)
     print(f"Completions for Habit {habit_id}:")
-    for dt in completions:
+    for day, count in habit_completion_controller.get_archived_completions(habit_id):
+        print("-", day.strftime("%Y-%m-%d"), f"(archived, {count}x)")
+    for dt in habit_completion_controller.iter_completions(habit_id):
         print("-", dt.strftime("%Y-%m-%d %H:%M"))
 
 def show_broken_habits_cli():
@@ -185,6 +204,8 @@ def habits_menu():
         print("5. Delete a habit")
         print("6. Update a habit")
         print("7. Reset DB")
+        print("8. Run DB maintenance")
+        print("9. Archive old completions")
         print("X. Back to main menu")
 
         choice = input("\nEnter your choice: ").strip().lower()
@@ -203,6 +224,10 @@ def habits_menu():
             update_habit_cli()
         elif choice == "7":
             reset_db()
+        elif choice == "8":
+            run_maintenance_cli()
+        elif choice == "9":
+            archive_history_cli()
         elif choice == "x":
             break
         else:
@@ -220,6 +245,7 @@ def streaks_menu():
         print("5. Show longest streak (specific habit)")
         print("6. View completions for a specific habit")
         print("7. Show broken habits")
+        print("8. Show completion rates (all habits)")
         print("X. Back to main menu")
 
         choice = input("\nEnter your choice: ").strip().lower()
@@ -238,6 +264,8 @@ def streaks_menu():
             view_completions_cli()
         elif choice == "7":
             show_broken_habits_cli()
+        elif choice == "8":
+            show_completion_rates_cli()
         elif choice == "x":
             break
         else:
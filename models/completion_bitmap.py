@@ -0,0 +1,81 @@
+from datetime import date
+from typing import Dict, Iterable, Iterator, List, Tuple
+
+# One bit per day of a calendar year (366 bits for leap years), bit n of the bitmap is day n of the year
+BITMAP_BYTES = 46
+
+
+def year_start(year: int) -> int:
+    """ day ordinal of January 1st of a year """
+    return date(year, 1, 1).toordinal()
+
+
+def set_day(bits: bytearray, year: int, day: int):
+    """ marks a day ordinal inside the bitmap of its year """
+    offset = day - year_start(year)
+    bits[offset // 8] |= 1 << (offset % 8)
+
+
+def days_to_bitmaps(days: Iterable[int]) -> Dict[int, bytearray]:
+    """"
+        Desc: Packs day ordinals into one bitmap per calendar year
+        Args: day ordinals (any order, duplicates allowed)
+        Returns: Dictionary of year (int) and bitmap (bytearray of BITMAP_BYTES)
+    """
+    bitmaps = {}
+    for day in days:
+        year = date.fromordinal(day).year
+        if year not in bitmaps:
+            bitmaps[year] = bytearray(BITMAP_BYTES)
+        set_day(bitmaps[year], year, day)
+    return bitmaps
+
+
+def bitmaps_to_int(bitmaps: Iterable[Tuple[int, bytes]]) -> Tuple[int, int]:
+    """"
+        Desc: Joins the yearly bitmaps of a habit into one integer, bit n stands for the day origin + n
+        Args: (year, bitmap) pairs
+        Returns: (origin day ordinal, integer of bits), (0, 0) without bitmaps
+    """
+    bitmaps = sorted(bitmaps)
+    if not bitmaps:
+        return 0, 0
+    origin = year_start(bitmaps[0][0])
+    value = 0
+    for year, bits in bitmaps:
+        value |= int.from_bytes(bits, "little") << (year_start(year) - origin)
+    return origin, value
+
+
+def iter_days(origin: int, value: int) -> Iterator[int]:
+    """ yields the day ordinals of the set bits of a joined bitmap (see bitmaps_to_int), oldest first """
+    while value:
+        lowest = value & -value
+        yield origin + lowest.bit_length() - 1
+        value ^= lowest
+
+
+def year_days(year: int, bits: bytes) -> List[bool]:
+    """ expands the bitmap of a year into one flag per day of that year """
+    length = year_start(year + 1) - year_start(year)
+    value = int.from_bytes(bits, "little")
+    return [bool(value >> offset & 1) for offset in range(length)]
+
+
+def longest_run(value: int) -> int:
+    """ length of the longest run of consecutive set bits, every shift-and removes one bit from each run """
+    length = 0
+    while value:
+        value &= value >> 1
+        length += 1
+    return length
+
+
+def trailing_run(value: int) -> int:
+    """ length of the run of set bits that ends with the highest set bit """
+    if not value:
+        return 0
+    top = value.bit_length()
+    # flip the bits below the top and count how many ones the run has before the first zero
+    inverted = ~value & ((1 << top) - 1)
+    return top - inverted.bit_length()
@@ -0,0 +1,40 @@
+from typing import Iterable, Optional
+
+
+class PeriodCounts:
+    """ Cumulative number of completed periods of one habit, so every window is counted with two lookups """
+
+    def __init__(self, periods: Iterable[int], first_period: int, last_period: int, base_day: Optional[int] = None):
+        self.first_period = first_period
+        self.last_period = last_period
+        self.base_day = base_day    # first completion day, biweekly periods are counted from it
+        completed = [0] * max(last_period - first_period + 1, 0)
+        for period in periods:
+            if first_period <= period <= last_period:
+                completed[period - first_period] = 1
+
+        # prefix[i] is the number of completed periods among the first i periods
+        self.prefix = [0] * (len(completed) + 1)
+        for i, done in enumerate(completed):
+            self.prefix[i + 1] = self.prefix[i] + done
+
+    def count(self, start_period: int, end_period: int) -> int:
+        """ number of completed periods between two period ordinals (inclusive) """
+        start = max(start_period, self.first_period) - self.first_period
+        end = min(end_period, self.last_period) - self.first_period + 1
+        if end <= start:
+            return 0
+        return self.prefix[end] - self.prefix[start]
+
+    def rate(self, length: int, end_period: Optional[int] = None) -> float:
+        """ share of completed periods among the last length periods up to end_period (defaults to the last period),
+            periods before the habit existed are not counted """
+        end_period = self.last_period if end_period is None else end_period
+        return self.rate_between(end_period - length + 1, end_period)
+
+    def rate_between(self, start_period: int, end_period: int) -> float:
+        """ share of completed periods between two period ordinals (inclusive), 0.0 for an empty window """
+        possible = min(end_period, self.last_period) - max(start_period, self.first_period) + 1
+        if possible <= 0:
+            return 0.0
+        return self.count(start_period, end_period) / possible
@@ -0,0 +1,30 @@
+from datetime import datetime
+from typing import Optional
+from models.habit import Habit
+
+
+class HabitStatus:
+    """ Snapshot of all metrics of one habit, calculated together by analytics_service.get_habit_status(es) """
+
+    def __init__(
+        self,
+        habit: Habit,
+        current_streak: int,
+        longest_streak: int,
+        open_today: bool,
+        broken: bool,
+        last_completed: Optional[datetime],
+    ):
+        self.habit = habit
+        self.current_streak = current_streak
+        self.longest_streak = longest_streak
+        self.open_today = open_today
+        self.broken = broken
+        self.last_completed = last_completed
+
+    def __repr__(self):
+        return (
+            f"HabitStatus {self.habit.id}: {self.habit.title}, Current streak: {self.current_streak}, "
+            f"Longest streak: {self.longest_streak}, Open today: {self.open_today}, Broken: {self.broken}, "
+            f"Last completed: {self.last_completed}"
+        )
@@ -0,0 +1,160 @@
+from datetime import date
+from typing import Iterable, List, Optional, Tuple
+from models.habit import Frequency
+
+
+# Helper method
+def get_period(day: int, frequency: Frequency, base_day: Optional[int] = None) -> int:
+    """
+        Desc: Maps a day ordinal to the integer ordinal of its period, consecutive periods differ by exactly 1:
+              the day itself (daily), the absolute ISO week (weekly), the 14-day bucket counted from base_day
+              (biweekly) or year * 12 + month (monthly)
+        Args: day ordinal (int), Frequency object, first completion day of the habit (biweekly only)
+        Returns: period ordinal (int)
+    """
+    if frequency == Frequency.DAILY:
+        return day
+
+    if frequency == Frequency.WEEKLY:
+        # day ordinal 1 (0001-01-01) is a Monday, so every ISO week starts at a multiple of 7 plus 1
+        return (day - 1) // 7
+
+    if frequency == Frequency.BIWEEKLY:
+        return (day - base_day) // 14
+
+    if frequency == Frequency.MONTHLY:
+        period = date.fromordinal(day)
+        return period.year * 12 + period.month - 1
+
+    raise ValueError(f"Unknown frequency: {frequency}")
+
+
+# Helper method
+def get_periods_from_days(days: List[int], frequency: Frequency, base_day: Optional[int] = None) -> List[int]:
+    """
+        Desc: Turns stored day ordinals into period ordinals based on habit frequency (see get_period)
+        Args: List of day ordinals sorted ascending (int), Frequency object,
+              first completion day of the habit for biweekly periods (defaults to days[0])
+        Returns: List of period ordinals (int)
+    """
+    if not days:
+        return []
+
+    if frequency == Frequency.DAILY:
+        return list(days)
+
+    if frequency == Frequency.WEEKLY:
+        return [(day - 1) // 7 for day in days]
+
+    if frequency == Frequency.BIWEEKLY:
+        start_day = days[0] if base_day is None else base_day
+        return [(day - start_day) // 14 for day in days]
+
+    if frequency == Frequency.MONTHLY:
+        return [get_period(day, frequency) for day in days]
+
+    return []
+
+
+# Helper method
+def are_consecutive(previous_period: int, current_period: int, frequency: Frequency = None) -> bool:
+    """
+        Desc: Checks if two period ordinals are consecutive, which holds for every frequency when they differ by 1
+        Args: first period, second later period, frequency (not needed, kept for callers)
+        Returns: boolean if periods are consecutive
+    """
+    return current_period - previous_period == 1
+
+
+def longest_streak_of_periods(periods: List[int], frequency: Frequency = None) -> int:
+    """
+        Desc: Finds the longest run of consecutive period ordinals
+        Args: list of period ordinals, frequency (not needed, kept for callers)
+        Returns: longest streak (int)
+    """
+    periods = sorted(set(periods))
+    if not periods:
+        return 0
+
+    longest = current = 1
+
+    for previous, period in zip(periods, periods[1:]):
+        if period - previous == 1:
+            current += 1
+            if current > longest:
+                longest = current
+        else:
+            current = 1
+
+    return longest
+
+
+def current_streak_of_periods(periods: List[int], frequency: Frequency = None) -> int:
+    """
+        Desc: Counts the run of consecutive period ordinals that ends with the newest period
+        Args: list of period ordinals, frequency (not needed, kept for callers)
+        Returns: current streak (int)
+    """
+    periods = sorted(set(periods))
+    if not periods:
+        return 0
+
+    current_streak = 1
+
+    for i in range(len(periods) - 1, 0, -1):
+        if periods[i] - periods[i - 1] == 1:
+            current_streak += 1
+        else:
+            break
+
+    return current_streak
+
+
+def streaks_of_days(days: Iterable[int], frequency: Frequency, base_day: Optional[int] = None) -> Tuple[int, int]:
+    """
+        Desc: Calculates current and longest streak in a single pass over ascending day ordinals, keeping only the
+              previous period and the running and best counts, so the days can come straight from a database cursor
+        Args: iterable of day ordinals in ascending order, frequency,
+              first completion day of the habit for biweekly periods (defaults to the first day of the iterable)
+        Returns: (current streak, longest streak)
+    """
+    previous = None
+    current = longest = 0
+    for day in days:
+        if frequency == Frequency.DAILY:
+            period = day
+        elif frequency == Frequency.WEEKLY:
+            period = (day - 1) // 7
+        else:
+            if base_day is None:
+                base_day = day
+            period = get_period(day, frequency, base_day)
+
+        if period == previous:
+            continue
+        current = current + 1 if previous is not None and period - previous == 1 else 1
+        if current > longest:
+            longest = current
+        previous = period
+    return current, longest
+
+
+def get_period_start(period: int, frequency: Frequency, base_day: Optional[int] = None) -> int:
+    """
+        Desc: Inverse of get_period, maps a period ordinal back to the day ordinal it starts on
+        Args: period ordinal (int), Frequency object, first completion day of the habit (biweekly only)
+        Returns: day ordinal (int)
+    """
+    if frequency == Frequency.DAILY:
+        return period
+
+    if frequency == Frequency.WEEKLY:
+        return period * 7 + 1
+
+    if frequency == Frequency.BIWEEKLY:
+        return base_day + period * 14
+
+    if frequency == Frequency.MONTHLY:
+        return date(period // 12, period % 12 + 1, 1).toordinal()
+
+    raise ValueError(f"Unknown frequency: {frequency}")
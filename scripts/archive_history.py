@@ -0,0 +1,11 @@
+from services.archive_service import archive_cold_history, ARCHIVE_KEEP_DAYS
+
+def run():
+    """ Archives completions older than a year (and older than the current streak) into daily rollups. """
+    print(f"Do you want to archive completions older than {ARCHIVE_KEEP_DAYS} days? Only the day and the number of completions are kept.")
+    print("y/n")
+
+    response = input().strip()
+    if (response == "y"):
+        archived = archive_cold_history()
+        print(f"{archived} completions archived.")
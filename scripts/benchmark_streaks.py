@@ -0,0 +1,57 @@
+import random
+import time
+from datetime import date, datetime
+from models.habit import Habit, Frequency
+from services import analytics_service, numpy_streak_engine
+
+# Synthetic workload: every habit has five years of history with a few missed periods
+HABIT_COUNT = 10_000
+YEARS = 5
+MISS_RATE = 0.05
+
+PERIOD_DAYS = {Frequency.DAILY: 1, Frequency.WEEKLY: 7, Frequency.BIWEEKLY: 14, Frequency.MONTHLY: 30}
+
+
+def generate_workload(habit_count: int = HABIT_COUNT, years: int = YEARS, seed: int = 0):
+    """ builds habits (all frequencies in turn) and their completion day ordinals without touching the database """
+    rng = random.Random(seed)
+    frequencies = list(Frequency)
+    last_day = date.today().toordinal()
+    first_day = last_day - years * 365
+    habits = []
+    days_by_habit = {}
+    for habit_id in range(1, habit_count + 1):
+        frequency = frequencies[habit_id % len(frequencies)]
+        habits.append(Habit(habit_id, f"Habit {habit_id}", "", frequency, datetime.now()))
+        step = PERIOD_DAYS[frequency]
+        days_by_habit[habit_id] = [day for day in range(first_day, last_day + 1, step) if rng.random() >= MISS_RATE]
+    return habits, days_by_habit
+
+
+def run():
+    """ Times the pure-Python and the numpy streak engine on the synthetic workload and checks they agree. """
+    print(f"Generating {HABIT_COUNT} habits with {YEARS} years of completions...")
+    habits, days_by_habit = generate_workload()
+    print(f"{sum(len(days) for days in days_by_habit.values())} completions")
+
+    start = time.perf_counter()
+    python_streaks = {
+        habit.id: analytics_service.calculate_streaks_from_days(days_by_habit[habit.id], habit.frequency)
+        for habit in habits
+    }
+    python_seconds = time.perf_counter() - start
+    print(f"Python: {python_seconds:.2f}s")
+
+    if not numpy_streak_engine.is_available():
+        print("numpy is not installed, install it with 'pip install numpy' to compare.")
+        return
+
+    start = time.perf_counter()
+    numpy_streaks = numpy_streak_engine.compute_streaks(habits, days_by_habit)
+    numpy_seconds = time.perf_counter() - start
+    print(f"numpy:  {numpy_seconds:.2f}s ({python_seconds / numpy_seconds:.1f}x faster)")
+    print("Results identical." if numpy_streaks == python_streaks else "Results differ!")
+
+
+if __name__ == "__main__":
+    run()
@@ -0,0 +1,8 @@
+from db.maintenance import run_maintenance
+
+def run():
+    """ Deletes orphaned completions, shrinks the database file and updates the query statistics. """
+    print("Running database maintenance...")
+    report = run_maintenance()
+    print(f"{report['orphans_deleted']} orphaned completions deleted, {report['bytes_reclaimed']} bytes reclaimed "
+          f"(database size {report['size_before']} -> {report['size_after']} bytes).")
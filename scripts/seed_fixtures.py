@@ -1,7 +1,7 @@
 from datetime import datetime, timedelta
 from models.habit import Habit, Frequency
 from db.habit_repository import insert_habit, get_all_habits
-from db.habit_completion_repository import complete_habit
+from db.habit_completion_repository import complete_habits_bulk
 
 def create_sample_habits():
     """ Creates five sample habits with 2 daily, 1 weekly, 1 biweekly, 1 monthly. """
@@ -24,6 +24,13 @@ def seed_sample_completions():
     habits = get_all_habits()
     print("Seeding completions...")
 
+    complete_habits_bulk(generate_sample_completions(habits))
+
+    print("Completion data seeded with frequency rules (including skips).")
+
+
+def generate_sample_completions(habits):
+    """ Yields (habit_id, timestamp) tuples following the frequency rules of each sample habit. """
     for habit in habits:
         created = habit.created_at
         today = datetime.now()
@@ -38,7 +45,7 @@ def seed_sample_completions():
                 created + timedelta(weeks=6)
             ]
             for date in completions:
-                complete_habit(habit.id, date)
+                yield habit.id, date
             continue
 
         """ Seed daily habits, with breaks for 'Read Book' """
@@ -55,21 +62,19 @@ def seed_sample_completions():
                 if habit.title == "Read Book" and any(current.date() == skip.date() for skip in skip_dates):
                     current += timedelta(days=1)
                     continue
-                complete_habit(habit.id, current)
+                yield habit.id, current
 
             elif habit.frequency == Frequency.WEEKLY:
                 if current.weekday() == created.weekday():
-                    complete_habit(habit.id, current)
+                    yield habit.id, current
 
             elif habit.frequency == Frequency.BIWEEKLY:
                 delta_days = (current - created).days
                 if delta_days % 14 == 0:
-                    complete_habit(habit.id, current)
+                    yield habit.id, current
 
             elif habit.frequency == Frequency.MONTHLY:
                 if current.day == created.day:
-                    complete_habit(habit.id, current)
+                    yield habit.id, current
 
             current += timedelta(days=1)
-
-    print("Completion data seeded with frequency rules (including skips).")
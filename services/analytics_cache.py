@@ -0,0 +1,65 @@
+import threading
+from collections import OrderedDict
+from datetime import date
+from functools import wraps
+from db.database import get_data_version
+
+# Maximum number of cached results, the least recently used one is evicted first
+CACHE_SIZE = 256
+
+_lock = threading.Lock()
+_entries = OrderedDict()
+_hits = 0
+_misses = 0
+
+
+def cached(function):
+    """"
+        Desc: Decorator that memoizes an analytics function by its arguments and today's date. A cached result is only
+              returned while get_data_version() is unchanged, i.e. nothing was written since it was calculated.
+              Results are handed out as-is and shared by every caller, so they are read-only: copy a result
+              before changing it
+        Args: function with hashable arguments
+        Returns: wrapped function
+    """
+    @wraps(function)
+    def wrapper(*args, **kwargs):
+        global _hits, _misses
+        key = (function.__qualname__, args, tuple(sorted(kwargs.items())), date.today())
+        # read before calculating, a write during the calculation makes the entry stale right away
+        version = get_data_version()
+        with _lock:
+            entry = _entries.get(key)
+            if entry is not None and entry[0] == version:
+                _entries.move_to_end(key)
+                _hits += 1
+                return entry[1]
+            _misses += 1
+
+        result = function(*args, **kwargs)
+        with _lock:
+            _entries[key] = (version, result)
+            _entries.move_to_end(key)
+            while len(_entries) > CACHE_SIZE:
+                _entries.popitem(last=False)
+        return result
+
+    return wrapper
+
+
+def clear_cache():
+    """ removes all cached results and resets the counters """
+    global _hits, _misses
+    with _lock:
+        _entries.clear()
+        _hits = _misses = 0
+
+
+def get_cache_stats() -> dict:
+    """"
+        Desc: Reports how well the cache works
+        Args: /
+        Returns: Dictionary with "hits", "misses" and "size" (number of cached results)
+    """
+    with _lock:
+        return {"hits": _hits, "misses": _misses, "size": len(_entries)}
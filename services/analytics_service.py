@@ -1,235 +1,609 @@
-from typing import List, Dict, Union
-from datetime import datetime
+from typing import List, Dict, Optional, Tuple, Iterable, Iterator
+from bisect import bisect_left, bisect_right
+from heapq import merge
+from itertools import groupby
+from operator import itemgetter
+from datetime import datetime, date, time
 from models.habit import Habit, Frequency
-from db.habit_repository import get_all_habits
-from db.habit_completion_repository import get_completions
-from typing import List, Union
-from datetime import datetime
-from models.habit import Frequency
+from models.habit_status import HabitStatus
+from models.completion_rates import PeriodCounts
+from models.completion_bitmap import bitmaps_to_int, iter_days, year_days, longest_run, trailing_run
+from db.habit_repository import get_all_habits, get_habit_by_id, get_habits_with_streaks
+from db.habit_completion_repository import get_completion_days_grouped, iter_completion_days
+from db.completion_archive_repository import get_archived_days_grouped, get_archived_bounds_grouped, iter_archived_days
+from db.habit_streak_repository import get_streaks, get_streak, calculate_streaks, get_run_index, has_completion_between
+from db.completion_bitmap_repository import get_bitmaps
+from models.streaks import get_period, get_period_start, get_periods_from_days, current_streak_of_periods, streaks_of_days
+from services import numpy_streak_engine
+from services.analytics_cache import cached
+
+# Results of @cached functions are shared with the cache and every other caller, treat them as read-only
+
+# Engines that can recalculate the streaks of all habits, see compute_streaks_all_habits
+STREAK_ENGINES = ("sql", "numpy", "python", "bitmap")
+STREAK_ENGINE = "sql"
+
+# Window lengths (in periods) of the default completion rates
+RATE_WINDOWS = (7, 30, 90, 365)
+
+# Number of newest completions read per habit for the current streak before the window is doubled
+STREAK_WINDOW = 32
 
 # Helper method
-def get_periods(completions: List[datetime], frequency: Frequency) -> List[Union[datetime.date, tuple, int]]:
+def get_periods(completions: List[datetime], frequency: Frequency) -> List[int]:
     """ 
-        Desc: Turns completions into periods based on habit frequency
+        Desc: Turns completions into period ordinals based on habit frequency (see models.streaks.get_period)
         Args: List of completions (datetime), Frequency object
         Returns: List of periods
     """
-    if not completions:
-        return []
-
     completions.sort()
+    return get_periods_from_days([completion.toordinal() for completion in completions], frequency)
 
-    if frequency == Frequency.DAILY:
-        return [completion.date() for completion in completions]
-
-    if frequency == Frequency.WEEKLY:
-        return [completion.isocalendar()[:2] for completion in completions]
 
-    if frequency == Frequency.BIWEEKLY:
-        start_date = completions[0]
-        return [((completion - start_date).days // 14) for completion in completions]
+def calculate_longest_streak(completions: Iterable[datetime], frequency: Frequency) -> int:
+    """ 
+        Desc: Calculates the longest streak for one single habit in one pass
+        Args: completions in ascending order (lists are sorted in place first, iterators are streamed), frequency
+        Returns: longest streak (int)
+    """
+    return streaks_of_days(_completion_days(completions), frequency)[1]
 
-    if frequency == Frequency.MONTHLY:
-        return [(completion.year, completion.month) for completion in completions]
 
-    return []
+def calculate_longest_streak_from_days(days: Iterable[int], frequency: Frequency) -> int:
+    """ 
+        Desc: Calculates the longest streak for one single habit from its stored day ordinals
+        Args: day ordinals (ascending), frequency
+        Returns: longest streak (int)
+    """
+    return streaks_of_days(days, frequency)[1]
 
 
-# Helper method
-def are_consecutive(previous_period, current_period, frequency: Frequency) -> bool:
+def calculate_current_streak(completions: Iterable[datetime], frequency: Frequency) -> int:
     """ 
-        Desc: Checks if two periods are consecutive
-        Args: first period, second later period, frequency
-        Returns: boolean if periods are consecutive
+        Desc: Calculates the current active streak up to today (if not broken at some point)
+        Args: completions in ascending order (lists are sorted in place first, iterators are streamed), frequency
+        Returns: longest streak (int)
     """
-    if frequency == Frequency.DAILY:
-        # Checks if the two dates one day apart
-        return (current_period - previous_period).days == 1
+    return streaks_of_days(_completion_days(completions), frequency)[0]
 
-    if frequency == Frequency.WEEKLY:
-        prev_year, prev_week = previous_period
-        curr_year, curr_week = current_period
-
-        return (
-            (curr_year == prev_year and curr_week == prev_week + 1)
-            or (curr_year == prev_year + 1 and prev_week == 52 and curr_week == 1)
-        )
 
-    if frequency == Frequency.BIWEEKLY:
-        # checks if the dates are two periods/weeks apart
-        return current_period == previous_period + 1
+def calculate_current_streak_from_days(days: Iterable[int], frequency: Frequency) -> int:
+    """ 
+        Desc: Calculates the current active streak from the stored day ordinals of a habit
+        Args: day ordinals (ascending), frequency
+        Returns: current streak (int)
+    """
+    return streaks_of_days(days, frequency)[0]
 
-    if frequency == Frequency.MONTHLY:
-        prev_year, prev_month = previous_period
-        curr_year, curr_month = current_period
 
-        return (
-            (curr_year == prev_year and curr_month == prev_month + 1)
-            or (curr_year == prev_year + 1 and prev_month == 12 and curr_month == 1)
-        )
+def calculate_streaks_from_days(days: Iterable[int], frequency: Frequency) -> Tuple[int, int]:
+    """ 
+        Desc: Calculates the current and the longest streak of one habit from its day ordinals in one pass
+        Args: day ordinals (ascending), frequency
+        Returns: (current streak, longest streak)
+    """
+    return streaks_of_days(days, frequency)
 
-    return False
 
-def calculate_longest_streak(completions: List[datetime], frequency: Frequency) -> int:
+def stream_streaks_for_habit(habit_id: int) -> Tuple[int, int]:
     """ 
-        Desc: Calculates the longest streak for one single habit
-        Args: list of completions, frequency
-        Returns: longest streak (int)
+        Desc: Recalculates the current and longest streak of one habit straight from ordered database cursors over
+              its archived and hot completions, memory stays constant however long the history is
+        Args: ID of habit
+        Returns: (current streak, longest streak), (0, 0) if the habit does not exist
     """
-    periods = sorted(set(get_periods(completions, frequency)))
-    if not periods:
-        return 0
+    habit = get_habit_by_id(habit_id)
+    if habit is None:
+        return 0, 0
+    rows = merge(iter_archived_days(habit_id), iter_completion_days(habit_id))
+    return streaks_of_days((day for _, day in rows), habit.frequency)
 
-    longest = current = 1
-
-    for i in range(1, len(periods)):
-        if are_consecutive(periods[i - 1], periods[i], frequency):
-            current += 1
-            longest = max(longest, current)
-        else:
-            current = 1
 
-    return longest
+# Helper method
+def _completion_days(completions: Iterable[datetime]) -> Iterator[int]:
+    """ turns completions into day ordinals lazily, a list is sorted in place like before """
+    if isinstance(completions, list):
+        completions.sort()
+    return (completion.toordinal() for completion in completions)
 
 
-def calculate_current_streak(completions: List[datetime], frequency: Frequency) -> int:
+def current_streak_start_day(days: List[int], frequency: Frequency, base_day: Optional[int] = None) -> Optional[int]:
     """ 
-        Desc: Calculates the current active streak up to today (if not broken at some point)
-        Args: list of completions, frequency
-        Returns: longest streak (int)
+        Desc: Finds the first completion day that belongs to the current streak
+        Args: list of day ordinals (ascending), frequency, first completion day for biweekly periods
+        Returns: day ordinal (int), None without completions
     """
-    periods = sorted(set(get_periods(completions, frequency)))
-    if not periods:
-        return 0
-
-    current_streak = 1
-
-    for i in range(len(periods) - 1, 0, -1):
-        if are_consecutive(periods[i - 1], periods[i], frequency):
-            current_streak += 1
-        else:
-            break
+    if not days:
+        return None
 
-    return current_streak
+    periods = get_periods_from_days(days, frequency, base_day)
+    start = len(periods) - 1
+    while start > 0 and periods[start] - periods[start - 1] <= 1:
+        start -= 1
+    return days[start]
 
 
+@cached
 def get_longest_streak_all_habits() -> Dict[int, int]:
     """ 
-        Desc: Returns the longest streak for all habits.
+        Desc: Returns the longest streak for all habits (read from the streak summary).
         Args: /
         Returns: List (Dictionary) of Habit ID (int) and streak length (int)
     """
-    return {
-        habit.id: calculate_longest_streak(get_completions(habit.id), habit.frequency)
-        for habit in get_all_habits()
-    }
+    return {habit_id: longest for habit_id, (current, longest) in get_streaks().items()}
 
 
+@cached
 def get_current_streak_all_habits() -> Dict[int, int]:
     """ 
-        Desc: Returns current streak for all habits.
+        Desc: Returns current streak for all habits (read from the streak summary).
         Args: /
         Returns: List (Dictionary) of Habit ID (int) and streak length (int)
     """
-    return {
-        habit.id: calculate_current_streak(get_completions(habit.id), habit.frequency)
-        for habit in get_all_habits()
-    }
+    return {habit_id: current for habit_id, (current, longest) in get_streaks().items()}
 
 
+@cached
 def get_longest_streak_for_habit(habit_id: int) -> int:
     """ 
-        Desc: Returns the longest streak for one specific habit.
+        Desc: Returns the longest streak for one specific habit (read from the streak summary).
         Args: ID of habit (int)
         Returns: streak length of habit (int)
     """
-    habit = next((h for h in get_all_habits() if h.id == habit_id), None)
-    return calculate_longest_streak(get_completions(habit_id), habit.frequency) if habit else 0
+    streak = get_streak(habit_id)
+    return streak[1] if streak else 0
 
 
+@cached
 def get_current_streak_for_habit(habit_id: int) -> int:
     """ 
-        Desc: Returns the current streak for one specific habit
+        Desc: Returns the current streak for one specific habit (read from the streak summary)
         Args: ID of habit (int)
         Returns: streak length of habit (int)
     """
-    habit = next((h for h in get_all_habits() if h.id == habit_id), None)
-    return calculate_current_streak(get_completions(habit_id), habit.frequency) if habit else 0
+    streak = get_streak(habit_id)
+    return streak[0] if streak else 0
 
 
+def compute_longest_streak_all_habits() -> Dict[int, int]:
+    """ 
+        Desc: Recalculates the longest streak for all habits from their hot and archived completions
+        Args: /
+        Returns: List (Dictionary) of Habit ID (int) and streak length (int)
+    """
+    return {habit_id: longest for habit_id, (_, longest) in compute_streaks_all_habits().items()}
+
+
+def compute_streaks_all_habits(engine: str = None) -> Dict[int, Tuple[int, int]]:
+    """ 
+        Desc: Recalculates the current and longest streak for all habits from their hot and archived completions.
+              "sql" computes them inside SQLite, "numpy" with the vectorized engine (pure Python if numpy is missing)
+              "python" streams both tables through models.streaks.streaks_of_days in one ordered pass
+              and "bitmap" works on the yearly completion bitmaps
+        Args: engine (one of STREAK_ENGINES, defaults to STREAK_ENGINE)
+        Returns: List (Dictionary) of Habit ID (int) and (current streak, longest streak)
+    """
+    engine = engine or STREAK_ENGINE
+    if engine not in STREAK_ENGINES:
+        raise ValueError(f"Unknown streak engine: {engine}")
+
+    habits = get_all_habits()
+    if engine == "sql":
+        streaks = calculate_streaks()
+        return {habit.id: streaks.get(habit.id, (0, 0)) for habit in habits}
+
+    if engine == "bitmap":
+        return calculate_streaks_from_bitmaps(habits)
+
+    if engine == "numpy" and numpy_streak_engine.is_available():
+        days_by_habit = get_completion_days_grouped()
+        for habit_id, archived in get_archived_days_grouped().items():
+            days_by_habit[habit_id] = merge_days(archived, days_by_habit.get(habit_id, []))
+        return numpy_streak_engine.compute_streaks(habits, days_by_habit)
+
+    # one ordered pass over both tables, only the habit that is being counted is held in memory
+    frequencies = {habit.id: habit.frequency for habit in habits}
+    streaks = {habit.id: (0, 0) for habit in habits}
+    for habit_id, rows in groupby(merge(iter_archived_days(), iter_completion_days()), key=itemgetter(0)):
+        if habit_id in frequencies:
+            streaks[habit_id] = streaks_of_days((day for _, day in rows), frequencies[habit_id])
+    return streaks
+
+
+def compute_current_streak_all_habits() -> Dict[int, int]:
+    """ 
+        Desc: Recalculates the current streak for all habits from their newest completions
+        Args: /
+        Returns: List (Dictionary) of Habit ID (int) and streak length (int)
+    """
+    return current_streaks_from_tail(get_all_habits())
+
+
+def current_streaks_from_tail(habits: List[Habit], habit_ids: Optional[List[int]] = None) -> Dict[int, int]:
+    """ 
+        Desc: Calculates current streaks from the newest completions only. Habits whose streak reaches the
+              edge of the window are read again with a doubled window, so the work grows with the streak length
+        Args: habits to calculate, their IDs (all habits if omitted)
+        Returns: List (Dictionary) of Habit ID (int) and streak length (int)
+    """
+    frequencies = {habit.id: habit.frequency for habit in habits}
+    streaks = {habit.id: 0 for habit in habits}
+
+    # biweekly periods are counted from the very first completion, which may already be archived
+    biweekly_ids = [habit.id for habit in habits if habit.frequency == Frequency.BIWEEKLY]
+    base_days = {}
+    if biweekly_ids:
+        base_days = get_first_and_last_days(biweekly_ids)
+
+    window = STREAK_WINDOW
+    pending = habit_ids
+    reaching_archive = {}
+    while pending is None or pending:
+        tails = get_completion_days_grouped(pending, limit=window, newest_first=True)
+        if window == STREAK_WINDOW:
+            # habits without hot completions may still have archived ones
+            reaching_archive.update((habit_id, []) for habit_id in frequencies if habit_id not in tails)
+        next_pending = []
+        for habit_id, days in tails.items():
+            if habit_id not in frequencies:
+                continue
+            base_day = base_days[habit_id][0] if habit_id in base_days else None
+            periods = get_periods_from_days(days, frequencies[habit_id], base_day)
+            streaks[habit_id] = current_streak_of_periods(periods, frequencies[habit_id])
+            if streaks[habit_id] == len(set(periods)):
+                if len(days) == window:
+                    next_pending.append(habit_id)
+                else:
+                    reaching_archive[habit_id] = days
+        pending = next_pending
+        window *= 2
+
+    # the streak covers the whole hot history, it may continue into the archived days
+    if reaching_archive:
+        archived_by_habit = get_archived_days_grouped(list(reaching_archive))
+        for habit_id, archived in archived_by_habit.items():
+            base_day = base_days[habit_id][0] if habit_id in base_days else None
+            days = merge_days(archived, reaching_archive[habit_id])
+            periods = get_periods_from_days(days, frequencies[habit_id], base_day)
+            streaks[habit_id] = current_streak_of_periods(periods, frequencies[habit_id])
+
+    return streaks
+
+
+@cached
 def get_broken_habits() -> List[Habit]:
     """ 
-        Desc: Returns a list of habits that have been broken
+        Desc: Returns a list of habits that have been broken, checked against the first/last completion day
+              kept in the streak summary with one query over habits
         Args: /
         Returns: List of habit objects
     """
-    today = datetime.now()
-    brokenHabits = []
+    today = date.today()
+    return [
+        habit for habit, first_day, last_day, *_ in get_habits_with_streaks()
+        if is_broken([first_day, last_day] if first_day is not None else [], habit.frequency, today)
+    ]
 
-    for habit in get_all_habits():
-        completions = sorted(get_completions(habit.id))
-        if not completions:
+
+@cached
+def get_open_tasks_for_today() -> List[Habit]:
+    """ 
+        Desc: Returns habits that still haven't been completed today, checked against the first/last completion day
+              kept in the streak summary with one query over habits
+        Args: /
+        Returns: List of habit objects
+    """
+    today = date.today()
+    return [
+        habit for habit, first_day, last_day, *_ in get_habits_with_streaks()
+        if is_open([first_day, last_day] if first_day is not None else [], habit.frequency, today)
+    ]
+
+
+def get_streak_as_of(habit_id: int, day: date) -> int:
+    """ 
+        Desc: Returns the streak a habit had on a past (or the current) day, read from its run index
+        Args: ID of habit, day
+        Returns: streak (int), 0 if the streak was already broken on that day or the habit did not exist
+    """
+    return get_streaks_as_of(habit_id, [day])[0]
+
+
+def get_streaks_as_of(habit_id: int, days: Iterable[date]) -> List[int]:
+    """ 
+        Desc: Returns the streak of a habit on many days, reading its run index once and finding the run of
+              every day with a binary search. The period of the day counts as soon as it has a completion on or
+              before the day, a run whose last period lies before the previous period of the day is broken (see is_broken)
+        Args: ID of habit, days
+        Returns: List of streaks (int) in the order of the days
+    """
+    days = list(days)
+    index = get_run_index(habit_id)
+    if index is None or index[1] is None:
+        return [0] * len(days)
+    frequency, first_day, runs = index
+    starts = [run[0] for run in runs]
+
+    streaks = []
+    for day in days:
+        day = day.toordinal()
+        period = get_period(day, frequency, first_day)
+        position = bisect_right(starts, period) - 1
+        if position < 0 or runs[position][1] < period - 1:
+            streaks.append(0)
             continue
+        start_period, end_period, start_day, end_day = runs[position]
+        if end_period < period:
+            streaks.append(end_period - start_period + 1)
+            continue
+        # the period of the day is part of the run, but it only counts with a completion up to the day itself
+        if period == start_period:
+            done = start_day <= day
+        elif period == end_period and end_day <= day:
+            done = True
+        else:
+            done = has_completion_between(habit_id, get_period_start(period, frequency, first_day), day)
+        streaks.append(period - start_period + done)
+    return streaks
 
-        last = completions[-1]
 
-        if habit.frequency == Frequency.DAILY:
-            if (today.date() - last.date()).days > 1:
-                brokenHabits.append(habit)
+def get_longest_streak_between(habit_id: int, start: date, end: date) -> int:
+    """ 
+        Desc: Returns the longest streak of a habit within a date range (e.g. one year), runs reaching over the
+              range are only counted with their periods inside it. A period cut by the range counts only if one
+              of its completions falls inside the range
+        Args: ID of habit, first and last day of the range (inclusive)
+        Returns: longest streak (int)
+    """
+    index = get_run_index(habit_id)
+    if index is None or index[1] is None:
+        return 0
+    frequency, first_day, runs = index
+    start, end = start.toordinal(), end.toordinal()
+    first_period = get_period(start, frequency, first_day)
+    last_period = get_period(end, frequency, first_day)
+
+    # runs are disjoint and ordered, so their end periods are ordered as well
+    position = bisect_left([run[1] for run in runs], first_period)
+    longest = 0
+    for run in runs[position:]:
+        if run[0] > last_period:
+            break
+        low, high = max(run[0], first_period), min(run[1], last_period)
+        if low == high:
+            length = int(_completed_within(habit_id, frequency, first_day, low, start, end, run))
+        else:
+            length = high - low + 1
+            if low == first_period and not _completed_within(habit_id, frequency, first_day, low, start, end, run):
+                length -= 1
+            if high == last_period and not _completed_within(habit_id, frequency, first_day, high, start, end, run):
+                length -= 1
+        longest = max(longest, length)
+    return longest
 
-        elif habit.frequency == Frequency.WEEKLY:
-            if (today.isocalendar()[1] - last.isocalendar()[1]) > 1 or today.isocalendar()[0] > last.isocalendar()[0]:
-                brokenHabits.append(habit)
 
-        elif habit.frequency == Frequency.BIWEEKLY:
-            base = completions[0]
-            current_period = (today - base).days // 14
-            last_period = (last - base).days // 14
-            if current_period > last_period + 1:
-                brokenHabits.append(habit)
+def _completed_within(habit_id: int, frequency: Frequency, first_day: int, period: int, start: int, end: int,
+                      run: Tuple[int, int, int, int]) -> bool:
+    """ checks if a period of a run has a completion between the day ordinals start and end, the first and last
+        day of the run answer it without a query where they can """
+    start_period, end_period, start_day, end_day = run
+    period_first = get_period_start(period, frequency, first_day)
+    period_last = get_period_start(period + 1, frequency, first_day) - 1
+    if start <= period_first and period_last <= end:
+        # every period of a run has a completion
+        return True
+    first, last = max(start, period_first), min(end, period_last)
+    if period == start_period and first <= start_day <= last:
+        return True
+    if period == end_period and first <= end_day <= last:
+        return True
+    if period == start_period and start_day > last or period == end_period and end_day < first:
+        return False
+    return has_completion_between(habit_id, first, last)
+
+
+def calculate_streaks_from_bitmaps(habits: List[Habit]) -> Dict[int, Tuple[int, int]]:
+    """ 
+        Desc: Calculates current and longest streaks from the yearly completion bitmaps, daily habits with
+              bit operations only, the other frequencies by walking the set bits
+        Args: list of habits
+        Returns: Dictionary of Habit ID (int) and (current streak, longest streak)
+    """
+    bitmaps_by_habit = get_bitmaps([habit.id for habit in habits])
+    streaks = {}
+    for habit in habits:
+        origin, value = bitmaps_to_int(bitmaps_by_habit.get(habit.id, []))
+        if habit.frequency == Frequency.DAILY:
+            streaks[habit.id] = (trailing_run(value), longest_run(value))
+        else:
+            streaks[habit.id] = streaks_of_days(iter_days(origin, value), habit.frequency)
+    return streaks
 
-        elif habit.frequency == Frequency.MONTHLY:
-            month_diff = (today.year - last.year) * 12 + today.month - last.month
-            if month_diff > 1:
-                brokenHabits.append(habit)
 
-    return brokenHabits
+@cached
+def get_year_heatmap(year: int) -> Dict[int, List[bool]]:
+    """ 
+        Desc: Returns a calendar heatmap of one year for all habits, read from their completion bitmaps
+        Args: year (int)
+        Returns: Dictionary of Habit ID (int) and one flag per day of the year (True if completed),
+                 habits without completions in that year are missing
+    """
+    return {
+        habit_id: year_days(year, bitmaps[0][1])
+        for habit_id, bitmaps in get_bitmaps(year=year).items()
+    }
 
 
-def get_open_tasks_for_today() -> List[Habit]:
+@cached
+def get_open_tasks_for_day(day: date) -> List[Habit]:
     """ 
-        Desc: Returns habits that still haven't been completed today
-        Args: /
+        Desc: Returns the habits that were not (yet) completed in the period of a day, checked against the
+              completion bitmaps cut off after that day
+        Args: day (date)
         Returns: List of habit objects
     """
-    today = datetime.now()
+    bitmaps_by_habit = get_bitmaps()
     open_habits = []
-
     for habit in get_all_habits():
-        completions = sorted(get_completions(habit.id))
-        if not completions:
+        origin, value = bitmaps_to_int(bitmaps_by_habit.get(habit.id, []))
+        days = []
+        if value:
+            first_day = origin + (value & -value).bit_length() - 1
+            cut = value & ((1 << max(day.toordinal() - origin + 1, 0)) - 1)
+            if cut:
+                days = [first_day, origin + cut.bit_length() - 1]
+        if is_open(days, habit.frequency, day):
             open_habits.append(habit)
-            continue
+    return open_habits
 
-        latest_completion = completions[-1]
 
-        if habit.frequency == Frequency.DAILY:
-            if latest_completion.date() != today.date():
-                open_habits.append(habit)
+def get_completion_rates(habit_id: Optional[int] = None, windows: Iterable[int] = RATE_WINDOWS) -> Dict[int, Dict[int, float]]:
+    """ 
+        Desc: Returns the share of completed periods over the last N periods (up to today's period) for every
+              window length, for one habit or all habits. Each habit's counts are built once, every window is O(1)
+        Args: optional ID of habit (all habits if omitted), window lengths in periods (default 7/30/90/365)
+        Returns: Dictionary of Habit ID (int) and Dictionary of window length (int) and rate (float between 0 and 1)
+    """
+    habits = get_all_habits() if habit_id is None else [habit for habit in [get_habit_by_id(habit_id)] if habit]
+    windows = list(windows)
+    counts = build_period_counts(habits, date.today())
+    return {habit.id: {window: counts[habit.id].rate(window) for window in windows} for habit in habits}
 
-        elif habit.frequency == Frequency.WEEKLY:
-            if latest_completion.isocalendar()[:2] != today.isocalendar()[:2]:
-                open_habits.append(habit)
 
-        elif habit.frequency == Frequency.BIWEEKLY:
-            base = completions[0]
-            current_period = (today - base).days // 14
-            latest_period = (latest_completion - base).days // 14
-            if current_period != latest_period:
-                open_habits.append(habit)
+def get_completion_rate_between(habit_id: int, start: date, end: date) -> float:
+    """ 
+        Desc: Returns the share of completed periods of one habit within a date range
+        Args: ID of habit, first and last day of the range (inclusive)
+        Returns: rate (float between 0 and 1), 0.0 if the habit does not exist
+    """
+    habit = get_habit_by_id(habit_id)
+    if habit is None:
+        return 0.0
+    counts = build_period_counts([habit], max(end, date.today()))[habit_id]
+    return counts.rate_between(get_period(start.toordinal(), habit.frequency, counts.base_day),
+                               get_period(end.toordinal(), habit.frequency, counts.base_day))
 
-        elif habit.frequency == Frequency.MONTHLY:
-            if (latest_completion.year, latest_completion.month) != (today.year, today.month):
-                open_habits.append(habit)
 
-    return open_habits
+# Helper method
+def build_period_counts(habits: List[Habit], today: date) -> Dict[int, PeriodCounts]:
+    """ 
+        Desc: Builds the cumulative period counts of habits from their completion bitmaps, from the period the
+              habit was created in (or its first completion, if older) up to the period of today
+        Args: list of habits, day of the last period
+        Returns: Dictionary of Habit ID (int) and its PeriodCounts
+    """
+    bitmaps_by_habit = get_bitmaps([habit.id for habit in habits])
+    counts = {}
+    for habit in habits:
+        origin, value = bitmaps_to_int(bitmaps_by_habit.get(habit.id, []))
+        created_day = habit.created_at.toordinal()
+        first_day = origin + (value & -value).bit_length() - 1 if value else created_day
+        periods = [get_period(day, habit.frequency, first_day) for day in iter_days(origin, value)]
+        counts[habit.id] = PeriodCounts(
+            periods,
+            get_period(min(created_day, first_day), habit.frequency, first_day),
+            get_period(today.toordinal(), habit.frequency, first_day),
+            first_day,
+        )
+    return counts
+
+
+@cached
+def get_habit_status(habit_id: int) -> Optional[HabitStatus]:
+    """ 
+        Desc: Returns current streak, longest streak, open-today, broken and last completion of one habit,
+              all taken from one query
+        Args: ID of habit
+        Returns: HabitStatus object, None if the habit does not exist
+    """
+    statuses = [_to_status(row, date.today()) for row in get_habits_with_streaks(habit_id)]
+    return statuses[0] if statuses else None
+
+
+@cached
+def get_habit_statuses() -> List[HabitStatus]:
+    """ 
+        Desc: Returns the status snapshot of every habit, all taken from one query
+        Args: /
+        Returns: List of HabitStatus objects
+    """
+    today = date.today()
+    return [_to_status(row, today) for row in get_habits_with_streaks()]
+
+
+# Helper method
+def _to_status(row: tuple, today: date) -> HabitStatus:
+    """ builds the status of a habit from its summary row (see habit_repository.get_habits_with_streaks) """
+    habit, first_day, last_day, current, longest, last_completed = row
+    days = [first_day, last_day] if first_day is not None else []
+    if last_completed is None and last_day is not None:
+        # only archived completions left, they keep the day but not the time
+        last_completed = datetime.combine(date.fromordinal(last_day), time())
+    return HabitStatus(
+        habit=habit,
+        current_streak=current or 0,
+        longest_streak=longest or 0,
+        open_today=is_open(days, habit.frequency, today),
+        broken=is_broken(days, habit.frequency, today),
+        last_completed=last_completed,
+    )
+
+
+# Helper method
+def get_first_and_last_days(habit_ids: Optional[List[int]] = None) -> Dict[int, List[int]]:
+    """ 
+        Desc: Reads only the first and the newest completion day per habit, which is all is_broken and is_open need
+        Args: optional IDs of habits, all habits if omitted
+        Returns: Dictionary of habit ID (int) and [first day, last day] ordinals
+    """
+    first = get_completion_days_grouped(habit_ids, limit=1)
+    last = get_completion_days_grouped(habit_ids, limit=1, newest_first=True)
+    bounds = {habit_id: [days[0], last[habit_id][0]] for habit_id, days in first.items()}
+
+    # archived completions are older than the hot ones, except for completions backdated after archiving
+    for habit_id, (archived_first, archived_last) in get_archived_bounds_grouped(habit_ids).items():
+        if habit_id in bounds:
+            first_day, last_day = bounds[habit_id]
+            bounds[habit_id] = [min(first_day, archived_first), max(last_day, archived_last)]
+        else:
+            bounds[habit_id] = [archived_first, archived_last]
+    return bounds
+
+
+# Helper method
+def merge_days(archived: List[int], days: List[int]) -> List[int]:
+    """ 
+        Desc: Combines archived rollup days with the hot completion days of a habit
+        Args: archived day ordinals (ascending), hot day ordinals (ascending)
+        Returns: List of day ordinals (ascending)
+    """
+    if not archived:
+        return days
+    if not days or archived[-1] <= days[0]:
+        return archived + days
+    return sorted(archived + days)
+
+
+# Helper method
+def is_broken(days: List[int], frequency: Frequency, today: date) -> bool:
+    """ 
+        Desc: Checks if the streak of a habit is interrupted on the given day, i.e. at least one whole period
+              passed since the last completion
+        Args: list of day ordinals (ascending), frequency, day to check against
+        Returns: boolean, habits without completions are never broken
+    """
+    if not days:
+        return False
+    return get_period(today.toordinal(), frequency, days[0]) - get_period(days[-1], frequency, days[0]) > 1
+
+
+# Helper method
+def is_open(days: List[int], frequency: Frequency, today: date) -> bool:
+    """ 
+        Desc: Checks if a habit still has to be completed in the period of the given day
+        Args: list of day ordinals (ascending), frequency, day to check against
+        Returns: boolean, habits without completions are always open
+    """
+    if not days:
+        return True
+    return get_period(today.toordinal(), frequency, days[0]) != get_period(days[-1], frequency, days[0])
@@ -0,0 +1,33 @@
+from datetime import date
+from db.habit_repository import get_habits_with_streaks
+from db.habit_completion_repository import get_completion_days
+from db.completion_archive_repository import archive_completions
+from services.analytics_service import current_streak_start_day
+
+# Completions of the last ARCHIVE_KEEP_DAYS days always stay in habit_completions
+ARCHIVE_KEEP_DAYS = 365
+
+
+def archive_cold_history(keep_days: int = ARCHIVE_KEEP_DAYS, today: date = None) -> int:
+    """ 
+        Desc: Compacts completions that are older than keep_days and older than the current streak of their habit
+              into the per-day rollup table, so habit_completions only holds the hot tail. Habits are handled one
+              at a time, the streak summary tells which ones have history before the cutoff at all
+        Args: number of recent days that are never archived, reference day (today)
+        Returns: number of archived completions (int)
+    """
+    today = today or date.today()
+    cutoff = today.toordinal() - keep_days
+
+    archived = 0
+    for habit, first_day, *_ in get_habits_with_streaks():
+        if first_day is None or first_day >= cutoff:
+            continue
+        days = get_completion_days(habit.id)
+        if not days or days[0] >= cutoff:
+            continue
+        # the summary's first day includes archived completions, biweekly periods are counted from it
+        keep_from = min(cutoff, current_streak_start_day(days, habit.frequency, first_day))
+        if days[0] < keep_from:
+            archived += archive_completions(habit.id, keep_from)
+    return archived
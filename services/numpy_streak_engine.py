@@ -0,0 +1,82 @@
+from datetime import date
+from itertools import chain
+from typing import Dict, List, Tuple
+from models.habit import Habit, Frequency
+
+try:
+    import numpy as np
+except ImportError:  # optional dependency, analytics_service falls back to the pure-Python streak math
+    np = None
+
+# Day ordinal of 1970-01-01, numpy datetime64 counts days from there
+UNIX_EPOCH_DAY = date(1970, 1, 1).toordinal()
+
+# Frequencies encoded as small integers so they can live in an array next to the days
+FREQUENCY_CODES = {
+    Frequency.DAILY: 0,
+    Frequency.WEEKLY: 1,
+    Frequency.BIWEEKLY: 2,
+    Frequency.MONTHLY: 3,
+}
+
+
+def is_available() -> bool:
+    """ checks if numpy could be imported """
+    return np is not None
+
+
+def _month_keys(days):
+    """ turns day ordinals into month ordinals, numpy counts months from 1970-01 so 1970 * 12 is added (see get_period) """
+    return (days - UNIX_EPOCH_DAY).astype("datetime64[D]").astype("datetime64[M]").astype(np.int64) + 1970 * 12
+
+
+def compute_streaks(habits: List[Habit], days_by_habit: Dict[int, List[int]]) -> Dict[int, Tuple[int, int]]:
+    """
+        Desc: Calculates the current and longest streak of many habits at once with numpy. The completion days of all
+              habits are packed into one array, turned into period keys and split into runs of consecutive periods
+              without a Python loop per completion. Results are identical to calculate_streaks_from_days
+        Args: list of habits, Dictionary of Habit ID (int) and its completion day ordinals (list of int)
+        Returns: Dictionary of Habit ID (int) and (current streak, longest streak)
+    """
+    streaks = {habit.id: (0, 0) for habit in habits}
+    habits = [habit for habit in habits if days_by_habit.get(habit.id)]
+    if not habits:
+        return streaks
+
+    lengths = np.fromiter((len(days_by_habit[habit.id]) for habit in habits), dtype=np.int64, count=len(habits))
+    days = np.fromiter(
+        chain.from_iterable(days_by_habit[habit.id] for habit in habits), dtype=np.int64, count=int(lengths.sum())
+    )
+    owners = np.repeat(np.arange(len(habits)), lengths)
+    # the owners are grouped already, sorting by (owner, day) only orders the days inside each habit
+    days = days[np.lexsort((days, owners))]
+    frequencies = np.array([FREQUENCY_CODES[habit.frequency] for habit in habits], dtype=np.int8)[owners]
+
+    # period ordinals as in models.streaks.get_period, daily periods are the days themselves
+    keys = days.copy()
+    weekly = frequencies == FREQUENCY_CODES[Frequency.WEEKLY]
+    keys[weekly] = (days[weekly] - 1) // 7
+    biweekly = frequencies == FREQUENCY_CODES[Frequency.BIWEEKLY]
+    first_days = days[np.concatenate(([0], np.cumsum(lengths)[:-1]))][owners]
+    keys[biweekly] = (days[biweekly] - first_days[biweekly]) // 14
+    monthly = frequencies == FREQUENCY_CODES[Frequency.MONTHLY]
+    keys[monthly] = _month_keys(days[monthly])
+
+    # several completions in one period count once
+    distinct = np.ones(len(keys), dtype=bool)
+    distinct[1:] = (owners[1:] != owners[:-1]) | (keys[1:] != keys[:-1])
+    keys, owners = keys[distinct], owners[distinct]
+
+    run_starts = np.ones(len(keys), dtype=bool)
+    run_starts[1:] = (owners[1:] != owners[:-1]) | (keys[1:] - keys[:-1] != 1)
+
+    run_lengths = np.bincount(np.cumsum(run_starts) - 1)
+    run_owners = owners[run_starts]
+    first_runs = np.flatnonzero(np.concatenate(([True], run_owners[1:] != run_owners[:-1])))
+    last_runs = np.concatenate((first_runs[1:] - 1, [len(run_lengths) - 1]))
+    longest = np.maximum.reduceat(run_lengths, first_runs)
+    current = run_lengths[last_runs]
+
+    for owner, current_streak, longest_streak in zip(run_owners[first_runs].tolist(), current.tolist(), longest.tolist()):
+        streaks[habits[owner].id] = (current_streak, longest_streak)
+    return streaks
@@ -0,0 +1,115 @@
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from datetime import date
+from typing import Dict, List, Optional, Tuple
+from models.habit import Habit, Frequency
+from models.streaks import streaks_of_days
+from db import database
+from db.habit_repository import get_all_habits
+from db.habit_completion_repository import get_completion_days_grouped
+from db.completion_archive_repository import get_archived_days_grouped
+from services.analytics_service import get_first_and_last_days, merge_days, is_broken, is_open
+
+# Opt-in parallel versions of the all-habit analytics: habit IDs are split into shards that worker processes
+# calculate with their own read connection, the results are merged into the shapes analytics_service returns
+
+# Number of worker processes, defaults to one per CPU core
+PARALLEL_WORKERS = os.cpu_count() or 1
+
+# Number of habits per shard handed to a worker
+PARALLEL_CHUNK_SIZE = 2000
+
+
+def compute_streaks_all_habits(workers: Optional[int] = None, chunk_size: Optional[int] = None,
+                               path: Optional[str] = None) -> Dict[int, Tuple[int, int]]:
+    """"
+        Desc: Recalculates the current and longest streak of all habits in parallel worker processes
+        Args: number of workers, habits per shard (defaults PARALLEL_WORKERS / PARALLEL_CHUNK_SIZE),
+              database file (defaults to the current one)
+        Returns: Dictionary of Habit ID (int) and (current streak, longest streak), like analytics_service
+    """
+    streaks = {}
+    for shard_streaks in _map_shards(_streaks_of_shard, get_all_habits(), workers, chunk_size, path):
+        streaks.update(shard_streaks)
+    return streaks
+
+
+def compute_longest_streak_all_habits(workers: Optional[int] = None, chunk_size: Optional[int] = None,
+                                      path: Optional[str] = None) -> Dict[int, int]:
+    """ parallel version of analytics_service.compute_longest_streak_all_habits """
+    return {habit_id: longest for habit_id, (_, longest) in compute_streaks_all_habits(workers, chunk_size, path).items()}
+
+
+def compute_current_streak_all_habits(workers: Optional[int] = None, chunk_size: Optional[int] = None,
+                                      path: Optional[str] = None) -> Dict[int, int]:
+    """ parallel version of analytics_service.compute_current_streak_all_habits """
+    return {habit_id: current for habit_id, (current, _) in compute_streaks_all_habits(workers, chunk_size, path).items()}
+
+
+def get_broken_habits(workers: Optional[int] = None, chunk_size: Optional[int] = None,
+                      path: Optional[str] = None) -> List[Habit]:
+    """ parallel version of analytics_service.get_broken_habits """
+    return _habits_with_status(0, workers, chunk_size, path)
+
+
+def get_open_tasks_for_today(workers: Optional[int] = None, chunk_size: Optional[int] = None,
+                             path: Optional[str] = None) -> List[Habit]:
+    """ parallel version of analytics_service.get_open_tasks_for_today """
+    return _habits_with_status(1, workers, chunk_size, path)
+
+
+def _habits_with_status(flag: int, workers: Optional[int], chunk_size: Optional[int], path: Optional[str]) -> List[Habit]:
+    """ returns the habits whose (broken, open) status flag at the given position is set, in the order of get_all_habits """
+    habits = get_all_habits()
+    statuses = {}
+    for shard_statuses in _map_shards(_statuses_of_shard, habits, workers, chunk_size, path):
+        statuses.update(shard_statuses)
+    return [habit for habit in habits if statuses[habit.id][flag]]
+
+
+def _map_shards(task, habits: List[Habit], workers: Optional[int], chunk_size: Optional[int], path: Optional[str]):
+    """ runs task on every shard of (habit ID, frequency) pairs in a process pool and yields the shard results """
+    path = path or database.DB_PATH
+    if path == database.MEMORY_DB:
+        raise ValueError("Parallel analytics need a database file, an in-memory database is not shared with other processes")
+    chunk_size = chunk_size or PARALLEL_CHUNK_SIZE
+    pairs = [(habit.id, habit.frequency) for habit in habits]
+    shards = [pairs[i:i + chunk_size] for i in range(0, len(pairs), chunk_size)]
+    if not shards:
+        return
+
+    # "spawn" starts clean interpreters, forked children would inherit the open SQLite connections of this process
+    with ProcessPoolExecutor(
+        max_workers=min(workers or PARALLEL_WORKERS, len(shards)),
+        mp_context=multiprocessing.get_context("spawn"),
+        initializer=_init_worker,
+        initargs=(os.path.abspath(path),),
+    ) as executor:
+        yield from executor.map(task, shards, [date.today()] * len(shards))
+
+
+def _init_worker(path: str):
+    """ worker start: points db.database at the file, every worker opens its own connection on first use """
+    database.set_database(path)
+
+
+def _streaks_of_shard(shard: List[Tuple[int, Frequency]], today: date) -> Dict[int, Tuple[int, int]]:
+    """ worker task: current and longest streak of the habits of one shard """
+    habit_ids = [habit_id for habit_id, _ in shard]
+    days_by_habit = get_completion_days_grouped(habit_ids)
+    archived_by_habit = get_archived_days_grouped(habit_ids)
+    return {
+        habit_id: streaks_of_days(merge_days(archived_by_habit.get(habit_id, []), days_by_habit.get(habit_id, [])), frequency)
+        for habit_id, frequency in shard
+    }
+
+
+def _statuses_of_shard(shard: List[Tuple[int, Frequency]], today: date) -> Dict[int, Tuple[bool, bool]]:
+    """ worker task: (broken, open today) of the habits of one shard """
+    days_by_habit = get_first_and_last_days([habit_id for habit_id, _ in shard])
+    return {
+        habit_id: (is_broken(days_by_habit.get(habit_id, []), frequency, today),
+                   is_open(days_by_habit.get(habit_id, []), frequency, today))
+        for habit_id, frequency in shard
+    }
@@ -0,0 +1,261 @@
+import asyncio
+import heapq
+import threading
+from datetime import date, datetime
+from typing import Dict, List, Optional, Tuple
+from models.habit import Habit
+from models.streaks import get_period, get_period_start
+from db.habit_repository import get_habits_with_streaks, get_existing_ids
+from db.async_database import run_in_db_thread
+
+# Opt-in reminder scheduler: one min-heap entry (next_due_at, break_at, habit_id) per habit, built once from the
+# streak summary and kept current by the habit controllers, so due habits are found without rescanning the database
+
+# Sort key of habits that cannot break yet (never completed)
+NEVER = datetime.max
+
+# Longest sleep of wait_next_async before it looks at the heap again, picks up habits scheduled by other threads
+ASYNC_POLL_SECONDS = 1.0
+
+_condition = threading.Condition()
+_heap: List[Tuple[datetime, datetime, int]] = []
+# the valid heap entry of every habit, entries in the heap that are not in here are stale and skipped
+_entries: Dict[int, Tuple[datetime, datetime, int]] = {}
+# (frequency, created_at, first day, last day) of every habit, the days are None without completions
+_habits: Dict[int, tuple] = {}
+_started = False
+
+
+def start():
+    """"
+        Desc: Enables the scheduler and builds the heap from one query over habits and their streak summary,
+              calling it again rebuilds the heap
+        Args: /
+        Returns: /
+    """
+    global _started
+    rows = get_habits_with_streaks()
+    with _condition:
+        _habits.clear()
+        _entries.clear()
+        for habit, first_day, last_day, *_ in rows:
+            _habits[habit.id] = (habit.frequency, habit.created_at, first_day, last_day)
+            _entries[habit.id] = _entry(habit.id)
+        _heap[:] = _entries.values()
+        heapq.heapify(_heap)
+        _started = True
+        _condition.notify_all()
+
+
+def is_enabled() -> bool:
+    """ checks if the scheduler is running """
+    return _started
+
+
+def close():
+    """ stops the scheduler, drops the heap and wakes every waiting thread """
+    global _started
+    with _condition:
+        _started = False
+        _heap.clear()
+        _entries.clear()
+        _habits.clear()
+        _condition.notify_all()
+
+
+def on_habit_added(habit_id: int, habit: Habit):
+    """"
+        Desc: Schedules a new habit, it is due from its creation on
+        Args: ID of habit, habit object
+        Returns: /
+    """
+    with _condition:
+        if _started:
+            _habits[habit_id] = (habit.frequency, habit.created_at, None, None)
+            _push(_entry(habit_id))
+
+
+def on_habit_completed(habit_id: int, timestamp: Optional[datetime] = None):
+    """"
+        Desc: Moves a habit behind the period of a new completion
+        Args: ID of habit, timestamp of the completion (now)
+        Returns: /
+    """
+    day = (timestamp or datetime.now()).toordinal()
+    if not _started:
+        return
+    # not scheduled yet (added outside the controllers): one summary row is read, outside the lock
+    rows = get_habits_with_streaks(habit_id) if habit_id not in _habits else []
+    with _condition:
+        if not _started:
+            return
+        if habit_id not in _habits:
+            if not rows:
+                return
+            habit, first_day, last_day, *_ = rows[0]
+            _habits[habit_id] = (habit.frequency, habit.created_at, first_day, last_day)
+        frequency, created_at, first_day, last_day = _habits[habit_id]
+        _habits[habit_id] = (frequency, created_at, min(first_day or day, day), max(last_day or day, day))
+        _push(_entry(habit_id))
+
+
+def on_habit_updated(habit_id: int, habit: Habit):
+    """"
+        Desc: Reschedules a habit after its frequency or creation date changed
+        Args: ID of habit, updated habit object
+        Returns: /
+    """
+    with _condition:
+        if _started and habit_id in _habits:
+            _, _, first_day, last_day = _habits[habit_id]
+            _habits[habit_id] = (habit.frequency, habit.created_at, first_day, last_day)
+            _push(_entry(habit_id))
+
+
+def on_habit_deleted(habit_id: int):
+    """ removes a habit from the schedule, its heap entry becomes stale """
+    with _condition:
+        _habits.pop(habit_id, None)
+        _entries.pop(habit_id, None)
+
+
+def next_due_at() -> Optional[datetime]:
+    """ time of the earliest upcoming reminder, None if nothing is scheduled """
+    with _condition:
+        _drop_stale()
+        return _heap[0][0] if _heap else None
+
+
+def pop_due(now: Optional[datetime] = None) -> List[Tuple[datetime, datetime, int]]:
+    """"
+        Desc: Takes every habit whose reminder is due. A reported habit is scheduled again for the start of the
+              period after now, so it is reminded once per period until it is completed. Due habits that were
+              deleted without the controllers (e.g. delete_all_habits) are dropped from the schedule instead
+        Args: point in time to check against (now)
+        Returns: List of (next_due_at, break_at, habit ID) entries, earliest first;
+                 break_at is when the current streak breaks (NEVER without completions)
+    """
+    now = now or datetime.now()
+    due = []
+    with _condition:
+        while _heap and _heap[0][0] <= now:
+            entry = heapq.heappop(_heap)
+            if _entries.get(entry[2]) is entry:
+                due.append(entry)
+    if not due:
+        return due
+
+    # only the due habits are looked up, by primary key and without holding the lock
+    try:
+        existing = get_existing_ids(entry[2] for entry in due)
+    except Exception:
+        with _condition:
+            for entry in due:
+                if _entries.get(entry[2]) is entry:
+                    heapq.heappush(_heap, entry)
+        raise
+
+    reported = []
+    with _condition:
+        for entry in due:
+            habit_id = entry[2]
+            # completed, updated or deleted meanwhile: the newer entry (if any) is already scheduled
+            if _entries.get(habit_id) is not entry:
+                continue
+            if habit_id not in existing:
+                _habits.pop(habit_id, None)
+                _entries.pop(habit_id, None)
+                continue
+            frequency, created_at, first_day, _ = _habits[habit_id]
+            base_day = first_day or created_at.toordinal()
+            _push((_day_start(get_period_start(get_period(now.toordinal(), frequency, base_day) + 1, frequency, base_day)),
+                   entry[1], habit_id))
+            reported.append(entry)
+    return reported
+
+
+def wait_next(timeout: Optional[float] = None) -> List[Tuple[datetime, datetime, int]]:
+    """"
+        Desc: Blocks until at least one reminder is due and takes the due habits (see pop_due), wakes up early
+              when a habit is scheduled before the current earliest one
+        Args: seconds to wait at most (None waits forever)
+        Returns: List of (next_due_at, break_at, habit ID) entries, empty if the timeout expired or the scheduler stopped
+    """
+    deadline = None if timeout is None else datetime.now().timestamp() + timeout
+    while _started:
+        due = pop_due()
+        if due:
+            return due
+        with _condition:
+            if not _started:
+                break
+            # a habit scheduled since pop_due is already in the heap, the delay becomes 0
+            upcoming = next_due_at()
+            delay = None if upcoming is None else max((upcoming - datetime.now()).total_seconds(), 0)
+            if deadline is not None:
+                remaining = deadline - datetime.now().timestamp()
+                if remaining <= 0:
+                    return []
+                delay = remaining if delay is None else min(delay, remaining)
+            _condition.wait(delay)
+    return []
+
+
+async def wait_next_async(timeout: Optional[float] = None) -> List[Tuple[datetime, datetime, int]]:
+    """"
+        Desc: async version of wait_next, sleeps on the event loop instead of blocking a thread
+        Args: seconds to wait at most (None waits forever)
+        Returns: List of (next_due_at, break_at, habit ID) entries, empty if the timeout expired or the scheduler stopped
+    """
+    loop = asyncio.get_running_loop()
+    deadline = None if timeout is None else loop.time() + timeout
+    while _started:
+        upcoming = next_due_at()
+        if upcoming is not None and upcoming <= datetime.now():
+            # pop_due reads the database, it runs on the database executor instead of the event loop
+            due = await run_in_db_thread(pop_due)
+            if due:
+                return due
+            upcoming = next_due_at()
+        delay = ASYNC_POLL_SECONDS
+        if upcoming is not None:
+            delay = min(delay, max((upcoming - datetime.now()).total_seconds(), 0))
+        if deadline is not None:
+            remaining = deadline - loop.time()
+            if remaining <= 0:
+                return []
+            delay = min(delay, remaining)
+        await asyncio.sleep(delay)
+    return []
+
+
+def _entry(habit_id: int) -> Tuple[datetime, datetime, int]:
+    """ heap entry of a habit: due from the period after its last completion, broken one period later """
+    frequency, created_at, first_day, last_day = _habits[habit_id]
+    if last_day is None:
+        return created_at, NEVER, habit_id
+    period = get_period(last_day, frequency, first_day)
+    return (_day_start(get_period_start(period + 1, frequency, first_day)),
+            _day_start(get_period_start(period + 2, frequency, first_day)), habit_id)
+
+
+def _push(entry: Tuple[datetime, datetime, int]):
+    """ makes entry the valid entry of its habit and wakes waiting threads, older entries turn stale """
+    _entries[entry[2]] = entry
+    heapq.heappush(_heap, entry)
+    # stale entries are only skipped when they reach the top, compact the heap once they outnumber the valid ones
+    if len(_heap) > 2 * len(_entries) + 64:
+        _heap[:] = _entries.values()
+        heapq.heapify(_heap)
+    _condition.notify_all()
+
+
+def _drop_stale():
+    """ pops stale entries off the top of the heap """
+    while _heap and _entries.get(_heap[0][2]) is not _heap[0]:
+        heapq.heappop(_heap)
+
+
+def _day_start(day: int) -> datetime:
+    """ midnight at the start of a day ordinal """
+    return datetime.combine(date.fromordinal(day), datetime.min.time())
@@ -0,0 +1,9 @@
+import os
+import pytest
+from db.database import init_db, DB_PATH_ENV, MEMORY_DB
+
+
+@pytest.fixture(scope="session", autouse=True)
+def migrated_db():
+    """Run the suite against a fresh in-memory database (or HABIT_TRACKER_DB if set) on the latest schema version"""
+    init_db(os.environ.get(DB_PATH_ENV, MEMORY_DB))
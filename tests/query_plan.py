@@ -0,0 +1,31 @@
+from db.database import get_connection
+
+
+def capture_query_plans(fn, *args, **kwargs):
+    """Runs fn and returns (statement, [plan details]) for every SELECT/UPDATE/DELETE it executed"""
+    conn = get_connection()
+    statements = []
+    conn.set_trace_callback(statements.append)
+    try:
+        fn(*args, **kwargs)
+    finally:
+        conn.set_trace_callback(None)
+
+    plans = []
+    for sql in statements:
+        if sql.lstrip().split(None, 1)[0].upper() not in ("SELECT", "UPDATE", "DELETE"):
+            continue
+        rows = conn.execute("EXPLAIN QUERY PLAN " + sql).fetchall()
+        plans.append((sql, [row[3] for row in rows]))
+    return plans
+
+
+def assert_uses_index(fn, index_name, *args, **kwargs):
+    """Asserts fn touches the database through index_name and never needs a full scan or a temp sort"""
+    plans = capture_query_plans(fn, *args, **kwargs)
+    assert plans, "no query was executed"
+    for sql, details in plans:
+        plan = " | ".join(details)
+        assert any(index_name in detail for detail in details), f"{index_name} not used by {sql!r}: {plan}"
+        assert not any(detail.startswith("SCAN") for detail in details), f"full scan in {sql!r}: {plan}"
+        assert not any("TEMP B-TREE" in detail for detail in details), f"temp sort in {sql!r}: {plan}"
@@ -0,0 +1,83 @@
+from datetime import datetime, timedelta
+from models.habit import Habit, Frequency
+from db import database
+from db.habit_repository import insert_habit, delete_habit
+from db.habit_completion_repository import complete_habit
+from services import analytics_cache, analytics_service
+
+START = datetime(2024, 1, 1, 9)
+
+
+def test_repeated_reads_are_cache_hits():
+    """A second read without writes in between should be served from the cache"""
+    habit_id = insert_habit(Habit(0, "C_Hits", "", Frequency.DAILY, START))
+    analytics_cache.clear_cache()
+
+    first = analytics_service.get_current_streak_all_habits()
+    second = analytics_service.get_current_streak_all_habits()
+    assert first == second
+    assert analytics_cache.get_cache_stats() == {"hits": 1, "misses": 1, "size": 1}
+
+    # hits hand out the cached result itself instead of a copy
+    assert second is first
+    delete_habit(habit_id)
+
+
+def test_hits_return_cached_objects():
+    """A hit should hand out the cached Habit and HabitStatus objects without copying them"""
+    habit_id = insert_habit(Habit(0, "C_Objects", "", Frequency.DAILY, START))
+    analytics_cache.clear_cache()
+
+    first = analytics_service.get_open_tasks_for_today()
+    assert analytics_service.get_open_tasks_for_today() is first
+    status = analytics_service.get_habit_status(habit_id)
+    assert analytics_service.get_habit_status(habit_id) is status
+    assert status.habit.title == "C_Objects"
+    assert analytics_cache.get_cache_stats()["hits"] == 2
+    delete_habit(habit_id)
+
+
+def test_own_write_invalidates_cache():
+    """Completing a habit should make the next read recalculate"""
+    habit_id = insert_habit(Habit(0, "C_OwnWrite", "", Frequency.DAILY, START))
+    assert analytics_service.get_longest_streak_for_habit(habit_id) == 0
+
+    complete_habit(habit_id, START)
+    assert analytics_service.get_longest_streak_for_habit(habit_id) == 1
+    delete_habit(habit_id)
+
+
+def test_write_from_other_connection_invalidates_cache():
+    """A commit on a connection the cache knows nothing about (like another process) should be noticed"""
+    habit_id = insert_habit(Habit(0, "C_Foreign", "", Frequency.DAILY, START))
+    assert analytics_service.get_current_streak_for_habit(habit_id) == 0
+
+    other = database._open_connection()
+    other.execute("""
+        INSERT INTO habit_streaks (habit_id, first_day, last_day, current_streak, longest_streak)
+        VALUES (?, 1, 1, 7, 7)
+    """, (habit_id,))
+    other.commit()
+    other.close()
+
+    assert analytics_service.get_current_streak_for_habit(habit_id) == 7
+    delete_habit(habit_id)
+
+
+def test_least_recently_used_results_are_evicted(monkeypatch):
+    """The cache should never hold more than CACHE_SIZE results"""
+    monkeypatch.setattr(analytics_cache, "CACHE_SIZE", 2)
+    analytics_cache.clear_cache()
+    habit_id = insert_habit(Habit(0, "C_Evict", "", Frequency.WEEKLY, START))
+    complete_habit(habit_id, START + timedelta(days=7))
+
+    analytics_service.get_current_streak_for_habit(habit_id)
+    analytics_service.get_longest_streak_for_habit(habit_id)
+    analytics_service.get_current_streak_for_habit(habit_id)
+    analytics_service.get_broken_habits()
+    assert analytics_cache.get_cache_stats()["size"] == 2
+
+    # the longest streak was used least recently and has been evicted
+    analytics_service.get_longest_streak_for_habit(habit_id)
+    assert analytics_cache.get_cache_stats() == {"hits": 1, "misses": 4, "size": 2}
+    delete_habit(habit_id)
@@ -72,3 +72,27 @@ def test_get_broken_habits():
     """Should return list of Habit objects (may be empty)"""
     broken = analytics_controller.get_broken_habits()
     assert isinstance(broken, list)
+
+
+def test_get_habit_statuses():
+    """Should return a status for the new habit with its streaks and last completion"""
+    hid = create_test_habit("C_Status")
+    now = datetime.now()
+    complete_habit(hid, now)
+
+    status = analytics_controller.get_habit_status(hid)
+    assert (status.current_streak, status.longest_streak, status.open_today, status.broken) == (1, 1, False, False)
+    assert hid in [status.habit.id for status in analytics_controller.get_habit_statuses()]
+    delete_habit(hid)
+
+
+def test_get_completion_rates():
+    """Should return the default windows for every habit and custom windows for one habit"""
+    hid = create_test_habit("C_Rates")
+    complete_habit(hid, datetime.now())
+
+    rates = analytics_controller.get_completion_rates()
+    assert set(rates[hid]["rates"]) == {7, 30, 90, 365}
+    assert analytics_controller.get_completion_rates_for_habit(hid, windows=[1])["rates"] == {1: 1.0}
+    assert analytics_controller.get_completion_rates_for_habit(-1) is None
+    delete_habit(hid)
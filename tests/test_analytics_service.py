@@ -1,8 +1,13 @@
-from datetime import datetime, timedelta
+import tracemalloc
+from datetime import date, datetime, timedelta
 from models.habit import Habit, Frequency
-from db.habit_repository import insert_habit, delete_habit, get_all_habits
-from db.habit_completion_repository import complete_habit
+from db.habit_repository import insert_habit, delete_habit, get_all_habits, get_habit_by_id
+from db.habit_completion_repository import complete_habit, complete_habits_bulk, get_completions
+from db.habit_streak_repository import get_streak
 from services import analytics_service
+from models.completion_rates import PeriodCounts
+from models import streaks as models_streaks
+from tests.query_plan import capture_query_plans
 
 
 def create_test_habit(name: str, frequency=Frequency.DAILY):
@@ -29,11 +34,30 @@ def test_get_periods():
 
 def test_are_consecutive():
     """Test consecutive daily periods"""
-    day1 = datetime(2024, 1, 1).date()
-    day2 = datetime(2024, 1, 2).date()
-    day4 = datetime(2024, 1, 4).date()
-    assert analytics_service.are_consecutive(day1, day2, Frequency.DAILY)
-    assert not analytics_service.are_consecutive(day1, day4, Frequency.DAILY)
+    day1, day2, day4 = analytics_service.get_periods(
+        [datetime(2024, 1, 1), datetime(2024, 1, 2), datetime(2024, 1, 4)], Frequency.DAILY
+    )
+    assert models_streaks.are_consecutive(day1, day2, Frequency.DAILY)
+    assert not models_streaks.are_consecutive(day1, day4, Frequency.DAILY)
+
+
+def test_weekly_streak_across_53_week_year():
+    """Week 53 of 2020 should connect week 52 of 2020 with week 1 of 2021"""
+    completions = [datetime(2020, 12, 14), datetime(2020, 12, 21), datetime(2020, 12, 28), datetime(2021, 1, 4)]
+    periods = analytics_service.get_periods(list(completions), Frequency.WEEKLY)
+    assert [b - a for a, b in zip(periods, periods[1:])] == [1, 1, 1]
+    assert analytics_service.calculate_longest_streak(list(completions), Frequency.WEEKLY) == 4
+    assert analytics_service.calculate_current_streak(list(completions), Frequency.WEEKLY) == 4
+
+
+def test_broken_and_open_across_year_boundary():
+    """A weekly habit done in the last ISO week of a year is neither broken nor done in the first week of the next"""
+    days = [date(2020, 12, 31).toordinal()]
+    assert not analytics_service.is_broken(days, Frequency.WEEKLY, date(2021, 1, 5))
+    assert analytics_service.is_open(days, Frequency.WEEKLY, date(2021, 1, 5))
+    assert not analytics_service.is_open(days, Frequency.WEEKLY, date(2021, 1, 3))
+    assert analytics_service.is_broken(days, Frequency.WEEKLY, date(2021, 1, 11))
+    assert not analytics_service.is_broken(days, Frequency.MONTHLY, date(2021, 1, 31))
 
 
 def test_calculate_longest_streak():
@@ -145,3 +169,188 @@ def test_get_open_tasks_for_today():
         assert hasattr(habit, "title")
         assert hasattr(habit, "frequency")
 
+
+
+def test_streaks_from_days_match_datetime_path():
+    """Day ordinals read from the database should give the same streaks as datetimes"""
+    start = datetime(2023, 12, 25, 9, 30)
+    completions = [start + timedelta(days=i) for i in (0, 1, 2, 7, 8, 14, 21, 22, 23, 24, 60)]
+    days = [completion.toordinal() for completion in completions]
+    for frequency in Frequency:
+        assert analytics_service.calculate_longest_streak_from_days(days, frequency) == \
+            analytics_service.calculate_longest_streak(list(completions), frequency)
+        assert analytics_service.calculate_current_streak_from_days(days, frequency) == \
+            analytics_service.calculate_current_streak(list(completions), frequency)
+
+
+def test_all_habit_analytics_use_constant_number_of_queries():
+    """The number of queries of the all-habits analytics should not grow with the number of habits"""
+    functions = (analytics_service.get_longest_streak_all_habits, analytics_service.get_current_streak_all_habits,
+                 analytics_service.get_broken_habits, analytics_service.get_open_tasks_for_today)
+    habit_ids = [create_test_habit("TEST_n_plus_one")]
+    counts = [len(capture_query_plans(fn)) for fn in functions]
+
+    habit_ids += [create_test_habit(f"TEST_n_plus_one_{i}") for i in range(5)]
+    assert [len(capture_query_plans(fn)) for fn in functions] == counts
+
+    for habit_id in habit_ids:
+        delete_habit(habit_id)
+
+
+def test_habit_status_matches_single_metrics():
+    """The status snapshot should agree with the separate analytics functions and come from one query"""
+    now = datetime.now()
+    habit_id = create_test_habit("TEST_status", Frequency.DAILY)
+    for offset in (9, 8, 7, 2, 1):
+        complete_habit(habit_id, now - timedelta(days=offset))
+    empty_id = create_test_habit("TEST_status_empty", Frequency.WEEKLY)
+
+    status = analytics_service.get_habit_status(habit_id)
+    assert status.habit.id == habit_id
+    assert status.current_streak == analytics_service.get_current_streak_for_habit(habit_id) == 2
+    assert status.longest_streak == analytics_service.get_longest_streak_for_habit(habit_id) == 3
+    assert status.open_today == any(habit.id == habit_id for habit in analytics_service.get_open_tasks_for_today())
+    assert status.broken == any(habit.id == habit_id for habit in analytics_service.get_broken_habits())
+    assert status.last_completed == get_completions(habit_id)[-1]
+
+    statuses = {status.habit.id: status for status in analytics_service.get_habit_statuses()}
+    assert statuses[habit_id].longest_streak == 3
+    assert (statuses[empty_id].current_streak, statuses[empty_id].open_today, statuses[empty_id].last_completed) == (0, True, None)
+    assert analytics_service.get_habit_status(-1) is None
+
+    assert len(capture_query_plans(analytics_service.get_habit_status.__wrapped__, habit_id)) == 1
+    assert len(capture_query_plans(analytics_service.get_habit_statuses.__wrapped__)) == 1
+    delete_habit(habit_id)
+    delete_habit(empty_id)
+
+
+def test_streaming_streaks_keep_memory_constant():
+    """Streaks of a long generated history should be calculated without holding the history in memory"""
+    start = date(1990, 1, 1).toordinal()
+    completions = (datetime.fromordinal(start + offset // 1440) + timedelta(minutes=offset % 1440)
+                   for offset in range(0, 20 * 365 * 1440, 577))
+    tracemalloc.start()
+    try:
+        longest = analytics_service.calculate_longest_streak(completions, Frequency.DAILY)
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    assert longest == 20 * 365
+    assert peak < 64 * 1024
+
+
+def test_stream_streaks_for_habit_reads_cursor():
+    """Streaming from the database should give the same streaks as the stored summary"""
+    habit_id = create_test_habit("TEST_stream", Frequency.WEEKLY)
+    start = datetime(2024, 1, 1, 9)
+    complete_habits_bulk((habit_id, start + timedelta(days=offset)) for offset in (0, 1, 7, 14, 30, 37, 38))
+
+    assert analytics_service.stream_streaks_for_habit(habit_id) == get_streak(habit_id) == (2, 3)
+    assert analytics_service.stream_streaks_for_habit(-1) == (0, 0)
+    delete_habit(habit_id)
+
+
+def test_streaks_as_of_and_between_match_recalculation():
+    """Run index lookups should equal a recalculation from the completions up to / within the dates"""
+    start = datetime(2023, 1, 2, 9)
+    offsets = [0, 1, 2, 3, 9, 10, 16, 17, 18, 30, 31, 45, 60, 61, 62, 63, 64, 90, 120, 150]
+    for frequency in Frequency:
+        habit_id = create_test_habit(f"TEST_as_of_{frequency.value}", frequency)
+        complete_habits_bulk((habit_id, start + timedelta(days=offset)) for offset in offsets)
+        days = [(start + timedelta(days=offset)).toordinal() for offset in offsets]
+        periods = [models_streaks.get_period(day, frequency, days[0]) for day in days]
+
+        checked = [start.date() + timedelta(days=offset) for offset in range(-3, 200, 4)]
+        expected = []
+        for day in checked:
+            period = models_streaks.get_period(day.toordinal(), frequency, days[0])
+            before = [p for p, completed in zip(periods, days) if completed <= day.toordinal()]
+            broken = not before or before[-1] < period - 1
+            expected.append(0 if broken else models_streaks.current_streak_of_periods(before))
+        assert analytics_service.get_streaks_as_of(habit_id, checked) == expected
+        assert analytics_service.get_streak_as_of(habit_id, checked[-1]) == expected[-1]
+
+        for first, last in ((start.date(), start.date() + timedelta(days=40)), (start.date() + timedelta(days=12), start.date() + timedelta(days=70))):
+            inside = [p for p, completed in zip(periods, days) if first.toordinal() <= completed <= last.toordinal()]
+            assert analytics_service.get_longest_streak_between(habit_id, first, last) == \
+                models_streaks.longest_streak_of_periods(inside)
+        delete_habit(habit_id)
+
+    assert analytics_service.get_streak_as_of(-1, date.today()) == 0
+
+
+def test_streaks_as_of_and_between_clip_boundary_periods():
+    """A period cut by the as-of day or the range only counts with a completion on the right side of the cut"""
+    weekly_id = create_test_habit("TEST_as_of_clip_weekly", Frequency.WEEKLY)
+    complete_habits_bulk([(weekly_id, datetime(2023, 1, 6, 9)), (weekly_id, datetime(2023, 1, 13, 9))])
+    assert analytics_service.get_streaks_as_of(weekly_id, [date(2023, 1, 9), date(2023, 1, 13)]) == [1, 2]
+    assert analytics_service.get_longest_streak_between(weekly_id, date(2023, 1, 7), date(2023, 1, 12)) == 0
+
+    monthly_id = create_test_habit("TEST_as_of_clip_monthly", Frequency.MONTHLY)
+    complete_habits_bulk([(monthly_id, datetime(2023, 1, 2, 9)), (monthly_id, datetime(2023, 2, 27, 9))])
+    assert analytics_service.get_longest_streak_between(monthly_id, date(2023, 1, 15), date(2023, 2, 10)) == 0
+    assert analytics_service.get_longest_streak_between(monthly_id, date(2023, 1, 1), date(2023, 2, 10)) == 1
+    assert analytics_service.get_longest_streak_between(monthly_id, date(2023, 1, 2), date(2023, 2, 27)) == 2
+    delete_habit(weekly_id)
+    delete_habit(monthly_id)
+
+
+def test_period_counts_windows():
+    """Prefix sums should count any window of periods, clamped to the lifetime of the habit"""
+    counts = PeriodCounts([10, 11, 13, 13, 17], first_period=10, last_period=19)
+    assert counts.count(10, 19) == 4
+    assert counts.count(12, 14) == 1
+    assert counts.count(0, 10) == 1
+    assert counts.rate(5) == 1 / 5
+    assert counts.rate(4, end_period=13) == 3 / 4
+    assert counts.rate(30) == 4 / 10
+    assert counts.rate_between(20, 25) == 0.0
+
+
+def test_completion_rates_match_recount():
+    """Rates over the last N periods should equal a direct count of the completed periods"""
+    today = date.today()
+    habit_id = create_test_habit("TEST_rates", Frequency.DAILY)
+    offsets = [0, 1, 2, 4, 8, 9, 20, 40, 41, 200]
+    complete_habits_bulk((habit_id, datetime.now() - timedelta(days=offset)) for offset in offsets)
+
+    rates = analytics_service.get_completion_rates(habit_id, windows=(7, 30, 3, 1000))[habit_id]
+    assert rates[7] == 4 / 7
+    assert rates[30] == 7 / 30
+    assert rates[3] == 1.0
+    # the habit exists since its first completion 200 days ago
+    assert rates[1000] == 10 / 201
+    assert analytics_service.get_completion_rate_between(habit_id, today - timedelta(days=9), today - timedelta(days=8)) == 1.0
+    assert habit_id in analytics_service.get_completion_rates()
+    delete_habit(habit_id)
+
+
+def test_open_and_broken_checks_read_no_completions():
+    """Open tasks and broken habits should be one SELECT over habits and the summary"""
+    habit_id = create_test_habit("TEST_due", Frequency.BIWEEKLY)
+    complete_habit(habit_id, datetime.now() - timedelta(days=40))
+
+    for function in (analytics_service.get_open_tasks_for_today, analytics_service.get_broken_habits):
+        plans = capture_query_plans(function.__wrapped__)
+        assert len(plans) == 1
+        assert "habit_completions" not in plans[0][0]
+        assert habit_id in [habit.id for habit in function()]
+    delete_habit(habit_id)
+
+
+def test_current_streak_longer_than_window(monkeypatch):
+    """The tail window should grow until it covers the whole current streak"""
+    monkeypatch.setattr(analytics_service, "STREAK_WINDOW", 4)
+    start = datetime(2024, 1, 1, 8)
+    habits = {frequency: create_test_habit(f"TEST_window_{frequency.value}", frequency) for frequency in Frequency}
+    for frequency, habit_id in habits.items():
+        # a gap early on, then a long run of daily completions
+        complete_habits_bulk([(habit_id, start - timedelta(days=100))] +
+                             [(habit_id, start + timedelta(days=i)) for i in range(90)])
+
+    streaks = analytics_service.compute_current_streak_all_habits()
+    for frequency, habit_id in habits.items():
+        expected = analytics_service.calculate_current_streak(get_completions(habit_id), frequency)
+        assert streaks[habit_id] == expected
+        assert analytics_service.current_streaks_from_tail([get_habit_by_id(habit_id)], [habit_id])[habit_id] == expected
+        delete_habit(habit_id)
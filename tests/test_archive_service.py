@@ -0,0 +1,59 @@
+from datetime import datetime, date, timedelta
+from models.habit import Habit, Frequency
+from db.habit_repository import insert_habit, delete_habit
+from db.habit_completion_repository import complete_habits_bulk, get_completions
+from db.completion_archive_repository import get_archived_counts
+from services import analytics_service, archive_service
+
+
+def create_habit_with_history(name, frequency, days):
+    """Insert a habit with one completion (two on the first day) for each day offset before today"""
+    habit_id = insert_habit(Habit(0, name, "", frequency, datetime(2020, 1, 1)))
+    today = datetime.combine(date.today(), datetime.min.time()) + timedelta(hours=9)
+    rows = [(habit_id, today - timedelta(days=offset)) for offset in days]
+    rows.append((habit_id, today - timedelta(days=max(days), hours=1)))
+    complete_habits_bulk(rows)
+    return habit_id
+
+
+def test_archiving_keeps_analytics_results():
+    """Streaks, open and broken checks should be the same before and after archiving"""
+    history = list(range(0, 40)) + list(range(45, 400)) + list(range(410, 800, 3))
+    habits = {frequency: create_habit_with_history(f"AR_{frequency.value}", frequency, history) for frequency in Frequency}
+
+    def snapshot():
+        return (
+            {hid: analytics_service.get_longest_streak_for_habit(hid) for hid in habits.values()},
+            {hid: analytics_service.get_current_streak_for_habit(hid) for hid in habits.values()},
+            {hid: streak for hid, streak in analytics_service.get_longest_streak_all_habits().items() if hid in habits.values()},
+            {hid: streak for hid, streak in analytics_service.get_current_streak_all_habits().items() if hid in habits.values()},
+            {h.id for h in analytics_service.get_broken_habits() if h.id in habits.values()},
+            {h.id for h in analytics_service.get_open_tasks_for_today() if h.id in habits.values()},
+        )
+
+    before = snapshot()
+    archived = archive_service.archive_cold_history(keep_days=30)
+    assert archived > 0
+    assert snapshot() == before
+
+    daily = habits[Frequency.DAILY]
+    # the current streak (the last 40 days) stays hot, the older history is rolled up per day
+    assert len(get_completions(daily)) == 40
+    assert get_archived_counts(daily)[0][1] == 2
+
+    for habit_id in habits.values():
+        delete_habit(habit_id)
+
+
+def test_archiving_reads_one_habit_at_a_time(monkeypatch):
+    """Only habits with history before the cutoff should have their completions read, one habit per read"""
+    cold = create_habit_with_history("AR_Cold", Frequency.DAILY, [0, 1, 2, 100, 101])
+    hot = create_habit_with_history("AR_Hot", Frequency.DAILY, [0, 1, 2])
+    reads = []
+    read_days = archive_service.get_completion_days
+    monkeypatch.setattr(archive_service, "get_completion_days", lambda habit_id: reads.append(habit_id) or read_days(habit_id))
+
+    assert archive_service.archive_cold_history(keep_days=30) == 3
+    assert cold in reads and hot not in reads
+    delete_habit(cold)
+    delete_habit(hot)
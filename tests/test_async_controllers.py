@@ -0,0 +1,43 @@
+import asyncio
+from datetime import datetime, timedelta
+from models.habit import Habit, Frequency
+from controllers import async_habit_controller, async_habit_completion_controller, async_analytics_controller
+from db import async_habit_completion_repository
+
+
+def test_async_habit_round_trip():
+    """Should add, read and delete a habit without blocking the event loop"""
+    async def scenario():
+        habit_id = await async_habit_controller.add_habit(Habit(0, "A_RoundTrip", "", Frequency.DAILY, datetime.now()))
+        await async_habit_completion_controller.complete_habit(habit_id)
+        fetched = await async_habit_controller.get_habit(habit_id)
+        completions = await async_habit_completion_controller.get_completions(habit_id)
+        deleted = await async_habit_controller.delete_habit(habit_id)
+        return fetched, completions, deleted
+
+    fetched, completions, deleted = asyncio.run(scenario())
+    assert fetched.title == "A_RoundTrip"
+    assert len(completions) == 1
+    assert deleted
+
+
+def test_async_streaks_gathered_over_many_habits():
+    """Gathering streaks for many habits should match the synchronous results"""
+    async def scenario():
+        now = datetime.now()
+        habit_ids = []
+        for length in range(1, 6):
+            habit_id = await async_habit_controller.add_habit(Habit(0, f"A_Gather_{length}", "", Frequency.DAILY, now))
+            await async_habit_completion_repository.complete_habits_bulk(
+                [(habit_id, now - timedelta(days=i)) for i in range(length)])
+            habit_ids.append(habit_id)
+
+        streaks = await async_analytics_controller.get_current_streaks_for_habits(habit_ids)
+        longest = await async_analytics_controller.get_longest_streaks_for_habits(habit_ids)
+        for habit_id in habit_ids:
+            await async_habit_controller.delete_habit(habit_id)
+        return habit_ids, streaks, longest
+
+    habit_ids, streaks, longest = asyncio.run(scenario())
+    assert [streaks[habit_id]["streak"] for habit_id in habit_ids] == [1, 2, 3, 4, 5]
+    assert [longest[habit_id]["streak"] for habit_id in habit_ids] == [1, 2, 3, 4, 5]
@@ -0,0 +1,93 @@
+from datetime import date, datetime, timedelta
+from models.habit import Habit, Frequency
+from models import completion_bitmap
+from db.database import get_connection
+from db.habit_repository import insert_habit, delete_habit
+from db.habit_completion_repository import complete_habit, complete_habits_bulk
+from db import completion_bitmap_repository
+from services import analytics_service, archive_service
+
+START = datetime(2023, 12, 20, 8)
+
+
+def test_bit_helpers():
+    """Runs of set bits and the days behind them"""
+    assert completion_bitmap.longest_run(0b1110111100) == 4
+    assert completion_bitmap.trailing_run(0b0110111100) == 2
+    assert completion_bitmap.trailing_run(0) == completion_bitmap.longest_run(0) == 0
+    assert list(completion_bitmap.iter_days(100, 0b1011)) == [100, 101, 103]
+
+    bitmaps = completion_bitmap.days_to_bitmaps([date(2024, 12, 31).toordinal(), date(2025, 1, 1).toordinal()])
+    assert len(bitmaps[2024]) == completion_bitmap.BITMAP_BYTES
+    origin, value = completion_bitmap.bitmaps_to_int(bitmaps.items())
+    assert completion_bitmap.longest_run(value) == 2
+    assert completion_bitmap.year_days(2024, bitmaps[2024])[365] is True
+
+
+def test_bitmaps_follow_completions():
+    """complete_habit and complete_habits_bulk should keep the bitmaps equal to a rebuild, across years"""
+    habit_id = insert_habit(Habit(0, "B_Sync", "", Frequency.DAILY, START))
+    complete_habit(habit_id, START)
+    complete_habits_bulk((habit_id, START + timedelta(days=offset)) for offset in (1, 2, 12, 13, 14, 15, 40))
+    complete_habit(habit_id, START + timedelta(days=3))
+    synced = completion_bitmap_repository.get_bitmaps([habit_id])[habit_id]
+    assert [year for year, _ in synced] == [2023, 2024]
+
+    with get_connection() as conn:
+        completion_bitmap_repository.rebuild(conn.cursor(), [habit_id])
+        conn.commit()
+    assert completion_bitmap_repository.get_bitmaps([habit_id])[habit_id] == synced
+    delete_habit(habit_id)
+
+
+def test_bitmap_analytics_match_completions():
+    """Streaks, heatmaps and open tasks from bitmaps should agree with the completion-based analytics"""
+    habit_ids = []
+    for frequency in Frequency:
+        habit_id = insert_habit(Habit(0, f"B_{frequency.value}", "", frequency, START))
+        complete_habits_bulk((habit_id, START + timedelta(days=offset)) for offset in (0, 1, 2, 7, 8, 20, 35, 36, 50, 51, 52))
+        habit_ids.append(habit_id)
+    today = date.today()
+    complete_habit(habit_ids[0], datetime.now())
+
+    assert analytics_service.compute_streaks_all_habits("bitmap") == analytics_service.compute_streaks_all_habits("python")
+
+    heatmap = analytics_service.get_year_heatmap(2024)
+    assert [offset for offset, done in enumerate(heatmap[habit_ids[1]]) if done] == [8, 23, 24, 38, 39, 40]
+    assert len(heatmap[habit_ids[1]]) == 366
+
+    assert [habit.id for habit in analytics_service.get_open_tasks_for_day(today)] == \
+        [habit.id for habit in analytics_service.get_open_tasks_for_today()]
+    assert habit_ids[0] in [habit.id for habit in analytics_service.get_open_tasks_for_day(today - timedelta(days=1))]
+    for habit_id in habit_ids:
+        delete_habit(habit_id)
+
+
+def test_archiving_keeps_bitmaps():
+    """Archived completions keep their days, so the bitmaps stay unchanged"""
+    habit_id = insert_habit(Habit(0, "B_Archive", "", Frequency.DAILY, START))
+    complete_habits_bulk((habit_id, START + timedelta(days=offset)) for offset in (0, 1, 5))
+    before = completion_bitmap_repository.get_bitmaps([habit_id])
+    archive_service.archive_cold_history(keep_days=0, today=date(2030, 1, 1))
+    assert completion_bitmap_repository.get_bitmaps([habit_id]) == before
+    delete_habit(habit_id)
+
+
+def test_rebuild_skips_orphaned_completions():
+    """Completions left behind by a deleted habit should not come back as a bitmap on rebuild"""
+    habit_id = insert_habit(Habit(0, "B_Orphan", "", Frequency.DAILY, START))
+    conn = get_connection()
+    conn.execute("PRAGMA foreign_keys=OFF")
+    try:
+        complete_habits_bulk((habit_id, START + timedelta(days=offset)) for offset in range(3))
+        conn.execute("DELETE FROM habits WHERE id = ?", (habit_id,))
+        conn.commit()
+    finally:
+        conn.execute("PRAGMA foreign_keys=ON")
+
+    with conn:
+        completion_bitmap_repository.rebuild(conn.cursor())
+    assert habit_id not in completion_bitmap_repository.get_bitmaps()
+    assert habit_id not in analytics_service.get_year_heatmap(START.year)
+    conn.execute("DELETE FROM habit_completions WHERE habit_id = ?", (habit_id,))
+    conn.commit()
@@ -1,6 +1,10 @@
-from datetime import datetime
+import time
+from datetime import datetime, timedelta, timezone
 from db.habit_repository import insert_habit, delete_habit, get_all_habits
-from db.habit_completion_repository import complete_habit, get_completions
+from db.habit_completion_repository import (
+    complete_habit, complete_habits_bulk, get_completions, get_completions_grouped, get_completion_days_grouped,
+    iter_completions, get_completion_days
+)
 from models.habit import Habit, Frequency
 
 def test_complete_habit():
@@ -36,3 +40,101 @@ def test_get_completions():
 
     # Clean up
     delete_habit(habit_id)
+
+
+def test_complete_habits_bulk():
+    # Create habit
+    habit = Habit(0, "TEST_bulk", "", Frequency.DAILY, datetime.now())
+    insert_habit(habit)
+    habit_id = get_all_habits()[-1].id
+
+    # Insert 25 days with a chunk size that does not divide evenly
+    start = datetime(2024, 1, 1)
+    rows = ((habit_id, start + timedelta(days=i)) for i in range(25))
+    inserted = complete_habits_bulk(rows, chunk_size=10)
+    assert inserted == 25
+
+    # Check completions come back in order
+    completions = get_completions(habit_id)
+    assert len(completions) == 25
+    assert completions[0] == start
+    assert completions[-1] == start + timedelta(days=24)
+
+    # Clean up
+    delete_habit(habit_id)
+
+
+def test_get_completions_grouped():
+    # Create two habits with completions
+    first = insert_habit(Habit(0, "TEST_grouped_1", "", Frequency.DAILY, datetime.now()))
+    second = insert_habit(Habit(0, "TEST_grouped_2", "", Frequency.DAILY, datetime.now()))
+    start = datetime(2024, 1, 1)
+    complete_habits_bulk([(second, start + timedelta(days=1)), (first, start), (second, start)])
+
+    # Only the requested habits come back, each ordered by time
+    grouped = get_completions_grouped([first, second])
+    assert grouped == {first: [start], second: [start, start + timedelta(days=1)]}
+
+    days = get_completion_days_grouped([second])
+    assert days == {second: [start.toordinal(), start.toordinal() + 1]}
+
+    # Without IDs every habit with completions is included
+    assert second in get_completion_days_grouped()
+
+    # Clean up
+    delete_habit(first)
+    delete_habit(second)
+
+
+def test_iter_completions():
+    # Create habit with a few completions
+    habit_id = insert_habit(Habit(0, "TEST_iter_completions", "", Frequency.DAILY, datetime.now()))
+    start = datetime(2024, 1, 1)
+    complete_habits_bulk((habit_id, start + timedelta(days=i)) for i in range(7))
+
+    # Batches smaller than the history still yield everything in order
+    streamed = iter_completions(habit_id, batch_size=3)
+    assert next(streamed) == start
+    assert list(streamed) == [start + timedelta(days=i) for i in range(1, 7)]
+
+    # Clean up
+    delete_habit(habit_id)
+
+
+def test_get_completions_time_window():
+    # Create habit with ten daily completions
+    habit_id = insert_habit(Habit(0, "TEST_window", "", Frequency.DAILY, datetime.now()))
+    start = datetime(2024, 1, 1, 12)
+    complete_habits_bulk((habit_id, start + timedelta(days=i)) for i in range(10))
+
+    # since is inclusive, until is exclusive
+    window = get_completions(habit_id, since=start + timedelta(days=2), until=start + timedelta(days=5))
+    assert window == [start + timedelta(days=i) for i in (2, 3, 4)]
+
+    # newest first with a limit reads the tail
+    assert get_completions(habit_id, limit=2, newest_first=True) == [start + timedelta(days=9), start + timedelta(days=8)]
+    assert get_completion_days(habit_id, limit=1) == [start.toordinal()]
+
+    # grouped reads take the limit per habit
+    assert get_completion_days_grouped([habit_id], limit=2, newest_first=True) == {
+        habit_id: [start.toordinal() + 8, start.toordinal() + 9]
+    }
+
+    # Clean up
+    delete_habit(habit_id)
+
+
+def test_aware_timestamps_use_the_local_day(monkeypatch):
+    """A UTC timestamp should be stored on the local day of the datetime it is read back as"""
+    monkeypatch.setenv("TZ", "Asia/Tokyo")
+    time.tzset()
+    try:
+        habit_id = insert_habit(Habit(0, "TEST_aware", "", Frequency.DAILY, datetime.now()))
+        complete_habit(habit_id, datetime(2024, 1, 1, 20, 30, 15, 250000, tzinfo=timezone.utc))
+
+        assert get_completions(habit_id) == [datetime(2024, 1, 2, 5, 30, 15)]
+        assert get_completion_days(habit_id) == [datetime(2024, 1, 2).toordinal()]
+        delete_habit(habit_id)
+    finally:
+        monkeypatch.undo()
+        time.tzset()
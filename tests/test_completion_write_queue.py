@@ -0,0 +1,111 @@
+import threading
+from datetime import datetime, timedelta
+import pytest
+from models.habit import Habit, Frequency
+from db.habit_repository import insert_habit, delete_habit
+from db.habit_completion_repository import get_completions
+from db import completion_write_queue
+from controllers import habit_completion_controller
+
+
+@pytest.fixture
+def write_behind():
+    """Start write-behind mode for one test and always stop it again"""
+    completion_write_queue.start(flush_interval_ms=5, max_rows=16)
+    yield
+    completion_write_queue.close()
+
+
+def test_enqueued_completions_are_written_on_flush(write_behind):
+    """Completions from many threads should all be committed after flush()"""
+    habit_id = insert_habit(Habit(0, "W_Flush", "", Frequency.DAILY, datetime.now()))
+    start = datetime(2024, 1, 1)
+
+    def check_off(offset):
+        for i in range(25):
+            completion_write_queue.enqueue(habit_id, start + timedelta(minutes=offset * 25 + i))
+
+    threads = [threading.Thread(target=check_off, args=(n,)) for n in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    completion_write_queue.flush()
+
+    assert len(get_completions(habit_id)) == 100
+    delete_habit(habit_id)
+
+
+def test_controller_uses_queue_when_enabled(write_behind):
+    """The controller should queue check-offs and still read its own writes"""
+    habit_id = insert_habit(Habit(0, "W_Controller", "", Frequency.DAILY, datetime.now()))
+    habit_completion_controller.complete_habit(habit_id)
+    assert len(habit_completion_controller.get_completions(habit_id)) == 1
+    delete_habit(habit_id)
+
+
+def test_close_writes_pending_completions_and_disables_queue():
+    """close() should drain the queue and switch back to direct writes"""
+    habit_id = insert_habit(Habit(0, "W_Close", "", Frequency.DAILY, datetime.now()))
+    completion_write_queue.start(flush_interval_ms=1000)
+    completion_write_queue.enqueue(habit_id, datetime(2024, 1, 1))
+    completion_write_queue.close()
+
+    assert not completion_write_queue.is_enabled()
+    assert get_completions(habit_id) == [datetime(2024, 1, 1)]
+    with pytest.raises(RuntimeError):
+        completion_write_queue.enqueue(habit_id)
+    delete_habit(habit_id)
+
+
+def test_failed_row_only_drops_itself_and_reports_to_its_thread():
+    """A completion for a deleted habit must not take the rest of its batch down or fail other threads"""
+    completion_write_queue.start(flush_interval_ms=200)
+    habit_id = insert_habit(Habit(0, "W_Valid", "", Frequency.DAILY, datetime.now()))
+    deleted_id = insert_habit(Habit(0, "W_Deleted", "", Frequency.DAILY, datetime.now()))
+    delete_habit(deleted_id)
+
+    errors = []
+
+    def enqueue_deleted():
+        completion_write_queue.enqueue(deleted_id, datetime(2024, 1, 1))
+        try:
+            completion_write_queue.flush()
+        except Exception as error:
+            errors.append(error)
+
+    for day in range(1, 6):
+        completion_write_queue.enqueue(habit_id, datetime(2024, 1, day))
+    thread = threading.Thread(target=enqueue_deleted)
+    thread.start()
+    thread.join()
+    completion_write_queue.flush()
+
+    completion_write_queue.close()
+
+    assert len(get_completions(habit_id)) == 5
+    assert len(errors) == 1
+    delete_habit(habit_id)
+
+
+def test_close_with_a_failing_row_pending():
+    """close() should write the last batch, report its failed row to the enqueuing thread and return"""
+    deleted_id = insert_habit(Habit(0, "W_CloseDeleted", "", Frequency.DAILY, datetime.now()))
+    delete_habit(deleted_id)
+    errors = []
+
+    def enqueue_and_close():
+        completion_write_queue.start(flush_interval_ms=1000)
+        completion_write_queue.enqueue(deleted_id, datetime(2024, 1, 1))
+        try:
+            completion_write_queue.close()
+        except Exception as error:
+            errors.append(error)
+
+    # run in a thread so a hanging close() fails the test instead of blocking it
+    closer = threading.Thread(target=enqueue_and_close, daemon=True)
+    closer.start()
+    closer.join(timeout=5)
+    assert not closer.is_alive()
+    assert len(errors) == 1
+    assert not completion_write_queue.is_enabled()
@@ -0,0 +1,145 @@
+import sqlite3
+import threading
+from datetime import datetime, timedelta
+import pytest
+from db import database, habit_repository, habit_completion_repository, habit_streak_repository, completion_bitmap_repository
+from models.habit import Habit, Frequency
+
+
+def test_get_connection_is_reused_per_thread():
+    """Repeated calls in one thread should hand out the same tuned connection"""
+    conn = database.get_connection()
+    assert database.get_connection() is conn
+    expected_journal = "memory" if database.DB_PATH == database.MEMORY_DB else "wal"
+    assert conn.execute("PRAGMA journal_mode").fetchone()[0] == expected_journal
+    assert conn.execute("PRAGMA synchronous").fetchone()[0] == 1  # NORMAL
+
+
+def test_get_connection_differs_between_threads():
+    """Every thread should get its own connection"""
+    main_conn = database.get_connection()
+    other = []
+    thread = threading.Thread(target=lambda: other.append(database.get_connection()))
+    thread.start()
+    thread.join()
+    assert other[0] is not main_conn
+
+
+def test_connections_of_finished_threads_are_closed():
+    """Short-lived threads should not leave their connections open behind them"""
+    database.get_connection()
+    open_before = len(database._connections)
+    connections = []
+    for _ in range(20):
+        thread = threading.Thread(target=lambda: connections.append(database.get_connection()))
+        thread.start()
+        thread.join()
+    assert len(database._connections) == open_before
+    with pytest.raises(sqlite3.ProgrammingError):
+        connections[0].execute("SELECT 1")
+
+
+def test_memory_database_allows_overlapping_reader_and_writer():
+    """Threads reading and writing the in-memory database at the same time should wait for locks, not fail"""
+    habit_id = habit_repository.insert_habit(Habit(0, "Overlap", "", Frequency.DAILY, datetime.now()))
+    errors = []
+
+    def write():
+        try:
+            for minute in range(200):
+                habit_completion_repository.complete_habit(habit_id, datetime(2024, 1, 1) + timedelta(minutes=minute))
+        except Exception as error:
+            errors.append(error)
+
+    def read():
+        try:
+            for _ in range(200):
+                habit_completion_repository.get_completion_days(habit_id)
+        except Exception as error:
+            errors.append(error)
+
+    threads = [threading.Thread(target=target) for target in (write, read, read)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert errors == []
+    assert len(habit_completion_repository.get_completions(habit_id)) == 200
+    habit_repository.delete_habit(habit_id)
+
+
+def test_close_all_connections_reopens_on_next_use():
+    """After the shutdown hook ran, get_connection should open a fresh connection"""
+    conn = database.get_connection()
+    database.close_all_connections()
+    new_conn = database.get_connection()
+    assert new_conn is not conn
+    assert new_conn.execute("SELECT 1").fetchone()[0] == 1
+    database.init_db()
+
+
+def test_init_db_migrates_to_latest_version():
+    """init_db should leave the database on the newest schema version and be safe to re-run"""
+    database.init_db()
+    conn = database.get_connection()
+    assert database.get_schema_version(conn) == len(database.MIGRATIONS)
+    assert database.migrate(conn) == len(database.MIGRATIONS)
+
+    indexes = {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'index'")}
+    assert "idx_habit_completions_habit_completed" in indexes
+    assert "idx_habits_frequency" in indexes
+
+
+def test_migration_converts_iso_text_timestamps(tmp_path):
+    """A schema version 2 database with ISO TEXT timestamps should stay readable after init_db"""
+    previous = database.DB_PATH
+    database.set_database(str(tmp_path / "old.db"))
+    try:
+        conn = database.get_connection()
+        for migration in database.MIGRATIONS[:2]:
+            migration(conn.cursor())
+        conn.execute("PRAGMA user_version = 2")
+        conn.execute("INSERT INTO habits VALUES (1, 'Old', '', 'daily', '2024-01-01T08:00:00')")
+        conn.executemany("INSERT INTO habit_completions (habit_id, completed_at) VALUES (1, ?)",
+                         [("2024-01-02T07:30:00",), ("2024-01-03T21:15:00",)])
+        conn.commit()
+
+        database.init_db()
+
+        assert habit_repository.get_habit_by_id(1).created_at == datetime(2024, 1, 1, 8)
+        assert habit_completion_repository.get_completions(1) == [datetime(2024, 1, 2, 7, 30), datetime(2024, 1, 3, 21, 15)]
+        assert habit_completion_repository.get_completion_days(1) == [
+            datetime(2024, 1, 2).toordinal(), datetime(2024, 1, 3).toordinal()
+        ]
+        assert habit_streak_repository.get_streak(1) == (2, 2)
+
+        # the frozen migration SQL fills the derived tables exactly like the live repositories rebuild them
+        tables = ("habit_streaks", "habit_streak_runs", "habit_completion_bitmaps")
+        migrated = {table: conn.execute(f"SELECT * FROM {table} ORDER BY 1, 2").fetchall() for table in tables}
+        with conn:
+            habit_streak_repository.rebuild(conn.cursor())
+            completion_bitmap_repository.rebuild(conn.cursor())
+        assert {table: conn.execute(f"SELECT * FROM {table} ORDER BY 1, 2").fetchall() for table in tables} == migrated
+    finally:
+        database.init_db(previous)
+
+
+def test_snapshot_and_load_round_trip(tmp_path):
+    """A snapshot should restore the exact content, also into a fresh in-memory database"""
+    previous = database.DB_PATH
+    snapshot = str(tmp_path / "snapshot.db")
+    try:
+        database.init_db(database.MEMORY_DB)
+        habit_id = habit_repository.insert_habit(Habit(0, "Snapshot", "", Frequency.DAILY, datetime(2024, 1, 1)))
+        habit_completion_repository.complete_habit(habit_id, datetime(2024, 1, 2))
+        database.snapshot_to(snapshot)
+
+        # a new in-memory database starts empty until the snapshot is loaded
+        database.init_db(database.MEMORY_DB)
+        assert habit_repository.get_habit_by_id(habit_id) is None
+        database.load_from(snapshot)
+
+        assert habit_repository.get_habit_by_id(habit_id).title == "Snapshot"
+        assert habit_completion_repository.get_completions(habit_id) == [datetime(2024, 1, 2)]
+    finally:
+        database.init_db(previous)
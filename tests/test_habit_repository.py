@@ -91,3 +91,14 @@ def test_delete_all_habits_removes_test_habits_only():
 
     all_habits_after = habit_repository.get_all_habits()
     assert all(h.id != habit1.id and h.id != habit2.id for h in all_habits_after)
+
+
+def test_iter_habits_streams_in_batches():
+    habit1 = insert_test_habit("Iter 1")
+    habit2 = insert_test_habit("Iter 2")
+
+    streamed = list(habit_repository.iter_habits(batch_size=1))
+    assert [h.id for h in streamed] == [h.id for h in habit_repository.get_all_habits()]
+
+    delete_test_habit_by_id(habit1.id)
+    delete_test_habit_by_id(habit2.id)
@@ -0,0 +1,157 @@
+import random
+from datetime import datetime, timedelta
+from models.habit import Habit, Frequency
+from db.database import get_connection
+from db.habit_repository import insert_habit, update_habit, delete_habit
+from db.habit_completion_repository import complete_habit, complete_habits_bulk, get_completions
+from db import habit_streak_repository
+from services import analytics_service
+
+START = datetime(2024, 1, 1, 9)
+
+
+def expected_streaks(habit_id, frequency):
+    completions = get_completions(habit_id)
+    return (analytics_service.calculate_current_streak(list(completions), frequency),
+            analytics_service.calculate_longest_streak(list(completions), frequency))
+
+
+def test_summary_follows_completions_in_order():
+    """Each check-off should update current and longest streak incrementally"""
+    habit_id = insert_habit(Habit(0, "S_InOrder", "", Frequency.DAILY, START))
+    for offset in (0, 1, 2, 5, 6):
+        complete_habit(habit_id, START + timedelta(days=offset))
+    complete_habit(habit_id, START + timedelta(days=6, hours=3))
+
+    assert habit_streak_repository.get_streak(habit_id) == (2, 3)
+    assert habit_streak_repository.get_streak(habit_id) == expected_streaks(habit_id, Frequency.DAILY)
+    delete_habit(habit_id)
+
+
+def test_backdated_completion_rebuilds_summary():
+    """A completion older than the last one should bridge the gap it closes"""
+    habit_id = insert_habit(Habit(0, "S_Backdated", "", Frequency.DAILY, START))
+    complete_habits_bulk((habit_id, START + timedelta(days=offset)) for offset in (0, 1, 3, 4))
+    assert habit_streak_repository.get_streak(habit_id) == (2, 2)
+
+    complete_habit(habit_id, START + timedelta(days=2))
+    assert habit_streak_repository.get_streak(habit_id) == (5, 5)
+    delete_habit(habit_id)
+
+
+def test_frequency_change_rebuilds_summary():
+    """Switching from daily to weekly should recalculate the streaks in weekly periods"""
+    habit_id = insert_habit(Habit(0, "S_Frequency", "", Frequency.DAILY, START))
+    complete_habits_bulk((habit_id, START + timedelta(days=offset)) for offset in (0, 7, 14, 15))
+    assert habit_streak_repository.get_streak(habit_id) == (2, 2)
+
+    update_habit(habit_id, Habit(habit_id, "S_Frequency", "", Frequency.WEEKLY, START))
+    assert habit_streak_repository.get_streak(habit_id) == (3, 3)
+    assert habit_streak_repository.get_streak(habit_id) == expected_streaks(habit_id, Frequency.WEEKLY)
+    delete_habit(habit_id)
+
+
+def test_rebuild_all_recovers_summary():
+    """rebuild_all should restore a damaged summary from the completions"""
+    habit_id = insert_habit(Habit(0, "S_Rebuild", "", Frequency.MONTHLY, START))
+    complete_habits_bulk((habit_id, START + timedelta(days=31 * offset)) for offset in range(6))
+    conn = get_connection()
+    conn.execute("UPDATE habit_streaks SET current_streak = 99, longest_streak = 99 WHERE habit_id = ?", (habit_id,))
+    conn.commit()
+
+    habit_streak_repository.rebuild_all()
+    assert habit_streak_repository.get_streak(habit_id) == expected_streaks(habit_id, Frequency.MONTHLY) == (6, 6)
+    delete_habit(habit_id)
+
+
+def test_summary_matches_recalculation_for_all_habits():
+    """The streaks read from the summary should equal a full recalculation"""
+    habit_ids = []
+    for frequency in Frequency:
+        habit_id = insert_habit(Habit(0, f"S_All_{frequency.value}", "", frequency, START))
+        complete_habits_bulk((habit_id, START + timedelta(days=offset)) for offset in (0, 3, 9, 10, 16, 40, 41, 70))
+        habit_ids.append(habit_id)
+
+    assert analytics_service.get_current_streak_all_habits() == analytics_service.compute_current_streak_all_habits()
+    assert analytics_service.get_longest_streak_all_habits() == analytics_service.compute_longest_streak_all_habits()
+    for habit_id in habit_ids:
+        delete_habit(habit_id)
+
+
+def test_sql_streaks_match_python_math():
+    """The window-function query should agree with the period math, also across the 53-week year 2020"""
+    rng = random.Random(15)
+    habit_ids = {}
+    for frequency, step in ((Frequency.DAILY, 1), (Frequency.WEEKLY, 7), (Frequency.BIWEEKLY, 14), (Frequency.MONTHLY, 30)):
+        for n in range(5):
+            habit_id = insert_habit(Habit(0, f"S_Sql_{frequency.value}_{n}", "", frequency, START))
+            day = datetime(2020, 11, 1, 12) + timedelta(days=rng.randrange(10))
+            completions = []
+            for _ in range(40):
+                completions.append((habit_id, day))
+                day += timedelta(days=step + rng.choice((0, 0, 0, 1, -1, step)))
+            complete_habits_bulk(completions)
+            habit_ids[habit_id] = frequency
+
+    streaks = habit_streak_repository.calculate_streaks(habit_ids)
+    assert streaks == {habit_id: expected_streaks(habit_id, frequency) for habit_id, frequency in habit_ids.items()}
+    for habit_id in habit_ids:
+        delete_habit(habit_id)
+
+
+def test_run_index_follows_completions_and_rebuild():
+    """Incremental run updates, including backdated completions, should equal a rebuilt run index"""
+    habit_id = insert_habit(Habit(0, "S_Runs", "", Frequency.WEEKLY, START))
+    for offset in (0, 7, 8, 14, 35, 42, 70):
+        complete_habit(habit_id, START + timedelta(days=offset))
+    complete_habits_bulk((habit_id, START + timedelta(days=offset)) for offset in (77, 84, 100))
+    incremental = habit_streak_repository.get_run_index(habit_id)
+
+    habit_streak_repository.rebuild_all()
+    assert habit_streak_repository.get_run_index(habit_id) == incremental
+    week = (START.toordinal() - 1) // 7
+    assert [(first - week, last - week) for first, last, _, _ in incremental[2]] == [(0, 2), (5, 6), (10, 12), (14, 14)]
+
+    # a backdated week closes the gap between the first two runs
+    complete_habit(habit_id, START + timedelta(days=22))
+    complete_habit(habit_id, START + timedelta(days=29))
+    runs = habit_streak_repository.get_run_index(habit_id)[2]
+    assert [(first - week, last - week) for first, last, _, _ in runs] == [(0, 6), (10, 12), (14, 14)]
+    delete_habit(habit_id)
+
+
+def test_last_completed_at_survives_rebuild():
+    """The newest completion time should follow check-offs, bulk inserts and summary rebuilds"""
+    habit_id = insert_habit(Habit(0, "S_LastCompleted", "", Frequency.DAILY, START))
+    complete_habit(habit_id, START + timedelta(days=3, hours=2))
+    complete_habits_bulk((habit_id, START + timedelta(days=offset)) for offset in (5, 1))
+    # backdated, the newest time stays
+    complete_habit(habit_id, START)
+    habit_streak_repository.rebuild_all()
+
+    status = analytics_service.get_habit_status(habit_id)
+    assert status.last_completed == START + timedelta(days=5)
+    delete_habit(habit_id)
+
+
+def test_bulk_insert_updates_summary_per_chunk():
+    """Small chunks, some of them backdated against earlier chunks, should end in the same summary as a rebuild"""
+    in_order = insert_habit(Habit(0, "S_ChunksInOrder", "", Frequency.DAILY, START))
+    shuffled = insert_habit(Habit(0, "S_ChunksShuffled", "", Frequency.WEEKLY, START))
+    offsets = [offset for offset in range(120) if offset % 17]
+    backdated = offsets[:]
+    random.Random(3).shuffle(backdated)
+    rows = [row for pair in zip(((in_order, START + timedelta(days=offset)) for offset in offsets),
+                                ((shuffled, START + timedelta(days=offset)) for offset in backdated)) for row in pair]
+    assert complete_habits_bulk(rows, chunk_size=7) == len(rows)
+
+    incremental = {habit_id: (habit_streak_repository.get_streak(habit_id), habit_streak_repository.get_run_index(habit_id))
+                   for habit_id in (in_order, shuffled)}
+    habit_streak_repository.rebuild_all()
+    for habit_id, frequency in ((in_order, Frequency.DAILY), (shuffled, Frequency.WEEKLY)):
+        assert incremental[habit_id] == (habit_streak_repository.get_streak(habit_id),
+                                         habit_streak_repository.get_run_index(habit_id))
+        assert incremental[habit_id][0] == expected_streaks(habit_id, frequency)
+    assert analytics_service.get_habit_status(shuffled).last_completed == START + timedelta(days=max(offsets))
+    delete_habit(in_order)
+    delete_habit(shuffled)
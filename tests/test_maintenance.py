@@ -0,0 +1,68 @@
+from datetime import datetime, timedelta
+import pytest
+from models.habit import Habit, Frequency
+from db import database
+from db.database import get_connection
+from db.habit_repository import insert_habit, delete_habit
+from db.habit_completion_repository import complete_habits_bulk
+from db import maintenance
+
+
+def count_completions(habit_id):
+    return get_connection().execute("SELECT COUNT(*) FROM habit_completions WHERE habit_id = ?", (habit_id,)).fetchone()[0]
+
+
+@pytest.fixture
+def file_database(tmp_path):
+    """Run one test against a new database file, auto-vacuum and file sizes do not apply to the in-memory one"""
+    previous = database.DB_PATH
+    database.init_db(str(tmp_path / "maintenance.db"))
+    yield
+    database.init_db(previous)
+
+
+def test_delete_habit_cascades_to_completions():
+    """Foreign keys are enforced, deleting a habit removes its completions"""
+    habit_id = insert_habit(Habit(0, "M_Cascade", "", Frequency.DAILY, datetime.now()))
+    complete_habits_bulk((habit_id, datetime(2024, 1, 1) + timedelta(days=i)) for i in range(10))
+    delete_habit(habit_id)
+    assert count_completions(habit_id) == 0
+
+
+def test_run_maintenance_removes_orphans(file_database):
+    """Completions left behind without foreign keys should be collected in batches"""
+    habit_id = insert_habit(Habit(0, "M_Orphans", "", Frequency.DAILY, datetime.now()))
+    conn = get_connection()
+    conn.execute("PRAGMA foreign_keys=OFF")
+    try:
+        complete_habits_bulk((habit_id, datetime(2024, 1, 1) + timedelta(days=i)) for i in range(25))
+        conn.execute("DELETE FROM habits WHERE id = ?", (habit_id,))
+        conn.commit()
+    finally:
+        conn.execute("PRAGMA foreign_keys=ON")
+    assert count_completions(habit_id) == 25
+
+    report = maintenance.run_maintenance(batch_size=10)
+
+    assert report["orphans_deleted"] == 25
+    assert report["bytes_reclaimed"] == max(report["size_before"] - report["size_after"], 0)
+    assert count_completions(habit_id) == 0
+    for table in maintenance.DERIVED_TABLES:
+        assert conn.execute(f"SELECT COUNT(*) FROM {table} WHERE habit_id = ?", (habit_id,)).fetchone()[0] == 0
+    assert conn.execute("PRAGMA auto_vacuum").fetchone()[0] == maintenance.AUTO_VACUUM_INCREMENTAL
+
+
+def test_new_database_reclaims_every_free_page(file_database):
+    """A new file should start with incremental auto-vacuum and give back all pages freed by a delete"""
+    conn = get_connection()
+    assert conn.execute("PRAGMA auto_vacuum").fetchone()[0] == maintenance.AUTO_VACUUM_INCREMENTAL
+
+    habit_id = insert_habit(Habit(0, "M_Vacuum", "", Frequency.DAILY, datetime.now()))
+    complete_habits_bulk((habit_id, datetime(2000, 1, 1) + timedelta(hours=i)) for i in range(20000))
+    delete_habit(habit_id)
+    assert conn.execute("PRAGMA freelist_count").fetchone()[0] > 1
+
+    size_before = maintenance.get_database_size()
+    maintenance.reclaim_space()
+    assert conn.execute("PRAGMA freelist_count").fetchone()[0] == 0
+    assert maintenance.get_database_size() < size_before
@@ -0,0 +1,70 @@
+import random
+from datetime import date, datetime, timedelta
+import pytest
+from models.habit import Habit, Frequency
+from db.habit_repository import insert_habit, delete_habit
+from db.habit_completion_repository import complete_habits_bulk
+from services import analytics_service, numpy_streak_engine
+
+START = datetime(2019, 12, 1, 9)
+
+
+def random_days(rng, frequency):
+    """Completion days with random gaps, repeated check-offs and a crossing of the 53-week year 2020"""
+    step = {Frequency.DAILY: 1, Frequency.WEEKLY: 7, Frequency.BIWEEKLY: 14, Frequency.MONTHLY: 30}[frequency]
+    day = date(2019, 11, 1).toordinal() + rng.randrange(10)
+    days = []
+    for _ in range(rng.randrange(0, 80)):
+        days.append(day)
+        if rng.random() < 0.1:
+            days.append(day)
+        day += step + (rng.choice((0, 0, 0, 1, -1, step)) if step > 1 else rng.choice((0, 0, 0, 0, 1, 2)))
+    return days
+
+
+def test_numpy_engine_matches_python_streaks():
+    """The vectorized engine should give exactly the streaks of the pure-Python math"""
+    pytest.importorskip("numpy")
+    rng = random.Random(14)
+    frequencies = list(Frequency)
+    habits = [Habit(i, f"H{i}", "", frequencies[i % len(frequencies)], START) for i in range(1, 201)]
+    days_by_habit = {habit.id: random_days(rng, habit.frequency) for habit in habits}
+
+    streaks = numpy_streak_engine.compute_streaks(habits, days_by_habit)
+
+    assert streaks == {
+        habit.id: analytics_service.calculate_streaks_from_days(days_by_habit[habit.id], habit.frequency)
+        for habit in habits
+    }
+
+
+def test_numpy_engine_weekly_year_boundaries():
+    """Streaks continue from week 52 into week 1 and through week 53 of 2020"""
+    pytest.importorskip("numpy")
+    habit = Habit(1, "Weekly", "", Frequency.WEEKLY, START)
+    for first, last in ((date(2018, 12, 3), date(2019, 1, 14)), (date(2020, 12, 14), date(2021, 1, 18))):
+        days = list(range(first.toordinal(), last.toordinal() + 1, 7))
+        expected = analytics_service.calculate_streaks_from_days(days, Frequency.WEEKLY)
+        assert numpy_streak_engine.compute_streaks([habit], {1: days})[1] == expected
+
+
+def test_compute_streaks_all_habits_engines_agree():
+    """All engines should read the same data and return the same streaks, habits without completions get (0, 0)"""
+    habit_ids = [
+        insert_habit(Habit(0, f"NP_{frequency.value}", "", frequency, START)) for frequency in Frequency
+    ]
+    empty_id = insert_habit(Habit(0, "NP_Empty", "", Frequency.DAILY, START))
+    complete_habits_bulk(
+        (habit_id, START + timedelta(days=offset))
+        for habit_id in habit_ids
+        for offset in (0, 1, 2, 9, 10, 30, 31, 60, 61, 62, 90)
+    )
+
+    python_streaks = analytics_service.compute_streaks_all_habits("python")
+    assert python_streaks[empty_id] == (0, 0)
+    assert python_streaks[habit_ids[0]] == (1, 3)
+    assert analytics_service.compute_streaks_all_habits("numpy") == python_streaks
+    assert analytics_service.compute_streaks_all_habits("sql") == python_streaks
+
+    for habit_id in habit_ids + [empty_id]:
+        delete_habit(habit_id)
@@ -0,0 +1,35 @@
+from datetime import datetime, timedelta
+import pytest
+from models.habit import Habit, Frequency
+from db import database
+from db.habit_repository import insert_habit, delete_habit
+from db.habit_completion_repository import complete_habits_bulk
+from services import analytics_service, parallel_analytics
+
+
+def test_parallel_results_match_serial(tmp_path):
+    """Sharded worker processes should return exactly what the single-process analytics return"""
+    now = datetime.now()
+    habit_ids = []
+    for n, frequency in enumerate(list(Frequency) * 2):
+        habit_id = insert_habit(Habit(0, f"P_{frequency.value}_{n}", "", frequency, now))
+        complete_habits_bulk((habit_id, now - timedelta(days=offset)) for offset in range(n, 40, n + 1))
+        habit_ids.append(habit_id)
+    path = str(tmp_path / "parallel.db")
+    database.snapshot_to(path)
+
+    options = {"workers": 2, "chunk_size": 3, "path": path}
+    assert parallel_analytics.compute_streaks_all_habits(**options) == analytics_service.compute_streaks_all_habits()
+    assert [habit.id for habit in parallel_analytics.get_broken_habits(**options)] == \
+        [habit.id for habit in analytics_service.get_broken_habits()]
+    assert [habit.id for habit in parallel_analytics.get_open_tasks_for_today(**options)] == \
+        [habit.id for habit in analytics_service.get_open_tasks_for_today()]
+
+    for habit_id in habit_ids:
+        delete_habit(habit_id)
+
+
+def test_parallel_needs_database_file():
+    """An in-memory database cannot be read by other processes"""
+    with pytest.raises(ValueError):
+        parallel_analytics.compute_streaks_all_habits(path=database.MEMORY_DB)
@@ -0,0 +1,64 @@
+from datetime import datetime
+from models.habit import Habit, Frequency
+from db import habit_repository, habit_completion_repository, habit_streak_repository
+from db.database import get_connection
+from tests.query_plan import assert_uses_index, capture_query_plans
+
+COMPLETIONS_INDEX = "idx_habit_completions_habit_completed"
+FREQUENCY_INDEX = "idx_habits_frequency"
+PRIMARY_KEY = "INTEGER PRIMARY KEY"
+
+
+def create_test_habit(name="QP_Test"):
+    """Insert a habit and return its ID"""
+    return habit_repository.insert_habit(Habit(0, name, "", Frequency.DAILY, datetime.now()))
+
+
+def test_get_completions_uses_covering_index():
+    hid = create_test_habit()
+    habit_completion_repository.complete_habit(hid)
+    assert_uses_index(habit_completion_repository.get_completions, COMPLETIONS_INDEX, hid)
+    assert_uses_index(habit_completion_repository.get_completions, "COVERING INDEX", hid)
+    assert_uses_index(habit_completion_repository.get_completion_days, "COVERING INDEX", hid)
+    habit_repository.delete_habit(hid)
+
+
+def test_get_habits_by_frequency_uses_frequency_index():
+    assert_uses_index(habit_repository.get_habits_by_frequency, FREQUENCY_INDEX, Frequency.WEEKLY)
+
+
+def test_single_habit_queries_use_primary_key():
+    hid = create_test_habit()
+    assert_uses_index(habit_repository.get_habit_by_id, PRIMARY_KEY, hid)
+    updated = Habit(hid, "QP_Updated", "", Frequency.DAILY, datetime.now())
+    assert_uses_index(habit_repository.update_habit, PRIMARY_KEY, hid, updated)
+    assert_uses_index(habit_repository.delete_habit, PRIMARY_KEY, hid)
+
+
+def test_grouped_completions_use_covering_index():
+    first, second = create_test_habit(), create_test_habit()
+    assert_uses_index(habit_completion_repository.get_completion_days_grouped, COMPLETIONS_INDEX, [first, second])
+    habit_repository.delete_habit(first)
+    habit_repository.delete_habit(second)
+
+
+def test_completion_windows_use_covering_index():
+    hid = create_test_habit()
+    since, until = datetime(2024, 1, 1), datetime(2024, 2, 1)
+    assert_uses_index(habit_completion_repository.get_completions, COMPLETIONS_INDEX, hid, since, until)
+    assert_uses_index(habit_completion_repository.get_completion_days, COMPLETIONS_INDEX, hid,
+                      limit=10, newest_first=True)
+    habit_repository.delete_habit(hid)
+
+
+def test_summary_rebuild_of_one_habit_does_not_scan_completions():
+    hid = create_test_habit()
+    habit_completion_repository.complete_habit(hid)
+    conn = get_connection()
+    with conn:
+        plans = capture_query_plans(habit_streak_repository.rebuild_summary, conn.cursor(), [hid])
+    deletes = [(sql, details) for sql, details in plans if sql.lstrip().upper().startswith("DELETE")]
+    assert deletes
+    for sql, details in deletes:
+        assert not any(detail.startswith("SCAN") for detail in details), f"full scan in {sql!r}: {details}"
+    habit_repository.delete_habit(hid)
@@ -0,0 +1,163 @@
+import asyncio
+import threading
+from datetime import date, datetime, timedelta
+from models.habit import Habit, Frequency
+from models.streaks import get_period, get_period_start
+from controllers import habit_controller, habit_completion_controller
+from db.habit_repository import insert_habit, delete_habit
+from db.habit_completion_repository import complete_habit
+from services import reminder_scheduler
+
+
+def _midnight(day: date) -> datetime:
+    return datetime.combine(day, datetime.min.time())
+
+
+def _entries_of(due, habit_ids):
+    return [entry for entry in due if entry[2] in habit_ids]
+
+
+def test_get_period_start_inverts_get_period():
+    """Every period ordinal maps back to the first day of that period"""
+    base_day = date(2024, 12, 27).toordinal()
+    for frequency in Frequency:
+        for day in range(date(2024, 12, 28).toordinal(), date(2026, 2, 1).toordinal()):
+            period = get_period(day, frequency, base_day)
+            start = get_period_start(period, frequency, base_day)
+            assert start <= day and get_period(start, frequency, base_day) == period
+            assert get_period(start - 1, frequency, base_day) == period - 1
+
+
+def test_scheduler_builds_heap_from_summary():
+    """Completed habits are due from their next period on and break one period later, new habits are due at once"""
+    now = datetime.now()
+    today = date.today()
+    daily_id = insert_habit(Habit(0, "Remind_Daily", "", Frequency.DAILY, now - timedelta(days=3)))
+    monthly_id = insert_habit(Habit(0, "Remind_Monthly", "", Frequency.MONTHLY, now - timedelta(days=3)))
+    fresh_id = insert_habit(Habit(0, "Remind_Fresh", "", Frequency.WEEKLY, now - timedelta(days=3)))
+    complete_habit(daily_id, now)
+    complete_habit(monthly_id, now)
+    reminder_scheduler.start()
+
+    ids = {daily_id, monthly_id, fresh_id}
+    assert [entry[2] for entry in _entries_of(reminder_scheduler.pop_due(now), ids)] == [fresh_id]
+    assert reminder_scheduler.pop_due(now) == []
+
+    due = _entries_of(reminder_scheduler.pop_due(_midnight(today + timedelta(days=1))), ids)
+    assert (_midnight(today + timedelta(days=1)), _midnight(today + timedelta(days=2)), daily_id) in due
+
+    next_month = date(today.year + today.month // 12, today.month % 12 + 1, 1)
+    month_after = date(next_month.year + next_month.month // 12, next_month.month % 12 + 1, 1)
+    due = _entries_of(reminder_scheduler.pop_due(_midnight(next_month)), ids)
+    assert (_midnight(next_month), _midnight(month_after), monthly_id) in due
+    # reported habits come back once per period until they are completed
+    assert daily_id in [entry[2] for entry in due]
+
+    reminder_scheduler.close()
+    for habit_id in ids:
+        delete_habit(habit_id)
+
+
+def test_scheduler_follows_controllers():
+    """Completing, updating and deleting through the controllers moves the heap entries without a rescan"""
+    reminder_scheduler.start()
+    now = datetime.now()
+    tomorrow = _midnight(date.today() + timedelta(days=1))
+    habit = Habit(0, "Remind_Controller", "", Frequency.DAILY, now - timedelta(days=1))
+    habit_id = habit_controller.add_habit(habit)
+    assert reminder_scheduler.next_due_at() <= now
+
+    habit_completion_controller.complete_habit(habit_id)
+    assert _entries_of(reminder_scheduler.pop_due(now), {habit_id}) == []
+    assert reminder_scheduler.next_due_at() <= tomorrow
+
+    habit.frequency = Frequency.MONTHLY
+    habit_controller.update_habit(habit_id, habit)
+    today = date.today()
+    next_month = _midnight(date(today.year + today.month // 12, today.month % 12 + 1, 1))
+    assert [entry[0] for entry in _entries_of(reminder_scheduler.pop_due(next_month), {habit_id})] == [next_month]
+
+    habit_controller.delete_habit(habit_id)
+    assert _entries_of(reminder_scheduler.pop_due(datetime(9000, 1, 1)), {habit_id}) == []
+    reminder_scheduler.close()
+
+
+def test_wait_next_wakes_up_for_new_habit():
+    """A waiting thread is woken when a habit becomes due and returns empty after its timeout"""
+    reminder_scheduler.start()
+    reminder_scheduler.pop_due()
+    assert reminder_scheduler.wait_next(timeout=0.05) == []
+
+    results = []
+    waiter = threading.Thread(target=lambda: results.append(reminder_scheduler.wait_next(timeout=10)))
+    waiter.start()
+    habit_id = habit_controller.add_habit(Habit(0, "Remind_Wait", "", Frequency.WEEKLY, datetime.now()))
+    waiter.join(timeout=5)
+    assert not waiter.is_alive()
+    assert [entry[2] for entry in results[0]] == [habit_id]
+
+    reminder_scheduler.close()
+    habit_controller.delete_habit(habit_id)
+
+
+def test_wait_next_async():
+    """The async waiter returns due habits and honours its timeout"""
+    reminder_scheduler.start()
+    reminder_scheduler.pop_due()
+    assert asyncio.run(reminder_scheduler.wait_next_async(timeout=0.05)) == []
+
+    habit_id = habit_controller.add_habit(Habit(0, "Remind_Async", "", Frequency.DAILY, datetime.now()))
+    due = asyncio.run(reminder_scheduler.wait_next_async(timeout=5))
+    assert [entry[2] for entry in due] == [habit_id]
+
+    reminder_scheduler.close()
+    habit_controller.delete_habit(habit_id)
+
+
+def test_pop_due_drops_habits_deleted_behind_its_back():
+    """Habits removed without the controllers (delete_all_habits in a reset) must not be reminded"""
+    habit_id = insert_habit(Habit(0, "Remind_Reset", "", Frequency.DAILY, datetime.now() - timedelta(days=1)))
+    reminder_scheduler.start()
+    delete_habit(habit_id)
+
+    assert _entries_of(reminder_scheduler.pop_due(), {habit_id}) == []
+    assert _entries_of(reminder_scheduler.pop_due(datetime(9000, 1, 1)), {habit_id}) == []
+    reminder_scheduler.close()
+
+
+def test_pop_due_looks_up_habits_outside_the_lock(monkeypatch):
+    """Other threads can use the scheduler while pop_due checks the due habits against the database"""
+    habit_id = insert_habit(Habit(0, "Remind_Unlocked", "", Frequency.DAILY, datetime.now() - timedelta(days=1)))
+    reminder_scheduler.start()
+    lookup = reminder_scheduler.get_existing_ids
+
+    def check_from_other_thread(habit_ids):
+        other = threading.Thread(target=reminder_scheduler.next_due_at)
+        other.start()
+        other.join(timeout=5)
+        assert not other.is_alive()
+        return lookup(habit_ids)
+
+    monkeypatch.setattr(reminder_scheduler, "get_existing_ids", check_from_other_thread)
+    assert habit_id in [entry[2] for entry in reminder_scheduler.pop_due()]
+    reminder_scheduler.close()
+    delete_habit(habit_id)
+
+
+def test_wait_next_async_looks_up_habits_off_the_event_loop(monkeypatch):
+    """The database check of the async waiter runs on the database executor"""
+    habit_id = insert_habit(Habit(0, "Remind_Executor", "", Frequency.DAILY, datetime.now() - timedelta(days=1)))
+    reminder_scheduler.start()
+    lookup = reminder_scheduler.get_existing_ids
+    threads = []
+
+    def record_thread(habit_ids):
+        threads.append(threading.current_thread())
+        return lookup(habit_ids)
+
+    monkeypatch.setattr(reminder_scheduler, "get_existing_ids", record_thread)
+    due = asyncio.run(reminder_scheduler.wait_next_async(timeout=5))
+    assert habit_id in [entry[2] for entry in due]
+    assert threads and threading.main_thread() not in threads
+    reminder_scheduler.close()
+    delete_habit(habit_id)